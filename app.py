@@ -15,12 +15,24 @@ from services.permissions import PERMISSIONS
 from werkzeug.security import generate_password_hash
 from models.utilisateur import Utilisateur
 from models.role import Role
-from services.face_service import load_embeddings
+from models.document import Document
+from services.model_registry import API_ONLY, ModelsDisabledError, get_face_service, pool_stats, warm_up_pipeline
+from services.inference_pool import InferenceUnavailableError
+from services.document_index import DOCUMENT_INDEX
+from services.ocr_job_service import OCR_JOB_WORKERS, OcrJobWorkers
+from services.file_storage import FileStorage
+from services.verification_rollup import VerificationRollup
+from controllers.ocr_controller import JOB_HANDLERS
+from services.warmup import start_warm_up, mark_ready, is_ready, STATUS as WARMUP_STATUS
 from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_mail import Mail
 from extensions import mail
+from datetime import datetime
+import click
+import multiprocessing
 import os
+import time
 
 #**********************************************************************************************************************
 def create_initial_admin():
@@ -65,6 +77,31 @@ db.init_app(app)
 migrate = Migrate(app, db)
 jwt = JWTManager(app)
 
+#*************************************************Préchauffage des modèles*************************************************
+# YOLOv8 + Facenet512 (DeepFace) et EasyOCR : évite le pic de latence de la première requête.
+# Les workers API-only (IDSECURITY_API_ONLY=1) n'importent jamais ces modèles.
+# Avec les pools d'inférence, chaque processus du pool charge et préchauffe son modèle.
+# Jamais à l'import : les commandes flask (db upgrade, purge-uploads...) ne démarrent aucun pool.
+if API_ONLY:
+    mark_ready("api-only")
+
+
+def start_model_warm_up():
+    """
+    Préchauffage en arrière-plan, appelé par le point d'entrée serveur
+    (`python app.py`, ou hook post_fork de gunicorn : `from app import start_model_warm_up`).
+    La galerie des visages est chargée ici, dans le processus API : les processus
+    du pool ne font que les calculs modèle.
+    """
+    if API_ONLY or multiprocessing.parent_process() is not None:
+        return None
+    return start_warm_up({
+        "galerie": lambda: get_face_service().load_embeddings(),
+        "deepface": lambda: warm_up_pipeline("face"),
+        "easyocr": lambda: warm_up_pipeline("ocr"),
+    })
+#**************************************************************************************************************************
+
 #*************************************************Configuration du mail***************************************************
 app.config.update(
     MAIL_SERVER="smtp.gmail.com",
@@ -88,6 +125,13 @@ app.register_blueprint(face_bp, url_prefix="/api/face")
 app.register_blueprint(ocr_bp, url_prefix="/api/ocr")
 app.register_blueprint(notification_bp, url_prefix='/api/notifications')
 
+#*************************************************Jobs OCR asynchrones******************************************************
+# Consommateurs de la table ocr_jobs (mode ?async=1 de re_ocr / ocr_compare).
+# Démarrés par `python app.py` ou par un processus dédié (`flask ocr-worker`), jamais
+# à l'import : ni les commandes flask ni chaque worker gunicorn ne lancent de consommateurs.
+# Les workers API-only peuvent mettre des jobs en file mais ne les traitent pas.
+#**************************************************************************************************************************
+
 @app.route("/api/uploads/<path:filename>")
 def images(filename):
     return send_from_directory(os.path.join(base_dir, "uploads"), filename)
@@ -96,19 +140,75 @@ def images(filename):
 def images_mobile(filename):
     return send_from_directory(os.path.join(base_dir, "uploads_mobile"), filename)
 
+@app.route("/api/store/<path:filename>")
+def stored_files(filename):
+    """Fichiers stockés par contenu (ab/cd/<sha256>.<ext>)."""
+    return send_from_directory(os.path.join(base_dir, "store"), filename)
+
 @app.route("/api/results/<path:filename>")
 def results_images(filename):
     return send_from_directory(os.path.join(base_dir, "results"), filename)
     
 @app.route("/api/health")
+@app.route("/api/health/live")
 def health_check():
+    """Sonde de vie : le processus répond."""
     return jsonify({"message": "API IDSecurity is running", "status": "success"}), 200
 
+@app.route("/api/health/ready")
+def readiness_check():
+    """Sonde de disponibilité : verte uniquement une fois les modèles préchauffés."""
+    if is_ready():
+        return jsonify({"message": "API IDSecurity is ready", "status": "success", "warmup": WARMUP_STATUS}), 200
+    return jsonify({"message": "Préchauffage des modèles en cours", "status": "error", "warmup": WARMUP_STATUS}), 503
+
+@app.route("/api/health/inference")
+def inference_stats():
+    """Compteurs des pools d'inférence (jobs, timeouts, saturation)."""
+    return jsonify({"pools": pool_stats(), "status": "success"}), 200
+
+@app.errorhandler(ModelsDisabledError)
+def models_disabled(e):
+    return jsonify({"error": str(e), "status": "error"}), 503
+
+@app.errorhandler(InferenceUnavailableError)
+def inference_unavailable(e):
+    return jsonify({"error": str(e), "status": "error"}), e.status_code
+
+@app.cli.command("purge-uploads")
+def purge_uploads():
+    """Supprime les fichiers stockés qui ne sont plus référencés (flask --app app purge-uploads)."""
+    print(f"{FileStorage.purge_orphans()} fichier(s) supprimé(s)")
+
+@app.cli.command("rebuild-verification-stats")
+@click.option("--start", "start_date", default=None, help="Premier jour (YYYY-MM-DD), tout l'historique par défaut")
+@click.option("--end", "end_date", default=None, help="Dernier jour (YYYY-MM-DD) inclus")
+def rebuild_verification_stats(start_date, end_date):
+    """Remplit / reconstruit l'agrégat journalier verification_daily_stats depuis verifications."""
+    start_day = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+    end_day = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+    print(f"{VerificationRollup.rebuild(start_day, end_day)} ligne(s) d'agrégat écrite(s)")
+
+@app.cli.command("ocr-worker")
+@click.option("--workers", default=OCR_JOB_WORKERS, show_default=True, help="Threads consommateurs")
+def ocr_worker(workers):
+    """Traite les jobs OCR asynchrones de la table ocr_jobs (flask --app app ocr-worker)."""
+    if API_ONLY:
+        raise click.ClickException("IDSECURITY_API_ONLY=1 : ce processus ne peut pas traiter les jobs OCR")
+    consumers = OcrJobWorkers(app, JOB_HANDLERS, workers=workers).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        consumers.stop()
+        print("[OcrJobs] arrêt demandé")
+
 @app.route("/api/init-embeddings")
 def init_embeddings_route():
     """Endpoint pour initialiser les embeddings"""
+    face_service = get_face_service()
     try:
-        load_embeddings()
+        face_service.load_embeddings()
         return jsonify({"message": "Embeddings loaded successfully", "status": "success"}), 200
     except Exception as e:
         return jsonify({"error": str(e), "status": "error"}), 500
@@ -118,7 +218,12 @@ if __name__ == "__main__":
         db.create_all()
         create_initial_admin()
 
-        load_embeddings()
-        
+        if not API_ONLY:
+            get_face_service().load_embeddings()
+            DOCUMENT_INDEX.load(db, Document)
+
+    start_model_warm_up()
+    if not API_ONLY:
+        OcrJobWorkers(app, JOB_HANDLERS).start()
     app.run(host="0.0.0.0", debug=True, use_reloader=False, port=8000)
 
@@ -153,8 +153,6 @@ def import_documents():
                 "success": False
             }), 400
 
-        imported_count = 0
-        updated_count = 0
         errors = []
 
         # Documents existants
@@ -162,106 +160,10 @@ def import_documents():
             doc.numero_document: doc for doc in Document.query.all()
         }
 
-        for index, row in df.iterrows():
-            try:
-                # Vérifier que les champs obligatoires ne sont pas vides
-                if pd.isna(row['nom']) or str(row['nom']).strip() == '':
-                    errors.append(f"Ligne {index + 2}: Le nom ne peut pas être vide")
-                    continue
-
-                if pd.isna(row['numero_document']) or str(row['numero_document']).strip() == '':
-                    errors.append(f"Ligne {index + 2}: Le numero_document ne peut pas être vide")
-                    continue
-
-                nom = str(row['nom']).strip()
-                numero_document = str(row['numero_document']).strip()
-
-                # Préparer les autres champs
-                def get_safe_value(row, column, default=''):
-                    if column not in row.index:
-                        return default
-                    value = row[column]
-                    if pd.isna(value):
-                        return default
-                    return str(value).strip()
-
-                def parse_date(value):
-                    if pd.isna(value) or str(value).strip() == '':
-                        return None
-                    try:
-                        return pd.to_datetime(value).date()
-                    except:
-                        return None
-
-                def parse_number(value):
-                    if pd.isna(value) or str(value).strip() == '':
-                        return None
-                    try:
-                        return float(value)
-                    except:
-                        return None
-
-                # Vérifier si le document existe déjà
-                if numero_document in existing_documents:
-                    # Mise à jour
-                    doc = existing_documents[numero_document]
-                    doc.nom = nom
-                    doc.prenom = get_safe_value(row, 'prenom')
-                    doc.nationalite = get_safe_value(row, 'nationalite')
-                    doc.date_de_naissance = parse_date(row.get('date_de_naissance'))
-                    doc.sexe = get_safe_value(row, 'sexe')
-                    doc.lieu_naissance = get_safe_value(row, 'lieu_naissance')
-                    doc.date_de_delivrance = parse_date(row.get('date_de_delivrance'))
-                    doc.date_d_expiration = parse_date(row.get('date_d_expiration'))
-                    doc.taille = parse_number(row.get('taille'))
-                    doc.poids = parse_number(row.get('poids'))
-                    doc.profession = get_safe_value(row, 'profession')
-                    doc.domicile = get_safe_value(row, 'domicile')
-                    doc.organisme_delivrance = get_safe_value(row, 'organisme_delivrance')
-                    doc.info_nfc = get_safe_value(row, 'info_nfc')
-                    
-                    if 'type_document_id' in row.index and not pd.isna(row['type_document_id']):
-                        try:
-                            doc.type_document_id = int(row['type_document_id'])
-                        except:
-                            pass
-                    
-                    updated_count += 1
-                else:
-                    # Création
-                    type_doc_id = None
-                    if 'type_document_id' in row.index and not pd.isna(row['type_document_id']):
-                        try:
-                            type_doc_id = int(row['type_document_id'])
-                        except:
-                            pass
-
-                    document = DocumentService.creer_document(
-                        numero_document=numero_document,
-                        nom=nom,
-                        prenom=get_safe_value(row, 'prenom'),
-                        nationalite=get_safe_value(row, 'nationalite'),
-                        date_de_naissance=parse_date(row.get('date_de_naissance')),
-                        sexe=get_safe_value(row, 'sexe'),
-                        lieu_naissance=get_safe_value(row, 'lieu_naissance'),
-                        date_de_delivrance=parse_date(row.get('date_de_delivrance')),
-                        date_d_expiration=parse_date(row.get('date_d_expiration')),
-                        chemin_image=None,
-                        taille=parse_number(row.get('taille')),
-                        poids=parse_number(row.get('poids')),
-                        profession=get_safe_value(row, 'profession'),
-                        domicile=get_safe_value(row, 'domicile'),
-                        organisme_delivrance=get_safe_value(row, 'organisme_delivrance'),
-                        info_nfc=get_safe_value(row, 'info_nfc'),
-                        type_document_id=type_doc_id
-                    )
-
-                    imported_count += 1
-                    existing_documents[numero_document] = document
-
-            except Exception as e:
-                errors.append(f"Ligne {index + 2}: Erreur inattendue - {str(e)}")
-                print(f"Erreur ligne {index + 2}:", traceback.format_exc())
+        # Créations validées une à une par creer_document, mises à jour en fin de bloc ;
+        # l'index de matching n'est rechargé qu'une fois, à la fin de l'import
+        with DocumentService.import_en_masse():
+            imported_count, updated_count = _importer_lignes(df, existing_documents, errors)
 
         total_processed = imported_count + updated_count
 
@@ -304,4 +206,116 @@ def import_documents():
 
     finally:
         if filepath and os.path.exists(filepath):
-            os.remove(filepath)
\ No newline at end of file
+            os.remove(filepath)
+
+
+def _importer_lignes(df, existing_documents, errors):
+    """
+    Crée ou met à jour un document par ligne du fichier importé ; les erreurs
+    de ligne sont ajoutées à `errors`. Renvoie (créés, mis à jour).
+    """
+    imported_count = 0
+    updated_count = 0
+
+    for index, row in df.iterrows():
+        try:
+            # Vérifier que les champs obligatoires ne sont pas vides
+            if pd.isna(row['nom']) or str(row['nom']).strip() == '':
+                errors.append(f"Ligne {index + 2}: Le nom ne peut pas être vide")
+                continue
+
+            if pd.isna(row['numero_document']) or str(row['numero_document']).strip() == '':
+                errors.append(f"Ligne {index + 2}: Le numero_document ne peut pas être vide")
+                continue
+
+            nom = str(row['nom']).strip()
+            numero_document = str(row['numero_document']).strip()
+
+            # Préparer les autres champs
+            def get_safe_value(row, column, default=''):
+                if column not in row.index:
+                    return default
+                value = row[column]
+                if pd.isna(value):
+                    return default
+                return str(value).strip()
+
+            def parse_date(value):
+                if pd.isna(value) or str(value).strip() == '':
+                    return None
+                try:
+                    return pd.to_datetime(value).date()
+                except:
+                    return None
+
+            def parse_number(value):
+                if pd.isna(value) or str(value).strip() == '':
+                    return None
+                try:
+                    return float(value)
+                except:
+                    return None
+
+            # Vérifier si le document existe déjà
+            if numero_document in existing_documents:
+                # Mise à jour
+                doc = existing_documents[numero_document]
+                doc.nom = nom
+                doc.prenom = get_safe_value(row, 'prenom')
+                doc.nationalite = get_safe_value(row, 'nationalite')
+                doc.date_de_naissance = parse_date(row.get('date_de_naissance'))
+                doc.sexe = get_safe_value(row, 'sexe')
+                doc.lieu_naissance = get_safe_value(row, 'lieu_naissance')
+                doc.date_de_delivrance = parse_date(row.get('date_de_delivrance'))
+                doc.date_d_expiration = parse_date(row.get('date_d_expiration'))
+                doc.taille = parse_number(row.get('taille'))
+                doc.poids = parse_number(row.get('poids'))
+                doc.profession = get_safe_value(row, 'profession')
+                doc.domicile = get_safe_value(row, 'domicile')
+                doc.organisme_delivrance = get_safe_value(row, 'organisme_delivrance')
+                doc.info_nfc = get_safe_value(row, 'info_nfc')
+                    
+                if 'type_document_id' in row.index and not pd.isna(row['type_document_id']):
+                    try:
+                        doc.type_document_id = int(row['type_document_id'])
+                    except:
+                        pass
+                    
+                updated_count += 1
+            else:
+                # Création
+                type_doc_id = None
+                if 'type_document_id' in row.index and not pd.isna(row['type_document_id']):
+                    try:
+                        type_doc_id = int(row['type_document_id'])
+                    except:
+                        pass
+
+                document = DocumentService.creer_document(
+                    numero_document=numero_document,
+                    nom=nom,
+                    prenom=get_safe_value(row, 'prenom'),
+                    nationalite=get_safe_value(row, 'nationalite'),
+                    date_de_naissance=parse_date(row.get('date_de_naissance')),
+                    sexe=get_safe_value(row, 'sexe'),
+                    lieu_naissance=get_safe_value(row, 'lieu_naissance'),
+                    date_de_delivrance=parse_date(row.get('date_de_delivrance')),
+                    date_d_expiration=parse_date(row.get('date_d_expiration')),
+                    chemin_image=None,
+                    taille=parse_number(row.get('taille')),
+                    poids=parse_number(row.get('poids')),
+                    profession=get_safe_value(row, 'profession'),
+                    domicile=get_safe_value(row, 'domicile'),
+                    organisme_delivrance=get_safe_value(row, 'organisme_delivrance'),
+                    info_nfc=get_safe_value(row, 'info_nfc'),
+                    type_document_id=type_doc_id
+                )
+
+                imported_count += 1
+                existing_documents[numero_document] = document
+
+        except Exception as e:
+            errors.append(f"Ligne {index + 2}: Erreur inattendue - {str(e)}")
+            print(f"Erreur ligne {index + 2}:", traceback.format_exc())
+
+    return imported_count, updated_count
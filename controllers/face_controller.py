@@ -1,9 +1,41 @@
-from services.face_service import recognize_face as recognize_face_service
+from services.model_registry import get_face_service
+from services.inference_pool import InferenceUnavailableError
 import base64
 from flask import request, jsonify
+from flask_jwt_extended import jwt_required
 
 
+def _multi_face_options(data):
+    """
+    Lit les options multi-visages (query string, formulaire ou JSON).
+    Lève ValueError si min_face_size ou min_confidence est invalide.
+    """
+    def get(key):
+        value = request.args.get(key)
+        if value is None:
+            value = data.get(key)
+        return value
+
+    options = {}
+    multi_face = get("multi_face")
+    options["multi_face"] = str(multi_face).lower() in ("1", "true", "yes", "on")
+    min_face_size = get("min_face_size")
+    if min_face_size is not None:
+        if not str(min_face_size).strip().isdigit() or int(min_face_size) < 1:
+            raise ValueError("min_face_size doit être un entier positif")
+        options["min_face_size"] = int(min_face_size)
+    min_confidence = get("min_confidence")
+    if min_confidence is not None:
+        try:
+            options["min_confidence"] = float(min_confidence)
+        except (TypeError, ValueError):
+            raise ValueError("min_confidence doit être un nombre entre 0 et 1")
+        if not 0.0 <= options["min_confidence"] <= 1.0:
+            raise ValueError("min_confidence doit être un nombre entre 0 et 1")
+    return options
+
 def recognize_face_api():
+    recognize_face_service = get_face_service().recognize_face
     print("FILES:", request.files)
     print("FORM:", request.form)
     print("CONTENT-TYPE:", request.content_type)
@@ -15,7 +47,7 @@ def recognize_face_api():
             if file.filename == '':
                 return jsonify({"error": "Aucun fichier envoyé", "status": "error"}), 400
             image_bytes = file.read()
-            result, code = recognize_face_service(image_bytes)
+            result, code = recognize_face_service(image_bytes, **_multi_face_options(request.form))
             return jsonify(result), code
         if request.is_json:
             data = request.get_json()
@@ -24,7 +56,7 @@ def recognize_face_api():
                 return jsonify({"error": "Champ image_base64 manquant", "status": "error"}), 400
             import base64
             image_bytes = base64.b64decode(image_base64)
-            result, code = recognize_face_service(image_bytes)
+            result, code = recognize_face_service(image_bytes, **_multi_face_options(data))
             return jsonify(result), code
 
         return jsonify({
@@ -32,9 +64,87 @@ def recognize_face_api():
             "status": "error"
         }), 415
 
+    except InferenceUnavailableError as e:
+        return jsonify({"error": str(e), "status": "error"}), e.status_code
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
     except Exception as e:
         return jsonify({
             "error": f"Erreur lors du traitement de la requête: {str(e)}",
             "status": "error"
         }), 500
-        
\ No newline at end of file
+
+
+def recognize_batch_api():
+    """Reconnaissance par lot : multipart (plusieurs champs images) ou JSON (images_base64: [...])."""
+    recognize_faces_batch_service = get_face_service().recognize_faces_batch
+    try:
+        files = request.files.getlist('images')
+        if files:
+            images = [file.read() for file in files]
+        elif request.is_json:
+            images_base64 = request.get_json().get("images_base64")
+            if not images_base64 or not isinstance(images_base64, list):
+                return jsonify({"error": "Champ images_base64 manquant", "status": "error"}), 400
+            images = [base64.b64decode(image) for image in images_base64]
+        else:
+            return jsonify({
+                "error": "Aucune image valide reçue (ni fichiers, ni Base64)",
+                "status": "error"
+            }), 415
+
+        result, code = recognize_faces_batch_service(images)
+        return jsonify(result), code
+
+    except InferenceUnavailableError as e:
+        return jsonify({"error": str(e), "status": "error"}), e.status_code
+    except Exception as e:
+        return jsonify({
+            "error": f"Erreur lors du traitement de la requête: {str(e)}",
+            "status": "error"
+        }), 500
+
+
+@jwt_required()
+def enroll_face_api():
+    """Enrôle un visage : multipart (image + name) ou JSON (image_base64 + name)."""
+    enroll_face_service = get_face_service().enroll_face
+    try:
+        if 'image' in request.files:
+            file = request.files['image']
+            if file.filename == '':
+                return jsonify({"error": "Aucun fichier envoyé", "status": "error"}), 400
+            result, code = enroll_face_service(file.read(), request.form.get("name"))
+            return jsonify(result), code
+        if request.is_json:
+            data = request.get_json()
+            image_base64 = data.get("image_base64")
+            if not image_base64:
+                return jsonify({"error": "Champ image_base64 manquant", "status": "error"}), 400
+            result, code = enroll_face_service(base64.b64decode(image_base64), data.get("name"))
+            return jsonify(result), code
+
+        return jsonify({
+            "error": "Aucune image valide reçue (ni fichier, ni Base64)",
+            "status": "error"
+        }), 415
+
+    except InferenceUnavailableError as e:
+        return jsonify({"error": str(e), "status": "error"}), e.status_code
+    except Exception as e:
+        return jsonify({
+            "error": f"Erreur lors du traitement de la requête: {str(e)}",
+            "status": "error"
+        }), 500
+
+
+@jwt_required()
+def face_cache_stats_api():
+    """Compteurs du cache d'embeddings (hits, misses, évictions...)."""
+    return jsonify({"cache": get_face_service().get_cache_stats(), "status": "success"}), 200
+
+
+@jwt_required()
+def delete_face_api(name):
+    result, code = get_face_service().delete_face(name)
+    return jsonify(result), code
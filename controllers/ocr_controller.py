@@ -1,15 +1,20 @@
-from flask import request, jsonify, current_app, url_for
+from flask import request, jsonify, current_app, url_for, send_file
 from models.utilisateur import Utilisateur
-from services.ocr_service import OCRService
+from services.model_registry import get_ocr_service
+from services.inference_pool import InferenceUnavailableError
+from services.field_templates import FIELD_TEMPLATES
+from services.ocr_job_service import OcrJobService
+from services.annotation_service import AnnotationService
+from services.file_storage import FileStorage
 from services.text_utils import clean_text_for_matching
 from models.document import Document  
 from models.ocr_result import OCRResult  
+from models.stored_file import StoredFile
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from itsdangerous import BadSignature, URLSafeSerializer
 from services.verification_service import VerificationService
 from config.database import db
 import os, json
-from models.verification import Verification
-import timeit 
 
 
 UPLOAD_FOLDER = "public/uploads_mobile"
@@ -17,15 +22,81 @@ RESULT_FOLDER = "public/results"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(RESULT_FOLDER, exist_ok=True)
 
-ocr_service = OCRService(langs=['fr','en'], use_gpu=False)
 
-
-@jwt_required()
-def re_ocr():
+def _cached_results(sha256, template):
+    """
+    Résultats OCR d'un envoi précédent du même fichier (même SHA-256), s'ils ont
+    été produits de la même façon (même champs de gabarit, ou OCR pleine page).
+    """
+    if not sha256:
+        return None
+    previous = OCRResult.query.filter(
+        OCRResult.fichier_sha256 == sha256, OCRResult.bbox.isnot(None)
+    ).order_by(OCRResult.id.desc()).first()
+    if not previous:
+        return None
+    results = json.loads(previous.bbox)
+    fields = {r["field"] for r in results if "field" in r}
+    if template and results and fields == set(template):
+        return results, True
+    if not template and not fields:
+        return results, False
+    return None
+
+
+def _ocr_image(ocr_service, save_path, type_document_id=None, sha256=None):
+    """
+    OCR ciblé sur les zones du gabarit si le type de document envoyé (type_document_id)
+    en a un et que le document est trouvé dans l'image, sinon OCR pleine page.
+    Un fichier identique déjà traité réutilise ses résultats sans relancer l'OCR.
+    """
+    template = FIELD_TEMPLATES.get(type_document_id)
+    cached = _cached_results(sha256, template)
+    if cached is not None:
+        print(f"♻️ Résultats OCR réutilisés pour le fichier {sha256[:12]}")
+        return cached
+    if template:
+        results = ocr_service.process_fields(save_path, template)
+        if results is not None:
+            return results, True
+    return ocr_service.process_image(save_path, preprocess=True), False
+
+
+def _annotated_signer():
+    return URLSafeSerializer(current_app.config["JWT_SECRET_KEY"], salt="ocr-annotated-image")
+
+
+def _annotated_url(ocr_id):
+    """
+    URL de l'image annotée : rendue au premier GET (voir get_annotated_image), pas pendant l'OCR.
+    L'identifiant est signé : l'URL ne peut être ni devinée ni énumérée.
+    """
+    return url_for("ocr.get_annotated_image", token=_annotated_signer().dumps(ocr_id), _external=True)
+
+
+def _async_requested():
+    value = request.args.get("async") or request.form.get("async")
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+def _job_accepted(job):
+    return jsonify({
+        "status": "accepted",
+        **job.to_dict(),
+        "status_url": url_for("ocr.get_ocr_job", job_id=job.id, _external=True)
+    }), 202
+
+
+def _handle_ocr_request(job_type):
+    """
+    Partie commune de re_ocr / ocr_compare : utilisateur, lieu, fichier.
+    Mode synchrone : traitement dans la requête. Mode asynchrone (?async=1) :
+    job en file d'attente et réponse 202 ; une clé d'idempotence (en-tête
+    Idempotency-Key) déjà vue renvoie le job existant sans relancer l'OCR.
+    """
     utilisateur_id = get_jwt_identity()
     print(f"👤 Utilisateur ID depuis JWT: {utilisateur_id}")
 
-
     # ✅ Récupérer l'utilisateur et son lieu
     utilisateur = Utilisateur.query.get(utilisateur_id)
     if not utilisateur:
@@ -37,63 +108,102 @@ def re_ocr():
     lieu_id = utilisateur.lieu_id
     print(f"📍 Lieu ID de l'utilisateur: {lieu_id}")
 
+    run_async = _async_requested()
+    idempotency_key = request.headers.get("Idempotency-Key") or request.form.get("idempotency_key")
+    if run_async:
+        existing = OcrJobService.find_by_idempotency_key(utilisateur.id, idempotency_key)
+        if existing:
+            return _job_accepted(existing)
+
     if "image" not in request.files:
         return jsonify(error="Aucun fichier envoyé"), 400
 
     file = request.files["image"]
-    save_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    file.save(save_path)
+    # Stockage par contenu : un envoi identique réutilise le fichier (et les résultats OCR)
+    stored = FileStorage.save_upload(file)
+
+    params = {
+        "utilisateur_id": utilisateur_id,
+        "lieu_id": lieu_id,
+        "save_path": FileStorage.absolute_path(stored),
+        "filename": file.filename,
+        "sha256": stored.sha256,
+        "type_document_id": request.form.get("type_document_id", type=int),
+    }
+
+    if run_async:
+        job, _ = OcrJobService.enqueue(
+            job_type, utilisateur.id, {**params, "base_url": request.host_url}, idempotency_key
+        )
+        return _job_accepted(job)
 
     try:
-        results = ocr_service.process_image(save_path, preprocess=True)
-        
-        annotated_path = ocr_service.annotate_image(
-            save_path, results, output_dir=UPLOAD_FOLDER
-        )
+        payload, code = JOB_HANDLERS[job_type](**params)
+    except InferenceUnavailableError as e:
+        return jsonify({"status": "error", "message": str(e)}), e.status_code
+    return jsonify(payload), code
+
 
-        annotated_filename = os.path.basename(annotated_path)
+def _original_url(sha256, filename):
+    """URL de l'image envoyée (stockage par contenu, ou ancien dossier uploads_mobile)."""
+    stored = StoredFile.query.get(sha256) if sha256 else None
+    if stored is not None:
+        return url_for("stored_files", filename=stored.chemin, _external=True)
+    return url_for("images_mobile", filename=filename, _external=True)
 
-        original_url = f"http://127.0.0.1:8000/api/uploads_mobile/{file.filename}"
-        annotated_url = f"http://127.0.0.1:8000/api/uploads_mobile/{annotated_filename}"
+
+def _run_re_ocr(utilisateur_id, lieu_id, save_path, filename, type_document_id=None, sha256=None):
+    """Traitement d'un document externe (requête synchrone ou job). Renvoie (payload, code_http)."""
+    ocr_service = get_ocr_service()
+
+    try:
+        results, from_template = _ocr_image(ocr_service, save_path, type_document_id, sha256)
+
+        original_url = _original_url(sha256, filename)
 
         full_text = " ".join([r["text"] for r in results])
         max_conf = max([r["confidence"] for r in results]) if results else 0.0
-        extracted = ocr_service.extract_externe_fields(results)
+        if from_template:
+            fields = {r["field"]: r["text"] or None for r in results}
+            extracted = {"nom": fields.get("nom"), "prenom": fields.get("prenom")}
+        else:
+            extracted = ocr_service.extract_externe_fields(results)
         
         print(f"📝 Extraction: Nom={extracted['nom']}, Prénom={extracted['prenom']}")
 
         ocr_entry = OCRResult(
-            image_name=file.filename,
+            image_name=filename,
             text_detected=full_text,
             confidence=max_conf,
             bbox=json.dumps(results, ensure_ascii=False),
-            annotated_image=annotated_path,
             nom_externe=extracted['nom'],
             prenom_externe=extracted['prenom'],
-            utilisateur_id=utilisateur_id  
+            utilisateur_id=utilisateur_id,
+            fichier_sha256=sha256
         )
 
         db.session.add(ocr_entry)
+        FileStorage.acquire(sha256)
         db.session.commit()
         db.session.refresh(ocr_entry)
 
-        
+        annotated_url = _annotated_url(ocr_entry.id)
+        ocr_entry.annotated_image = annotated_url
+        AnnotationService.schedule(ocr_entry.id, save_path, results)
        
-        verification = Verification(
-            ocr_result_id=ocr_entry.id,
-            lieu_id=lieu_id,
+        verification = VerificationService.save_verification(
             utilisateur_id=utilisateur_id,
-            resultat_photo=f"{extracted['nom']} {extracted['prenom']}",  
-            resultat_donnee='EXTERNE',  
-            url_image_echec=original_url    
+            lieu_id=lieu_id,
+            ocr_result_id=ocr_entry.id,
+            resultat_donnee='EXTERNE',
+            resultat_photo=f"{extracted['nom']} {extracted['prenom']}",
+            url_image_echec=original_url,
+            fichier_sha256=sha256
         )
-               
-        db.session.add(verification)
-        db.session.commit()
 
         print(f"✅ Vérification créée avec url_image_echec: {original_url}")
 
-        return jsonify({
+        return {
             "status": "success",
             "verification_id": verification.id,  
             "ocr_id": ocr_entry.id,
@@ -103,12 +213,16 @@ def re_ocr():
             "original_image": original_url,
             "annotated_image": annotated_url,
             "lieu_id": lieu_id
-        }), 200
+        }, 200
 
+    except InferenceUnavailableError:
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         current_app.logger.exception("Erreur OCR externe")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return {"status": "error", "message": str(e)}, 500
+
 
 
 
@@ -116,6 +230,11 @@ def re_ocr():
 
 
 
+@jwt_required()
+def re_ocr():
+    return _handle_ocr_request("re_ocr")
+
+
 @jwt_required()
 def list_externes():
     """Liste uniquement les vérifications marquées comme EXTERNE"""
@@ -192,53 +311,21 @@ def list_externes():
 
 
 
-@jwt_required()
-def ocr_compare():
-    utilisateur_id = get_jwt_identity()
-    print(f"👤 Utilisateur ID depuis JWT: {utilisateur_id}")
-
-    # ✅ Récupérer l'utilisateur et son lieu
-    utilisateur = Utilisateur.query.get(utilisateur_id)
-    if not utilisateur:
-        return jsonify({"status": "error", "message": "Utilisateur non trouvé"}), 404
-    
-    if not utilisateur.lieu_id:
-        return jsonify({"status": "error", "message": "Utilisateur non assigné à un lieu"}), 400
-    
-    lieu_id = utilisateur.lieu_id
-    print(f"📍 Lieu ID de l'utilisateur: {lieu_id}")
-
-    if "image" not in request.files:
-        return jsonify(error="Aucun fichier envoyé"), 400
-
-
-    file = request.files["image"]
-    save_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    file.save(save_path)
+def _run_ocr_compare(utilisateur_id, lieu_id, save_path, filename, type_document_id=None, sha256=None):
+    """Comparaison d'un document avec la base (requête synchrone ou job). Renvoie (payload, code_http)."""
+    ocr_service = get_ocr_service()
 
     try:
-        results = ocr_service.process_image(save_path, preprocess=True)
+        results, _ = _ocr_image(ocr_service, save_path, type_document_id, sha256)
 
-        annotated_path = ocr_service.annotate_image(
-            save_path, results, output_dir=UPLOAD_FOLDER
-        )
-
-        original_url = url_for(
-            "images_mobile", 
-            filename=file.filename, 
-            _external=True
-        )
-
-        annotated_url = url_for(
-            "images_mobile", 
-            filename=os.path.basename(annotated_path), 
-            _external=True
-        )
+        original_url = _original_url(sha256, filename)
 
         full_text = " ".join([r["text"] for r in results])
         full_text_norm = clean_text_for_matching(full_text)
 
-        matches = ocr_service.fuzzy_match_document(
+        # MRZ -> recherche exacte par numéro, sinon fuzzy matching
+        matches, mrz = ocr_service.match_document(
+            results,
             full_text_norm, 
             db,
             Document, 
@@ -258,19 +345,23 @@ def ocr_compare():
             print(f"❌ Aucun match trouvé, document_id sera None")
 
         ocr_entry = OCRResult(
-            image_name=file.filename,
+            image_name=filename,
             text_detected=full_text,
             confidence=max_confidence,
             bbox=json.dumps(results, ensure_ascii=False),
-            annotated_image=annotated_url,
             document_id=best_document_id,
-            utilisateur_id=utilisateur_id  
+            utilisateur_id=utilisateur_id,
+            fichier_sha256=sha256
         )
 
         db.session.add(ocr_entry)
+        FileStorage.acquire(sha256)
         db.session.commit()
         db.session.refresh(ocr_entry)
 
+        annotated_url = _annotated_url(ocr_entry.id)
+        ocr_entry.annotated_image = annotated_url
+        AnnotationService.schedule(ocr_entry.id, save_path, results)
 
         verification = VerificationService.save_verification(
             utilisateur_id=utilisateur_id,
@@ -279,7 +370,8 @@ def ocr_compare():
             ocr_result_id=ocr_entry.id,
             resultat_donnee="OK" if matches else "ECHEC",
             resultat_photo="NON_VERIFIE",
-            url_image_echec=f"http://127.0.0.1:8000/api/uploads_mobile/{file.filename}"
+            url_image_echec=original_url,
+            fichier_sha256=sha256
         )
 
         response_data = {
@@ -303,7 +395,8 @@ def ocr_compare():
                 } if ocr_entry.document and ocr_entry.document.type_document else None
             } if ocr_entry.document else None,
             "original_image": original_url,
-            "annotated_image": annotated_url
+            "annotated_image": annotated_url,
+            "mrz": mrz
         }
 
         if matches:
@@ -317,6 +410,7 @@ def ocr_compare():
                     "sexe": m.get("sexe"),
                     "scores_detail": m["scores_detail"],
                     "global_similarity_score": m["global_similarity_score"],
+                    "source": m.get("source", "fuzzy"),
                     "match_strength": (
                         "fort" if m["global_similarity_score"] >= 85 else
                         "moyen" if m["global_similarity_score"] >= 70 else "faible"
@@ -326,12 +420,67 @@ def ocr_compare():
                 })
             response_data["matches"] = formatted
 
-        return jsonify(response_data)
+        return response_data, 200
 
+    except InferenceUnavailableError:
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         current_app.logger.exception("Erreur OCR compare")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return {"status": "error", "message": str(e)}, 500
+
+
 
+@jwt_required()
+def ocr_compare():
+    return _handle_ocr_request("ocr_compare")
+
+
+@jwt_required()
+def ocr_stats():
+    """Temps par palier de prétraitement et taux d'escalade (tous les processus OCR)."""
+    return jsonify({"preprocess": get_ocr_service().preprocess_stats(), "status": "success"}), 200
 
 
+@jwt_required()
+def get_ocr_job(job_id):
+    """Etat d'un job OCR asynchrone et, une fois terminé, son résultat."""
+    job = OcrJobService.get_job(job_id, int(get_jwt_identity()))
+    if not job:
+        return jsonify({"status": "error", "message": "Job introuvable"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+def get_annotated_image(token):
+    """
+    Image annotée d'un résultat OCR : rendue depuis les bbox enregistrées au
+    premier appel, puis servie depuis le cache disque.
+    Sans JWT (URL chargée directement par les clients) : seul le jeton signé
+    renvoyé avec le résultat OCR donne accès à l'image.
+    """
+    try:
+        ocr_id = _annotated_signer().loads(token)
+    except BadSignature:
+        return jsonify({"status": "error", "message": "Résultat OCR introuvable"}), 404
+    cached_path = AnnotationService.annotated_path(ocr_id)
+    if not os.path.exists(cached_path):
+        ocr_entry = OCRResult.query.get(ocr_id)
+        if not ocr_entry or not ocr_entry.image_name:
+            return jsonify({"status": "error", "message": "Résultat OCR introuvable"}), 404
+        if ocr_entry.fichier is not None:
+            source_path = FileStorage.absolute_path(ocr_entry.fichier)
+        else:
+            source_path = os.path.join(UPLOAD_FOLDER, ocr_entry.image_name)
+        try:
+            cached_path = AnnotationService.render(ocr_entry.id, source_path, ocr_entry.bbox)
+        except FileNotFoundError:
+            return jsonify({"status": "error", "message": "Image d'origine introuvable"}), 404
+    return send_file(os.path.abspath(cached_path), mimetype="image/jpeg")
+
+
+# Traitements exécutables par les workers de la file de jobs OCR
+JOB_HANDLERS = {
+    "re_ocr": _run_re_ocr,
+    "ocr_compare": _run_ocr_compare,
+}
@@ -8,7 +8,10 @@ def create_type_document():
     data = request.json
     libelle = data.get("libelle")
     description = data.get("description")
-    type_document = TypeDocumentService.creer_type_document(libelle,description)
+    try:
+        type_document = TypeDocumentService.creer_type_document(libelle,description,data.get("gabarit_champs"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify({"message": "Le type document a été créer avec succes", "type_document": type_document.to_dict()}), 201
 
 @jwt_required()
@@ -28,7 +31,10 @@ def update_type_document(id):
     data = request.json
     libelle = data.get("libelle")
     description = data.get("description")
-    type_document = TypeDocumentService.update_type_document(id,libelle,description)
+    try:
+        type_document = TypeDocumentService.update_type_document(id,libelle,description,data.get("gabarit_champs"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify({"message": "Le type de document a été modifier avec succes", "type_document": type_document.to_dict()}), 200
     
 
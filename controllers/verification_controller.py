@@ -1,13 +1,63 @@
 from flask import request, jsonify , send_file
-from flask_jwt_extended import jwt_required
-from services.verification_service import VerificationService
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from services.verification_service import VerificationService, PAGE_SIZE_DEFAULT, UNPAGINATED_CAP
 from datetime import datetime, timedelta
 
 
+def _flag(name):
+    return request.args.get(name, default='0', type=str).lower() in ('1', 'true', 'yes')
+
+
+def _liste_options():
+    """
+    Pagination et filtres des listes de vérifications :
+    limit, cursor (next_cursor de la page précédente), lieu_id, resultat
+    (OK / ECHEC / EXTERNE), periode ou start_date / end_date.
+    Lève ValueError si un paramètre est invalide.
+    """
+    limit = request.args.get('limit', default=PAGE_SIZE_DEFAULT, type=int)
+    if limit is None or limit < 1:
+        raise ValueError("limit doit être un entier positif")
+    return {
+        "limit": limit,
+        "cursor": request.args.get('cursor', default=None, type=str),
+        "lieu_id": request.args.get('lieu_id', default=None, type=int),
+        "resultat_donnee": request.args.get('resultat', default=None, type=str),
+        "date_range": VerificationService.resolve_date_range(
+            request.args.get('periode', default=None, type=str),
+            request.args.get('start_date', default=None, type=str),
+            request.args.get('end_date', default=None, type=str)
+        ),
+    }
+
+
+def _stats_lieu_options():
+    """Paramètres `limit` (10 par défaut, 0 = tous les lieux) et `detail` (détail par résultat)."""
+    limit = request.args.get('limit', default=10, type=int)
+    detail = _flag('detail')
+    return (limit if limit and limit > 0 else None), detail
+
+
 @jwt_required()
 def get_all_verifications():
-    verifications = VerificationService.get_all_verifications()
-    return jsonify({"message": "La liste des verifications", "verifications": [verification.to_dict() for verification in verifications]}), 200
+    if _flag('all'):
+        # Ancienne liste complète, sur demande explicite et plafonnée
+        verifications = VerificationService.get_all_verifications(limit=UNPAGINATED_CAP)
+        return jsonify({
+            "message": "La liste des verifications",
+            "verifications": [verification.to_dict() for verification in verifications],
+            "truncated": len(verifications) >= UNPAGINATED_CAP
+        }), 200
+
+    try:
+        verifications, next_cursor = VerificationService.list_verifications(**_liste_options())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "message": "La liste des verifications",
+        "verifications": [verification.to_dict() for verification in verifications],
+        "next_cursor": next_cursor
+    }), 200
     
 @jwt_required()
 def get_verification_by_id(id):
@@ -18,7 +68,13 @@ def get_verification_by_id(id):
 @jwt_required()
 def get_mes_verifications():
     try:
-        verifications = VerificationService.get_user_verifications()
+        next_cursor = None
+        if _flag('all'):
+            verifications = VerificationService.get_user_verifications(limit=UNPAGINATED_CAP)
+        else:
+            verifications, next_cursor = VerificationService.list_verifications(
+                utilisateur_id=int(get_jwt_identity()), **_liste_options()
+            )
         if not verifications:
             return jsonify({
                 "message": "Aucune vérification trouvée",
@@ -27,8 +83,11 @@ def get_mes_verifications():
         return jsonify({
             "message": "Liste des verifications de l'utilisateur",
             "verifications": [verification.to_dict() for verification in verifications],
-            "total": len(verifications)
+            "total": len(verifications),
+            "next_cursor": next_cursor
         }),200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:        
         return jsonify({            
             "message": f"Erreur lors de la recuperation des verifications: {str(e)}"        
@@ -47,7 +106,8 @@ def get_statistiques_verifications():
 @jwt_required()
 def get_statistiques_verifications_par_lieu():
     periode = request.args.get('periode', default=None, type=str)
-    stats = VerificationService.get_stats_verifications_par_lieu(periode)
+    limit, detail = _stats_lieu_options()
+    stats = VerificationService.get_stats_verifications_par_lieu(periode, limit, detail)
     return jsonify({
         "message": "Statistiques des vérifications par lieu",
         "data": stats
@@ -85,7 +145,8 @@ def get_stats_verifications_par_lieu_custom():
     if not start_date or not end_date:
         return jsonify({"error": "Les dates de début et de fin sont requises"}), 400
     
-    stats = VerificationService.get_stats_verifications_par_lieu_custom(start_date, end_date)
+    limit, detail = _stats_lieu_options()
+    stats = VerificationService.get_stats_verifications_par_lieu_custom(start_date, end_date, limit, detail)
     return jsonify({
         "message": "Statistiques des vérifications par lieu (personnalisé)",
         "data": stats
@@ -7,7 +7,7 @@ class Document(db.Model):
     __tablename__ = "documents"
 
     id = Column(Integer, primary_key=True)
-    numero_document = Column(String(255))
+    numero_document = Column(String(255), index=True)
     nom = Column(String(255))
     prenom = Column(String(255))
     nationalite = Column(String(255))
@@ -24,6 +24,7 @@ class Document(db.Model):
     organisme_delivrance = Column(String(255))
     info_nfc = Column(String(255))
     type_document_id = Column(Integer, ForeignKey("type_documents.id"))
+    fichier_sha256 = Column(String(64), ForeignKey("stored_files.sha256"), nullable=True, index=True)
 
 
     type_document = relationship("TypeDocument", back_populates="documents")
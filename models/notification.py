@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from config.database import db
 from datetime import datetime
 
 class Notification(db.Model):
     __tablename__ = "notifications"
+    # Notifications d'un utilisateur (toutes ou non lues), les plus récentes d'abord
+    __table_args__ = (
+        Index("ix_notifications_utilisateur_date", "utilisateur_id", "date_creation"),
+        Index("ix_notifications_utilisateur_lu_date", "utilisateur_id", "est_lu", "date_creation"),
+    )
 
     id = Column(Integer, primary_key=True)
     titre = Column(String(255), nullable=False)
@@ -0,0 +1,47 @@
+import uuid
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.dialects.mysql import JSON
+from sqlalchemy.sql import func
+from config.database import db
+
+
+class OCRJob(db.Model):
+    """Job OCR asynchrone (file d'attente en base, traitée par les workers OCR)."""
+    __tablename__ = "ocr_jobs"
+    __table_args__ = (
+        UniqueConstraint("utilisateur_id", "idempotency_key", name="uq_ocr_jobs_idempotency"),
+        Index("ix_ocr_jobs_statut_date_creation", "statut", "date_creation"),
+    )
+
+    EN_ATTENTE = "EN_ATTENTE"
+    EN_COURS = "EN_COURS"
+    TERMINE = "TERMINE"
+    ECHEC = "ECHEC"
+
+    id = Column(String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    type = Column(String(50), nullable=False)          # "re_ocr" ou "ocr_compare"
+    statut = Column(String(20), nullable=False, default=EN_ATTENTE)
+    parametres = Column(JSON, nullable=False)
+    idempotency_key = Column(String(255), nullable=True)
+    utilisateur_id = Column(Integer, ForeignKey("utilisateurs.id"), nullable=False)
+    resultat = Column(JSON, nullable=True)
+    code_http = Column(Integer, nullable=True)
+    erreur = Column(Text, nullable=True)
+    tentatives = Column(Integer, nullable=False, default=0)
+    date_creation = Column(DateTime(timezone=True), server_default=func.now())
+    date_debut = Column(DateTime(timezone=True), nullable=True)
+    date_fin = Column(DateTime(timezone=True), nullable=True)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "type": self.type,
+            "statut": self.statut,
+            "resultat": self.resultat,
+            "code_http": self.code_http,
+            "erreur": self.erreur,
+            "tentatives": self.tentatives,
+            "date_creation": self.date_creation.isoformat() if self.date_creation else None,
+            "date_debut": self.date_debut.isoformat() if self.date_debut else None,
+            "date_fin": self.date_fin.isoformat() if self.date_fin else None
+        }
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime,Integer,ForeignKey
+from sqlalchemy import Column, DateTime,Integer,ForeignKey,String
 from sqlalchemy.orm import relationship
 from config.database import db
 from sqlalchemy.sql import func
@@ -19,10 +19,12 @@ class OCRResult(db.Model):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     nom_externe = db.Column(db.String(100), nullable=True)
     prenom_externe = db.Column(db.String(100), nullable=True)
+    fichier_sha256 = Column(String(64), ForeignKey("stored_files.sha256"), nullable=True, index=True)
 
     document = relationship("Document", back_populates="ocr_results")
     utilisateur = relationship("Utilisateur", back_populates="ocr_results")
     verifications = relationship("Verification", back_populates="ocr_results")
+    fichier = relationship("StoredFile")
 
     def to_dict(self):
         return {
@@ -37,6 +39,7 @@ class OCRResult(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             "nom_externe": self.nom_externe,
             "prenom_externe": self.prenom_externe,
+            "fichier_sha256": self.fichier_sha256,
             'utilisateur': {
                 'id': self.utilisateur.id,
                 'nom': self.utilisateur.nom,
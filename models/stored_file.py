@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from config.database import db
+
+
+class StoredFile(db.Model):
+    """
+    Fichier stocké une seule fois, adressé par son contenu (SHA-256) :
+    public/store/ab/cd/<sha256>.<ext>. `nb_references` compte les lignes
+    (OCRResult, Document, Verification) qui pointent vers lui.
+    """
+    __tablename__ = "stored_files"
+
+    sha256 = Column(String(64), primary_key=True)
+    extension = Column(String(10), nullable=False)
+    chemin = Column(String(255), nullable=False)        # relatif à STORAGE_ROOT
+    taille = Column(Integer, nullable=False)
+    nb_references = Column(Integer, nullable=False, default=0)
+    # UTC naïf côté Python (comme FileStorage._now) : now() du serveur est à l'heure locale
+    date_creation = Column(DateTime(timezone=True), default=datetime.utcnow)
+    derniere_utilisation = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "sha256": self.sha256,
+            "extension": self.extension,
+            "chemin": self.chemin,
+            "taille": self.taille,
+            "nb_references": self.nb_references,
+            "date_creation": self.date_creation.isoformat() if self.date_creation else None,
+            "derniere_utilisation": self.derniere_utilisation.isoformat() if self.derniere_utilisation else None
+        }
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import relationship
 from config.database import db
+from sqlalchemy.dialects.mysql import JSON
 
 
 class TypeDocument(db.Model):
@@ -9,6 +10,7 @@ class TypeDocument(db.Model):
     id = Column(Integer, primary_key=True)
     libelle = Column(String(255), nullable=False)      
     description = Column(String(255))
+    gabarit_champs = Column(JSON)  # zones des champs pour l'OCR ciblé (voir services/field_templates.py)
 
     documents = relationship("Document", back_populates="type_document")
 
@@ -17,6 +19,7 @@ class TypeDocument(db.Model):
         return{
             "id": self.id,
             "libelle": self.libelle,
-            "description": self.description
+            "description": self.description,
+            "gabarit_champs": self.gabarit_champs
         }
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from config.database import db
@@ -7,9 +7,17 @@ from datetime import datetime
 
 class Verification(db.Model):
     __tablename__ = 'verifications'
+    # Index alignés sur les requêtes des tableaux de bord (VerificationService, list_externes) :
+    # période seule, ou période + utilisateur / lieu / résultat
+    __table_args__ = (
+        Index('ix_verifications_utilisateur_date', 'utilisateur_id', 'date_verification'),
+        Index('ix_verifications_utilisateur_resultat_date', 'utilisateur_id', 'resultat_donnee', 'date_verification'),
+        Index('ix_verifications_lieu_date', 'lieu_id', 'date_verification'),
+        Index('ix_verifications_resultat_date', 'resultat_donnee', 'date_verification'),
+    )
 
     id = Column(Integer, primary_key=True)
-    date_verification = Column(DateTime(timezone=True), server_default=func.now())
+    date_verification = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     resultat_photo = Column(String(50))   
     resultat_donnee = Column(String(50))  
     url_image_echec = Column(String(255), nullable=True)
@@ -18,6 +26,7 @@ class Verification(db.Model):
     lieu_id = Column(Integer, ForeignKey('lieux.id'), nullable=True)
     document_id = Column(Integer, ForeignKey('documents.id'), nullable=True)
     ocr_result_id = Column(Integer, ForeignKey('ocr_results.id'), nullable=True)
+    fichier_sha256 = Column(String(64), ForeignKey('stored_files.sha256'), nullable=True, index=True)
 
     utilisateur = relationship("Utilisateur", back_populates="verifications")
     lieu = relationship("Lieu", back_populates="verifications")
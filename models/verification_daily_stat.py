@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime
+from config.database import db
+
+
+class VerificationDailyStat(db.Model):
+    """
+    Agrégat journalier des vérifications, par lieu et par résultat.
+    Tenu à jour à chaque vérification enregistrée (VerificationRollup.record)
+    et reconstructible depuis la table verifications (flask rebuild-verification-stats).
+    """
+    __tablename__ = "verification_daily_stats"
+
+    SANS_LIEU = 0        # vérification sans lieu (lieu_id NULL)
+    SANS_RESULTAT = ""   # resultat_donnee NULL
+
+    jour = Column(Date, primary_key=True)
+    lieu_id = Column(Integer, primary_key=True, autoincrement=False)
+    resultat_donnee = Column(String(50), primary_key=True)
+    nb_verifications = Column(Integer, nullable=False, default=0)
+    derniere_verification = Column(DateTime(timezone=True), nullable=True)
+
+    def to_dict(self):
+        return {
+            "jour": self.jour.isoformat() if self.jour else None,
+            "lieu_id": self.lieu_id or None,
+            "resultat_donnee": self.resultat_donnee or None,
+            "nb_verifications": self.nb_verifications,
+            "derniere_verification": self.derniere_verification.isoformat() if self.derniere_verification else None
+        }
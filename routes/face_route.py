@@ -1,5 +1,7 @@
 from flask import Blueprint
-from controllers.face_controller import recognize_face_api
+from controllers.face_controller import (
+    recognize_face_api, recognize_batch_api, enroll_face_api, delete_face_api, face_cache_stats_api
+)
 
 face_bp = Blueprint('face', __name__)
 
@@ -7,3 +9,18 @@ face_bp.route('/recognize', methods=['POST'])(
     recognize_face_api
 )
 
+face_bp.route('/recognize_batch', methods=['POST'])(
+    recognize_batch_api
+)
+
+face_bp.route('/enroll', methods=['POST'])(
+    enroll_face_api
+)
+
+face_bp.route('/cache/stats', methods=['GET'])(
+    face_cache_stats_api
+)
+
+face_bp.route('/<path:name>', methods=['DELETE'])(
+    delete_face_api
+)
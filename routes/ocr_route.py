@@ -16,3 +16,18 @@ ocr_bp.route("/list", methods=["GET"])(
 ocr_bp.route("/ocr_compare", methods=["POST"])(
     ocr_compare
 )
+
+
+ocr_bp.route("/stats", methods=["GET"])(
+    ocr_stats
+)
+
+
+ocr_bp.route("/jobs/<job_id>", methods=["GET"])(
+    get_ocr_job
+)
+
+
+ocr_bp.route("/annotated/<token>", methods=["GET"])(
+    get_annotated_image
+)
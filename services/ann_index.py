@@ -0,0 +1,140 @@
+import numpy as np
+
+
+class IVFFlatIndex:
+    """
+    Index ANN de type IVF-flat (NumPy uniquement).
+    - Les centroïdes grossiers sont appris par k-means sphérique sur les
+      embeddings pré-normalisés.
+    - Chaque vecteur est rangé dans la liste de son centroïde le plus proche.
+    - A la recherche, seules les `nprobe` listes les plus proches sont parcourues.
+    Plus nprobe est grand, meilleur est le rappel (et plus lente la requête).
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, nlist, nprobe=8):
+        self.nlist = int(nlist)
+        self.nprobe = int(nprobe)
+        self.centroids = None
+        self.order = None      # indices des vecteurs triés par liste
+        self.offsets = None    # début de chaque liste dans `order`
+        self.size = 0
+        self.fingerprint = None
+
+    @staticmethod
+    def default_nlist(size):
+        """Règle empirique : ~4·sqrt(N) listes."""
+        return max(1, int(4 * np.sqrt(size)))
+
+    def train(self, matrix, iterations=10, sample_size=None, seed=0):
+        """Apprend les centroïdes puis range tous les vecteurs dans leurs listes."""
+        rng = np.random.default_rng(seed)
+        n = len(matrix)
+        nlist = min(self.nlist, n)
+        sample_size = sample_size or min(n, max(64 * nlist, 10000))
+
+        sample_idx = rng.choice(n, size=min(sample_size, n), replace=False)
+        sample = np.asarray(matrix[sample_idx], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assign = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            # Réinitialiser les centroïdes vides sur des points au hasard
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.nlist = nlist
+        self._build_lists(matrix)
+        return self
+
+    def _build_lists(self, matrix):
+        assign = self._assign(matrix, self.centroids)
+        self.order = np.argsort(assign, kind="stable").astype(np.int64)
+        counts = np.bincount(assign, minlength=self.nlist)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.size = len(matrix)
+
+    @staticmethod
+    def _assign(matrix, centroids, chunk=65536):
+        """Affecte chaque vecteur au centroïde de plus grand produit scalaire."""
+        assign = np.empty(len(matrix), dtype=np.int64)
+        for start in range(0, len(matrix), chunk):
+            block = np.asarray(matrix[start:start + chunk], dtype=np.float32)
+            assign[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        return assign
+
+    def search(self, matrix, query, k, nprobe=None):
+        """
+        Renvoie les indices des k meilleurs candidats parmi les listes sondées,
+        triés par produit scalaire décroissant. `query` doit être normalisée.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.nlist:
+            probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probed = np.arange(self.nlist)
+
+        ids = np.concatenate([
+            self.order[self.offsets[c]:self.offsets[c + 1]] for c in probed
+        ])
+        if len(ids) == 0:
+            return ids
+
+        scores = matrix[ids] @ query
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return ids[top]
+
+    def _copy(self):
+        index = IVFFlatIndex(self.nlist, self.nprobe)
+        index.centroids = self.centroids
+        index.order = self.order
+        index.offsets = self.offsets
+        index.size = self.size
+        return index
+
+    def reassigned(self, matrix):
+        """Copie avec les mêmes centroïdes et des listes recalculées pour `matrix` (sans k-means)."""
+        index = self._copy()
+        index._build_lists(matrix)
+        return index
+
+    def save(self, path):
+        np.savez(
+            path,
+            version=self.FORMAT_VERSION,
+            nlist=self.nlist,
+            nprobe=self.nprobe,
+            centroids=self.centroids,
+            order=self.order,
+            offsets=self.offsets,
+            size=self.size,
+            fingerprint=self.fingerprint or "",
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != cls.FORMAT_VERSION:
+                raise ValueError(f"Version d'index non supportée: {int(data['version'])}")
+            index = cls(int(data["nlist"]), int(data["nprobe"]))
+            index.centroids = data["centroids"]
+            index.order = data["order"]
+            index.offsets = data["offsets"]
+            index.size = int(data["size"])
+            index.fingerprint = str(data["fingerprint"]) or None
+        return index
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
@@ -0,0 +1,109 @@
+"""
+Images annotées (bbox OCR dessinées) produites hors du chemin de la requête OCR.
+Par défaut le rendu est paresseux : le premier GET de l'URL annotée relit
+l'image d'origine, dessine les bbox stockées dans `OCRResult.bbox` et garde
+le JPEG sur disque pour les appels suivants. IDSECURITY_ANNOTATION_MODE=background
+rend en plus l'image dans un thread dès l'enregistrement du résultat OCR.
+Les JPEG sont rangés hors de public/ : aucune route statique ne les sert, seul
+le jeton signé de get_annotated_image y donne accès.
+"""
+import json
+import os
+import queue
+import threading
+import traceback
+
+import cv2
+
+from services.image_preprocessing import draw_annotations
+
+ANNOTATION_MODE = os.environ.get("IDSECURITY_ANNOTATION_MODE", "lazy").strip().lower()  # "lazy" | "background"
+ANNOTATION_FOLDER = "private/annotations"  # hors de public/ : servi uniquement par l'URL signée
+ANNOTATION_JPEG_QUALITY = 85
+ANNOTATION_QUEUE_SIZE = 100  # au-delà, le rendu est laissé au premier GET
+
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def _lock_for(ocr_id):
+    """Un verrou par résultat OCR : le worker et un GET concurrent ne rendent pas deux fois la même image."""
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(ocr_id, threading.Lock())
+
+
+class AnnotationService:
+
+    @staticmethod
+    def annotated_path(ocr_id):
+        return os.path.join(ANNOTATION_FOLDER, f"annotated_{ocr_id}.jpg")
+
+    @staticmethod
+    def render(ocr_id, image_path, results):
+        """
+        Rend et met en cache l'image annotée du résultat OCR `ocr_id` ;
+        ne fait rien si elle existe déjà. Renvoie le chemin du JPEG.
+        """
+        out_path = AnnotationService.annotated_path(ocr_id)
+        if os.path.exists(out_path):
+            return out_path
+
+        with _lock_for(ocr_id):
+            if not os.path.exists(out_path):
+                if isinstance(results, str):
+                    results = json.loads(results or "[]")
+                image = draw_annotations(image_path, results)
+                ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, ANNOTATION_JPEG_QUALITY])
+                if not ok:
+                    raise RuntimeError(f"Encodage JPEG impossible pour le résultat OCR {ocr_id}")
+
+                # Ecriture atomique : un GET concurrent ne lit jamais un fichier partiel
+                os.makedirs(ANNOTATION_FOLDER, exist_ok=True)
+                tmp_path = f"{out_path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(buffer.tobytes())
+                os.replace(tmp_path, out_path)
+
+        with _LOCKS_GUARD:
+            _LOCKS.pop(ocr_id, None)
+        return out_path
+
+    @staticmethod
+    def schedule(ocr_id, image_path, results):
+        """Après l'enregistrement d'un résultat OCR : rendu en arrière-plan si ce mode est activé."""
+        if ANNOTATION_MODE == "background":
+            ANNOTATION_WORKER.submit(ocr_id, image_path, results)
+
+
+class AnnotationWorker:
+    """Thread de rendu des images annotées, démarré au premier job."""
+
+    def __init__(self, maxsize=ANNOTATION_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, ocr_id, image_path, results):
+        self._start()
+        try:
+            self._queue.put_nowait((ocr_id, image_path, results))
+        except queue.Full:
+            print(f"[Annotations] file pleine, rendu du résultat {ocr_id} différé au premier GET")
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="annotations", daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            ocr_id, image_path, results = self._queue.get()
+            try:
+                AnnotationService.render(ocr_id, image_path, results)
+            except Exception:
+                traceback.print_exc()
+
+
+ANNOTATION_WORKER = AnnotationWorker()
@@ -0,0 +1,75 @@
+"""
+Benchmark de l'index IVF-flat contre la recherche exacte.
+Rapporte le recall@1 et la latence p50/p99 par requête sur des embeddings
+synthétiques (512 dimensions, comme Facenet512).
+
+Usage (depuis la racine du projet) : python -m services.bench_ann_index --sizes 10000 100000 1000000 --nprobe 8 16 32
+"""
+import argparse
+import time
+import numpy as np
+from .ann_index import IVFFlatIndex
+
+DIM = 512
+
+
+def synthetic_gallery(size, rng, n_clusters=1000):
+    """Embeddings groupés autour de centres aléatoires, normalisés L2."""
+    centers = rng.standard_normal((n_clusters, DIM)).astype(np.float32)
+    matrix = np.empty((size, DIM), dtype=np.float32)
+    for start in range(0, size, 100000):
+        stop = min(start + 100000, size)
+        labels = rng.integers(0, n_clusters, size=stop - start)
+        noise = rng.standard_normal((stop - start, DIM)).astype(np.float32)
+        matrix[start:stop] = centers[labels] + 0.6 * noise
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix
+
+
+def make_queries(matrix, n_queries, rng):
+    """Requêtes = visages connus légèrement bruités (nouvelle photo d'une même personne)."""
+    idx = rng.choice(len(matrix), size=n_queries, replace=False)
+    queries = matrix[idx] + 0.02 * rng.standard_normal((n_queries, DIM)).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def timed(fn, queries):
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latencies)
+
+
+def run(size, nprobes, n_queries, seed):
+    rng = np.random.default_rng(seed)
+    matrix = synthetic_gallery(size, rng)
+    queries = make_queries(matrix, n_queries, rng)
+
+    exact, exact_lat = timed(lambda q: int(np.argmax(matrix @ q)), queries)
+    print(f"\n=== {size} embeddings ===")
+    print(f"exact        p50={np.percentile(exact_lat, 50):8.3f} ms  "
+          f"p99={np.percentile(exact_lat, 99):8.3f} ms")
+
+    start = time.perf_counter()
+    index = IVFFlatIndex(IVFFlatIndex.default_nlist(size)).train(matrix)
+    print(f"train        {time.perf_counter() - start:.1f} s ({index.nlist} listes)")
+
+    for nprobe in nprobes:
+        approx, lat = timed(lambda q: index.search(matrix, q, 1, nprobe=nprobe), queries)
+        hits = sum(1 for a, e in zip(approx, exact) if len(a) and int(a[0]) == e)
+        print(f"nprobe={nprobe:<5} recall@1={hits / len(queries):.4f}  "
+              f"p50={np.percentile(lat, 50):8.3f} ms  p99={np.percentile(lat, 99):8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.nprobe, args.queries, args.seed)
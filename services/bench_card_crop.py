@@ -0,0 +1,90 @@
+"""
+Compare l'OCR avec et sans recadrage du document sur un jeu d'images.
+Pour chaque variante : latence moyenne / p90, nombre de textes, confiance moyenne,
+taux de documents détectés et, si un fichier d'étiquettes est fourni, la part
+des mots attendus retrouvés dans le texte OCR.
+
+Etiquettes (optionnel) : CSV `fichier;texte attendu` (ex: "cni_01.jpg;KOFFI AMA TG12345678").
+
+Usage (depuis la racine du projet) : python -m services.bench_card_crop public/uploads_mobile --labels labels.csv
+"""
+import argparse
+import csv
+import os
+import time
+
+from rapidfuzz import fuzz
+
+from .image_preprocessing import detect_card, load_image
+from .ocr_service import OCRService
+from .text_utils import clean_text_for_matching
+
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def load_labels(path):
+    if not path:
+        return {}
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row[0]: row[1] for row in csv.reader(f, delimiter=";") if len(row) >= 2}
+
+
+def word_recall(expected, text):
+    """Part des mots attendus présents (à une erreur OCR près) dans le texte lu."""
+    words = clean_text_for_matching(expected).split()
+    text = clean_text_for_matching(text)
+    if not words:
+        return None
+    return sum(1 for w in words if fuzz.partial_ratio(w, text) >= 85) / len(words)
+
+
+def summarize(name, rows):
+    latencies = sorted(r["ms"] for r in rows)
+    recalls = [r["recall"] for r in rows if r["recall"] is not None]
+    confidences = [r["confidence"] for r in rows if r["confidence"] is not None]
+    print(f"{name:<12} latence moy={sum(latencies) / len(latencies):8.1f} ms  "
+          f"p90={latencies[int(0.9 * (len(latencies) - 1))]:8.1f} ms  "
+          f"textes={sum(r['tokens'] for r in rows) / len(rows):5.1f}  "
+          f"confiance={(sum(confidences) / len(confidences)) if confidences else 0:.3f}  "
+          f"rappel mots={(sum(recalls) / len(recalls)) if recalls else float('nan'):.3f}")
+
+
+def run(directory, labels, langs):
+    files = sorted(f for f in os.listdir(directory) if f.lower().endswith(EXTENSIONS))
+    if not files:
+        print("Aucune image trouvée")
+        return
+
+    service = OCRService(langs=langs)
+    service.warm_up()
+    found = 0
+    rows = {"image entière": [], "recadrée": []}
+
+    for filename in files:
+        path = os.path.join(directory, filename)
+        found += detect_card(load_image(path)) is not None
+        for name, crop in (("image entière", False), ("recadrée", True)):
+            start = time.perf_counter()
+            results = service.process_image(path, preprocess=True, crop_document=crop)
+            elapsed = (time.perf_counter() - start) * 1000
+            text = " ".join(r["text"] for r in results)
+            rows[name].append({
+                "ms": elapsed,
+                "tokens": len(results),
+                "confidence": (sum(r["confidence"] for r in results) / len(results)) if results else None,
+                "recall": word_recall(labels[filename], text) if filename in labels else None,
+            })
+
+    print(f"{len(files)} images, document détecté sur {found} ({found / len(files):.0%})")
+    for name, variant_rows in rows.items():
+        summarize(name, variant_rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--labels")
+    parser.add_argument("--langs", nargs="+", default=["fr", "en"])
+    args = parser.parse_args()
+
+    run(args.directory, load_labels(args.labels), args.langs)
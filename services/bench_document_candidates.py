@@ -0,0 +1,125 @@
+"""
+Vérifie le rappel de l'index inversé (candidats) contre le scoring exhaustif
+sur un corpus synthétique de documents et de textes OCR bruités.
+Rapporte :
+- top1     : même meilleur document que le scoring exhaustif ;
+- rappel   : part des documents au-dessus du seuil (exhaustif) retrouvés via les candidats ;
+- vrai doc : le document réellement scanné figure parmi les candidats ;
+- latence p50/p99 des deux approches.
+
+Usage (depuis la racine du projet) : python -m services.bench_document_candidates --sizes 10000 100000 --candidates 50 200
+"""
+import argparse
+import random
+import time
+
+from .document_index import _Snapshot, _entry, score_documents
+from .text_utils import clean_text_for_matching
+
+SYLLABES = ["KO", "FI", "AM", "ADJ", "MEN", "SA", "GBE", "TO", "DZI", "NYA", "KPA", "LA",
+            "SE", "WO", "DO", "MI", "AKU", "YAO", "EDE", "BLA", "NOU", "TCHA", "KA", "RI"]
+NATIONALITES = ["TOGOLAISE", "BENINOISE", "GHANEENNE", "IVOIRIENNE", "FRANCAISE"]
+# Confusions OCR fréquentes
+CONFUSIONS = {"O": "0", "0": "O", "I": "1", "1": "I", "S": "5", "5": "S", "B": "8", "8": "B", "E": "F", "N": "M"}
+
+
+def synthetic_documents(size, rng):
+    docs = []
+    for doc_id in range(1, size + 1):
+        docs.append({
+            "id": doc_id,
+            "numero_document": f"TG{rng.randrange(10 ** 8):08d}",
+            "nom": "".join(rng.choice(SYLLABES) for _ in range(rng.randint(2, 4))),
+            "prenom": " ".join(
+                "".join(rng.choice(SYLLABES) for _ in range(rng.randint(2, 3)))
+                for _ in range(rng.randint(1, 2))
+            ),
+            "nationalite": rng.choice(NATIONALITES),
+            "date_de_naissance": f"{rng.randint(1950, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "date_d_expiration": f"{rng.randint(2025, 2035)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "sexe": rng.choice(["M", "F"]),
+        })
+    return docs
+
+
+def noisy(text, rng, rate):
+    """Substitutions (confusions OCR) et suppressions de caractères."""
+    out = []
+    for char in text:
+        roll = rng.random()
+        if roll < rate / 2:
+            continue
+        if roll < rate and char in CONFUSIONS:
+            char = CONFUSIONS[char]
+        out.append(char)
+    return "".join(out)
+
+
+def scanned_text(doc, rng, rate):
+    lines = [
+        "REPUBLIQUE TOGOLAISE", "CARTE NATIONALE D IDENTITE",
+        f"NOM {doc['nom']}", f"PRENOMS {doc['prenom']}",
+        f"NE LE {doc['date_de_naissance']}", f"NATIONALITE {doc['nationalite']}",
+        f"N {doc['numero_document']}", f"EXPIRE LE {doc['date_d_expiration']}",
+    ]
+    return clean_text_for_matching(noisy(" ".join(lines), rng, rate))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def run(size, limits, n_queries, rate, threshold, seed):
+    rng = random.Random(seed)
+    docs = synthetic_documents(size, rng)
+
+    start = time.perf_counter()
+    snapshot = _Snapshot.build({doc["id"]: _entry(doc) for doc in docs})
+    print(f"\n=== {size} documents ===")
+    print(f"index        {time.perf_counter() - start:.1f} s ({len(snapshot.postings)} grammes)")
+
+    queries = [(doc["id"], scanned_text(doc, rng, rate)) for doc in rng.sample(docs, n_queries)]
+    entries = list(snapshot.entries.values())
+
+    exhaustive, exact_lat = [], []
+    for _, text in queries:
+        start = time.perf_counter()
+        exhaustive.append(score_documents(text, entries, threshold))
+        exact_lat.append((time.perf_counter() - start) * 1000)
+    print(f"exhaustif    p50={percentile(exact_lat, 50):9.2f} ms  p99={percentile(exact_lat, 99):9.2f} ms")
+
+    for limit in limits:
+        top1 = found = expected = true_doc = 0
+        latencies = []
+        for (doc_id, text), reference in zip(queries, exhaustive):
+            start = time.perf_counter()
+            candidates = snapshot.candidates(text, limit)
+            matches = score_documents(text, candidates, threshold)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            true_doc += any(c["id"] == doc_id for c in candidates)
+            reference_ids = {m["document_id"] for m in reference}
+            expected += len(reference_ids)
+            found += len(reference_ids & {m["document_id"] for m in matches})
+            if not reference or (matches and matches[0]["document_id"] == reference[0]["document_id"]):
+                top1 += 1
+
+        recall = found / expected if expected else 1.0
+        print(f"limit={limit:<6} top1={top1 / n_queries:.4f}  rappel={recall:.4f}  "
+              f"vrai doc={true_doc / n_queries:.4f}  "
+              f"p50={percentile(latencies, 50):9.2f} ms  p99={percentile(latencies, 99):9.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.08, help="taux de bruit OCR par caractère")
+    parser.add_argument("--threshold", type=float, default=70.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.candidates, args.queries, args.noise, args.threshold, args.seed)
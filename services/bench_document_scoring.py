@@ -0,0 +1,91 @@
+"""
+Benchmark du scoring pondéré des documents : boucle Python (un appel
+token_set_ratio par document et par champ) contre rapidfuzz.process.cdist
+par champ + réduction NumPy. Vérifie au passage que les résultats classés
+(scores_detail compris) sont identiques.
+
+Usage (depuis la racine du projet) : python -m services.bench_document_scoring --sizes 10000 100000 1000000 --queries 5
+"""
+import argparse
+import random
+import time
+
+from rapidfuzz import fuzz
+
+from .bench_document_candidates import scanned_text, synthetic_documents
+from .document_index import FIELD_WEIGHTS, _entry, score_documents
+from .text_utils import contains_digits
+
+
+def score_documents_loop(text_norm, docs, threshold=70.0):
+    """Implémentation de référence (boucle champ par champ)."""
+    results = []
+    for doc in docs:
+        total_score = 0.0
+        total_weight = 0.0
+        scores_detail = {}
+
+        for field, weight in FIELD_WEIGHTS.items():
+            val_norm = doc["norm"].get(field)
+            if val_norm is None:
+                continue
+            if "date" in field and not contains_digits(text_norm):
+                continue
+
+            score = fuzz.token_set_ratio(text_norm, val_norm)
+            scores_detail[field] = score
+            total_score += score * weight
+            total_weight += weight
+
+        global_score = (total_score / total_weight) if total_weight else 0.0
+        if global_score >= threshold:
+            results.append({
+                "document_id": doc["id"],
+                "numero_document": doc["numero_document"],
+                "nom": doc["nom"],
+                "prenom": doc["prenom"],
+                "sexe": doc.get("sexe"),
+                "scores_detail": scores_detail,
+                "global_similarity_score": round(global_score, 2)
+            })
+
+    results.sort(key=lambda x: x["global_similarity_score"], reverse=True)
+    return results
+
+
+def timed(fn, queries):
+    outputs, latencies = [], []
+    for text in queries:
+        start = time.perf_counter()
+        outputs.append(fn(text))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return outputs, sorted(latencies)
+
+
+def run(size, n_queries, threshold, workers, seed):
+    rng = random.Random(seed)
+    raw_docs = synthetic_documents(size, rng)
+    docs = [_entry(doc) for doc in raw_docs]
+    queries = [scanned_text(doc, rng, 0.08) for doc in rng.sample(raw_docs, n_queries)]
+    print(f"\n=== {size} documents ===")
+
+    reference, loop_lat = timed(lambda text: score_documents_loop(text, docs, threshold), queries)
+    vectorized, cdist_lat = timed(lambda text: score_documents(text, docs, threshold, workers=workers), queries)
+
+    for name, latencies in (("boucle", loop_lat), ("cdist", cdist_lat)):
+        print(f"{name:<8} p50={latencies[len(latencies) // 2]:10.1f} ms  max={latencies[-1]:10.1f} ms")
+    print(f"résultats identiques : {reference == vectorized} "
+          f"({sum(len(r) for r in reference)} correspondances)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=70.0)
+    parser.add_argument("--workers", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.queries, args.threshold, args.workers, args.seed)
@@ -0,0 +1,57 @@
+"""
+Mesure du démarrage à froid et de la mémoire par worker : pickle vs memmap.
+Chaque mesure tourne dans un processus neuf (comme un worker gunicorn).
+RssAnon = mémoire privée du worker, RssFile = pages partagées du page cache.
+
+Usage (depuis la racine du projet) : python -m services.bench_embedding_store --workers 4
+"""
+import argparse
+import subprocess
+import sys
+from .convert_embeddings import EMBS_PATH, STORE_PATH
+
+CHILD = r"""
+import pickle, sys, time
+import numpy as np
+mode, path = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+if mode == "pickle":
+    with open(path, "rb") as f:
+        embs = pickle.load(f)
+    matrix = np.asarray(list(embs.values()), dtype=np.float32)
+else:
+    from services.embedding_store import load_gallery
+    matrix = load_gallery(path).matrix
+# Une recherche complète pour toucher toutes les pages
+scores = matrix @ np.ones(matrix.shape[1], dtype=np.float32)
+elapsed = time.perf_counter() - start
+status = {}
+for line in open("/proc/self/status"):
+    key, _, value = line.partition(":")
+    status[key] = value.split()[0] if value.split() else "0"
+print(f"{elapsed:.3f}", status["VmRSS"], status["RssAnon"], status["RssFile"])
+"""
+
+
+def measure(mode, path, workers):
+    procs = [
+        subprocess.Popen([sys.executable, "-c", CHILD, mode, path], stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    print(f"\n=== {mode} ({workers} workers) ===")
+    print(f"{'démarrage (s)':>14} {'VmRSS (kB)':>12} {'RssAnon (kB)':>13} {'RssFile (kB)':>13}")
+    for proc in procs:
+        out, _ = proc.communicate()
+        elapsed, rss, anon, shared = out.split()
+        print(f"{elapsed:>14} {rss:>12} {anon:>13} {shared:>13}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--pkl", default=EMBS_PATH)
+    parser.add_argument("--store", default=STORE_PATH)
+    args = parser.parse_args()
+
+    measure("pickle", args.pkl, args.workers)
+    measure("memmap", args.store, args.workers)
@@ -0,0 +1,57 @@
+"""
+Débit de /recognize_batch comparé à des appels séquentiels à recognize_face.
+
+Usage (depuis la racine du projet) :
+    python -m services.bench_face_batch --images public/uploads --batch-sizes 1 8 32
+"""
+import argparse
+import os
+import time
+from .face_service import recognize_face, recognize_faces_batch, load_embeddings
+
+
+def load_images(directory, count):
+    files = sorted(f for f in os.listdir(directory) if f.lower().endswith((".jpg", ".jpeg", ".png")))
+    if not files:
+        raise SystemExit(f"Aucune image dans {directory}")
+    images = []
+    while len(images) < count:
+        for f in files[:count - len(images)]:
+            with open(os.path.join(directory, f), "rb") as fh:
+                images.append(fh.read())
+    return images
+
+
+def bench(images, batch_size, rounds):
+    batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for image in images:
+            recognize_face(image)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for batch in batches:
+            recognize_faces_batch(batch)
+    batched = time.perf_counter() - start
+
+    n = len(images) * rounds
+    print(f"batch={batch_size:<3} séquentiel {n / sequential:7.2f} img/s | "
+          f"batch {n / batched:7.2f} img/s | gain x{sequential / batched:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", default="public/uploads")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    load_embeddings()
+    images = load_images(args.images, max(args.batch_sizes))
+    # Préchauffage des modèles (YOLOv8 + Facenet512)
+    recognize_faces_batch(images[:1])
+    for batch_size in args.batch_sizes:
+        bench(images[:batch_size], batch_size, args.rounds)
@@ -0,0 +1,63 @@
+"""
+Temps de démarrage du processus API mesuré avec `python -X importtime`.
+Compare un worker complet (modèles importés à la demande puis préchauffés)
+et un worker API-only (IDSECURITY_API_ONLY=1, ni easyocr ni deepface).
+
+Usage (depuis la racine du projet) : python -m services.bench_startup --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+RSS = "import resource; print('MAXRSS', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+# Worker complet : coût payé autrefois à l'import (services modèles chargés d'emblée)
+CHILD_FULL = ("import app; from services.model_registry import get_face_service, get_ocr_service; "
+              "get_face_service(); get_ocr_service(); " + RSS)
+CHILD_API_ONLY = "import app; " + RSS
+HEAVY_MODULES = ("easyocr", "deepface", "tensorflow", "torch")
+
+
+def parse_importtime(stderr):
+    """Renvoie [(cumul_us, module)] à partir de la sortie -X importtime."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    return rows
+
+
+def measure(label, api_only, top):
+    env = dict(os.environ, IDSECURITY_API_ONLY="1" if api_only else "0")
+    start = time.perf_counter()
+    child = CHILD_API_ONLY if api_only else CHILD_FULL
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", child],
+                          env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+
+    rows = parse_importtime(proc.stderr)
+    app_row = next((us for us, name in rows if name == "app"), None)
+    maxrss = next((line.split()[1] for line in proc.stdout.splitlines() if line.startswith("MAXRSS")), "?")
+    heavy = sorted({name.split(".")[0] for _, name in rows if name.split(".")[0] in HEAVY_MODULES})
+
+    print(f"\n=== {label} ===")
+    print(f"import app : {app_row / 1e6:.2f} s" if app_row else "import app : échec")
+    print(f"processus  : {wall:.2f} s, maxrss {maxrss} kB")
+    print(f"modèles importés : {', '.join(heavy) or 'aucun'}")
+    print(f"top {top} imports (cumulé) :")
+    for us, name in sorted((r for r in rows if "." not in r[1]), reverse=True)[:top]:
+        print(f"  {us / 1e6:8.3f} s  {name}")
+    if proc.returncode != 0:
+        print(proc.stderr.splitlines()[-1] if proc.stderr else "erreur inconnue")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    measure("worker complet", api_only=False, top=args.top)
+    measure("worker API-only", api_only=True, top=args.top)
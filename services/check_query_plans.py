@@ -0,0 +1,182 @@
+"""
+Vérifie que les requêtes des tableaux de bord utilisent les index de
+verifications / notifications au lieu d'un parcours complet de table.
+
+Une base SQLite en mémoire (mêmes modèles et mêmes index que MySQL) est
+remplie de données synthétiques, puis les vraies méthodes de service sont
+appelées : chaque requête SQL émise est passée à EXPLAIN QUERY PLAN et le
+script échoue (code 1) si l'une d'elles fait un SCAN d'une table surveillée.
+
+Usage (depuis la racine du projet) : python -m services.check_query_plans --rows 20000
+"""
+import argparse
+import random
+import re
+import sys
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token, verify_jwt_in_request
+from sqlalchemy import event, text
+
+from config.database import db
+
+WATCHED_TABLES = ("verifications", "notifications")
+_RE_SCAN = re.compile(r"^SCAN (%s)\b" % "|".join(WATCHED_TABLES))
+
+
+def full_scans(statement, plan):
+    """
+    Etapes SCAN d'une table surveillée. Un parcours d'index dans l'ordre, sans
+    filtre et borné par LIMIT (première page d'une liste) n'en est pas un.
+    """
+    bounded_walk = " WHERE " not in statement and re.search(r"\bLIMIT\b", statement)
+    return [detail for detail in plan
+            if _RE_SCAN.match(detail) and not (bounded_walk and "USING INDEX" in detail)]
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["JWT_SECRET_KEY"] = "check-query-plans"
+    db.init_app(app)
+    JWTManager(app)
+    return app
+
+
+def import_models():
+    """Tous les modèles, pour que create_all crée les tables et leurs index."""
+    import models.document, models.lieu, models.notification, models.ocr_job, models.ocr_result  # noqa: F401
+    import models.role, models.stored_file, models.type_document, models.utilisateur  # noqa: F401
+    import models.verification, models.verification_daily_stat  # noqa: F401
+
+
+def seed(rows, rng):
+    from models.lieu import Lieu
+    from models.notification import Notification
+    from models.utilisateur import Utilisateur
+    from models.verification import Verification
+    from services.verification_rollup import VerificationRollup
+
+    now = datetime.now()
+    for i in range(1, 21):
+        db.session.add(Lieu(id=i, nom=f"Lieu {i}"))
+    for i in range(1, 51):
+        db.session.add(Utilisateur(id=i, nom=f"Nom {i}", prenom=f"Prenom {i}", email=f"user{i}@example.com",
+                                   mot_passe="x", lieu_id=rng.randint(1, 20)))
+    db.session.bulk_insert_mappings(Verification, [{
+        "utilisateur_id": rng.randint(1, 50),
+        "lieu_id": rng.choice([None] + list(range(1, 21))),
+        "resultat_donnee": rng.choice(["OK", "ECHEC", "EXTERNE"]),
+        "resultat_photo": "NON_VERIFIE",
+        "date_verification": now - timedelta(minutes=rng.randint(0, 400 * 24 * 60)),
+    } for _ in range(rows)])
+    db.session.bulk_insert_mappings(Notification, [{
+        "utilisateur_id": rng.randint(1, 50),
+        "titre": "Alerte",
+        "message": "Message",
+        "type": "info",
+        "est_lu": rng.random() < 0.8,
+        "date_creation": now - timedelta(minutes=rng.randint(0, 400 * 24 * 60)),
+    } for _ in range(rows // 4)])
+    db.session.commit()
+    VerificationRollup.rebuild()
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+
+
+def list_page(service, **filters):
+    """Deuxième page de la liste paginée (requête avec curseur)."""
+    _, cursor = service.list_verifications(**filters)
+    return service.list_verifications(cursor=cursor, **filters)
+
+
+def dashboard_queries():
+    """(nom, fonction) : requêtes réellement émises par les services et contrôleurs."""
+    from controllers.ocr_controller import list_externes
+    from services.notification_service import NotificationService
+    from services.verification_service import VerificationService
+
+    today = datetime.now().date()
+    start = (today - timedelta(days=20)).isoformat()
+    queries = []
+    for periode in (None, "today", "yesterday", "week", "month"):
+        queries += [
+            (f"stat periode={periode}", lambda p=periode: VerificationService.get_statistiques_verifications(p)),
+            (f"stat/lieu periode={periode}", lambda p=periode: VerificationService.get_stats_verifications_par_lieu(p, None, True)),
+        ]
+    queries += [
+        ("stat/custom", lambda: VerificationService.get_statistiques_verifications_custom(start, today.isoformat())),
+        ("stat/lieu/custom", lambda: VerificationService.get_stats_verifications_par_lieu_custom(start, today.isoformat())),
+        ("dernieres_verifications week", lambda: VerificationService.get_dernieres_verifications("week")),
+        ("dernieres_verifications/custom", lambda: VerificationService.get_dernieres_verifications_custom(start, today.isoformat())),
+        ("export week", lambda: VerificationService.get_verifications_for_export("week")),
+        ("mes_verifications", VerificationService.get_user_verifications),
+        ("liste page 2", lambda: list_page(VerificationService)),
+        ("liste lieu page 2", lambda: list_page(VerificationService, lieu_id=3)),
+        ("liste résultat page 2", lambda: list_page(VerificationService, resultat_donnee="ECHEC")),
+        ("mes_verifications page 2", lambda: list_page(VerificationService, utilisateur_id=7)),
+        ("liste lieu + période", lambda: list_page(
+            VerificationService, lieu_id=3, date_range=VerificationService.resolve_date_range("month"))),
+        ("ocr/list (list_externes)", list_externes.__wrapped__),
+        ("notifications", lambda: NotificationService.get_notifications_utilisateur(7)),
+        ("notifications non lues", lambda: NotificationService.get_notifications_utilisateur(7, True)),
+        ("compteur non lues", lambda: NotificationService.compter_notifications_non_lues(7)),
+        ("tout marquer comme lu", lambda: NotificationService.marquer_toutes_comme_lues(7)),
+    ]
+    return queries
+
+
+def explain(statement, parameters):
+    connection = db.session.connection().connection
+    cursor = connection.cursor()
+    cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return [row[-1] for row in cursor.fetchall()]
+
+
+def run(rows, seed_value, verbose):
+    app = create_app()
+    rng = random.Random(seed_value)
+    failures = 0
+
+    with app.app_context():
+        import_models()
+        db.create_all()
+        seed(rows, rng)
+
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if any(table in statement for table in WATCHED_TABLES) and not statement.lstrip().upper().startswith("INSERT"):
+                statements.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", capture)
+        token = create_access_token(identity="7")
+
+        for name, query in dashboard_queries():
+            statements.clear()
+            with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+                verify_jwt_in_request()
+                query()
+            plans = [(statement, explain(statement, parameters)) for statement, parameters in statements]
+            scans = [detail for statement, plan in plans for detail in full_scans(statement, plan)]
+            failures += bool(scans)
+            print(f"{'ÉCHEC' if scans else 'ok':<6} {name}")
+            for statement, plan in plans:
+                if verbose or full_scans(statement, plan):
+                    print("       " + " ".join(statement.split())[:160])
+                    for detail in plan:
+                        print(f"         {detail}")
+
+    print(f"\n{failures} requête(s) avec parcours complet de table")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    sys.exit(1 if run(args.rows, args.seed, args.verbose) else 0)
@@ -0,0 +1,37 @@
+"""
+Conversion unique du pickle d'embeddings vers le format binaire memmap.
+
+Usage (depuis la racine du projet) : python -m services.convert_embeddings
+"""
+import argparse
+import os
+import pickle
+import numpy as np
+from .embedding_store import write_store, load_gallery
+
+EMBS_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "public", "embeddings"))
+EMBS_PATH = os.path.join(EMBS_DIR, "embs_facenet512.pkl")
+STORE_PATH = os.path.join(EMBS_DIR, "embs_facenet512.bin")
+
+
+def convert(pkl_path=EMBS_PATH, store_path=STORE_PATH):
+    with open(pkl_path, "rb") as file:
+        embs = pickle.load(file)
+
+    names = list(embs.keys())
+    write_store(store_path, names, [embs[name] for name in names])
+
+    # Vérification : mêmes noms, mêmes vecteurs
+    gallery = load_gallery(store_path)
+    assert list(gallery.names) == names
+    for i, name in enumerate(names):
+        assert np.array_equal(np.asarray(gallery.raw[i], dtype=np.float64), np.asarray(embs[name]))
+    print(f"✔️ {len(names)} embeddings convertis : {store_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pkl", default=EMBS_PATH)
+    parser.add_argument("--out", default=STORE_PATH)
+    args = parser.parse_args()
+    convert(args.pkl, args.out)
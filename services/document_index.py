@@ -0,0 +1,307 @@
+"""
+Index en mémoire des documents pour le fuzzy matching OCR.
+Les champs sont normalisés (clean_text_for_matching) une seule fois au chargement,
+puis tenus à jour par les hooks de DocumentService (création, mise à jour,
+suppression, import). Un fichier de version partagé permet aux autres processus
+de détecter qu'un index est périmé et de le recharger.
+
+Un index inversé (mots entiers + trigrammes de caractères de nom, prénom et
+numéro de document) fournit une courte liste de candidats à partir du texte OCR :
+seuls ces candidats passent par le scoring pondéré complet.
+Aucune dépendance modèle (easyocr, deepface) : utilisable sur un worker API-only.
+"""
+import math
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from sqlalchemy import select
+
+from .text_utils import clean_text_for_matching, contains_digits
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VERSION_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "public", "index", "documents.version"))
+
+# Champ -> poids dans le score global
+FIELD_WEIGHTS = {
+    "numero_document": 2,
+    "nom": 3,
+    "prenom": 3,
+    "nationalite": 1,
+    "date_de_naissance": 1,
+    "date_d_expiration": 1
+}
+MATCH_FIELDS = tuple(FIELD_WEIGHTS)
+INDEXED_FIELDS = ("nom", "prenom", "numero_document")
+
+MAX_CANDIDATES = 200       # plafond de candidats envoyés au scoring complet
+MAX_GRAM_DF = 0.05         # grammes présents dans plus de 5% des documents ignorés (peu discriminants)
+TOKEN_WEIGHT = 3.0         # un mot entier commun compte plus qu'un trigramme
+SCORE_WORKERS = -1         # threads rapidfuzz pour le scoring (-1 = tous les cœurs)
+
+
+def _entry(doc):
+    """Entrée d'index : champs affichés + champs de matching déjà normalisés."""
+    get = doc.get if isinstance(doc, dict) else lambda field: getattr(doc, field, None)
+    norm = {}
+    for field in MATCH_FIELDS:
+        val = get(field)
+        if val:
+            norm[field] = clean_text_for_matching(str(val))
+    return {
+        "id": get("id"),
+        "numero_document": get("numero_document"),
+        "nom": get("nom"),
+        "prenom": get("prenom"),
+        "sexe": get("sexe"),
+        "norm": norm,
+    }
+
+
+def _grams(text):
+    """Mots (2 caractères et plus) et trigrammes de caractères d'un texte normalisé."""
+    grams = set()
+    for token in text.split():
+        if len(token) < 2:
+            continue
+        grams.add(token)
+        padded = f" {token} "
+        grams.update("#" + padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _entry_grams(entry):
+    grams = set()
+    for field in INDEXED_FIELDS:
+        if field in entry["norm"]:
+            grams |= _grams(entry["norm"][field])
+    return grams
+
+
+def score_documents(text_norm, docs, threshold=70.0, workers=SCORE_WORKERS):
+    """
+    Score pondéré (token_set_ratio par champ) du texte OCR contre chaque document.
+    Un appel rapidfuzz.process.cdist par champ (multithreadé), puis somme pondérée
+    et seuil en NumPy. Les champs absents d'un document ne comptent ni dans le
+    score ni dans le poids.
+    """
+    if not docs:
+        return []
+    has_digits = contains_digits(text_norm)
+    total_score = np.zeros(len(docs))
+    total_weight = np.zeros(len(docs))
+    field_scores = {}
+
+    for field, weight in FIELD_WEIGHTS.items():
+        if "date" in field and not has_digits:
+            continue
+
+        values = [doc["norm"].get(field) for doc in docs]
+        present = np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+        if not present.any():
+            continue
+
+        scores = process.cdist(
+            [text_norm],
+            [v if v is not None else "" for v in values],
+            scorer=fuzz.token_set_ratio,
+            dtype=np.float64,
+            workers=workers,
+        )[0]
+        # Même ordre d'accumulation que la boucle champ par champ : sommes identiques
+        total_score += np.where(present, scores * weight, 0.0)
+        total_weight += np.where(present, weight, 0)
+        field_scores[field] = (scores, present)
+
+    global_scores = np.divide(total_score, total_weight, out=np.zeros(len(docs)), where=total_weight > 0)
+
+    results = []
+    for i in np.flatnonzero(global_scores >= threshold):
+        doc = docs[i]
+        results.append({
+            "document_id": doc["id"],
+            "numero_document": doc["numero_document"],
+            "nom": doc["nom"],
+            "prenom": doc["prenom"],
+            "sexe": doc.get("sexe"),
+            "scores_detail": {
+                field: float(scores[i]) for field, (scores, present) in field_scores.items() if present[i]
+            },
+            "global_similarity_score": round(float(global_scores[i]), 2)
+        })
+
+    results.sort(key=lambda x: x["global_similarity_score"], reverse=True)
+    return results
+
+
+class _Snapshot:
+    """Etat immuable de l'index : entrées par id + listes inversées gramme -> ids."""
+
+    def __init__(self, entries, postings):
+        self.entries = entries
+        self.postings = postings
+
+    @classmethod
+    def build(cls, entries):
+        postings = defaultdict(set)
+        for doc_id, entry in entries.items():
+            for gram in _entry_grams(entry):
+                postings[gram].add(doc_id)
+        return cls(entries, dict(postings))
+
+    def replace(self, doc_id, entry=None):
+        """Copie avec le document `doc_id` remplacé (ou supprimé si entry est None)."""
+        entries = dict(self.entries)
+        postings = dict(self.postings)
+        old = entries.pop(doc_id, None)
+        if old is not None:
+            for gram in _entry_grams(old):
+                ids = postings[gram] - {doc_id}
+                if ids:
+                    postings[gram] = ids
+                else:
+                    del postings[gram]
+        if entry is not None:
+            entries[doc_id] = entry
+            for gram in _entry_grams(entry):
+                postings[gram] = postings.get(gram, frozenset()) | {doc_id}
+        return _Snapshot(entries, postings)
+
+    def candidates(self, text_norm, limit):
+        """
+        Documents partageant le plus de grammes (pondérés par leur idf) avec le texte OCR.
+        Si l'index contient moins de `limit` documents, tous sont renvoyés.
+        """
+        n = len(self.entries)
+        if n <= limit:
+            return list(self.entries.values())
+
+        max_df = max(limit, int(n * MAX_GRAM_DF))
+        scores = defaultdict(float)
+        for gram in _grams(text_norm):
+            ids = self.postings.get(gram)
+            if not ids or len(ids) > max_df:
+                continue
+            weight = math.log(n / len(ids))
+            if not gram.startswith("#"):
+                weight *= TOKEN_WEIGHT
+            for doc_id in ids:
+                scores[doc_id] += weight
+
+        best = sorted(scores, key=scores.get, reverse=True)[:limit]
+        return [self.entries[doc_id] for doc_id in best]
+
+
+class DocumentIndex:
+    """
+    Documents indexés par id. Les lectures se font sur un instantané immuable
+    remplacé en bloc à chaque modification (copy-on-write), sans verrou.
+    """
+
+    def __init__(self, version_path=VERSION_PATH):
+        self.version_path = version_path
+        self.version = None       # version du fichier partagé au moment du chargement
+        self.loaded_at = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _read_version(self):
+        try:
+            with open(self.version_path, "r") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _bump_version(self):
+        """Publie une nouvelle version (écriture atomique) et la retient comme courante."""
+        version = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(os.path.dirname(self.version_path), exist_ok=True)
+        tmp_path = f"{self.version_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(version)
+        os.replace(tmp_path, self.version_path)
+        self.version = version
+
+    def _drop_if_stale(self):
+        # Ne pas appliquer un changement local sur un index déjà périmé : il serait
+        # ensuite marqué à jour alors qu'il manque les modifications des autres processus
+        if self._read_version() != self.version:
+            self._snapshot = None
+
+    def is_stale(self):
+        return self._snapshot is None or self._read_version() != self.version
+
+    def load(self, db, DocumentModel):
+        """Charge tous les documents (un seul SELECT) et les normalise."""
+        with self._lock:
+            # Lire la version avant les lignes : une écriture concurrente rendra l'index périmé
+            version = self._read_version()
+            rows = db.session.execute(
+                select(
+                    DocumentModel.id,
+                    DocumentModel.numero_document,
+                    DocumentModel.nom,
+                    DocumentModel.prenom,
+                    DocumentModel.nationalite,
+                    DocumentModel.date_de_naissance,
+                    DocumentModel.date_d_expiration,
+                    DocumentModel.sexe
+                )
+            ).all()
+            self._snapshot = _Snapshot.build({r.id: _entry(r._asdict()) for r in rows})
+            self.version = version
+            self.loaded_at = time.time()
+            print(f"[DocumentIndex] {len(self._snapshot.entries)} documents indexés (version={version})")
+            return self._snapshot
+
+    def _current(self, db, DocumentModel):
+        """Instantané courant, rechargé si un autre processus a modifié les documents."""
+        snapshot = self._snapshot
+        if snapshot is None or self._read_version() != self.version:
+            snapshot = self.load(db, DocumentModel)
+        return snapshot
+
+    def documents(self, db, DocumentModel):
+        """Toutes les entrées de l'index."""
+        return list(self._current(db, DocumentModel).entries.values())
+
+    def candidates(self, text_norm, db, DocumentModel, limit=MAX_CANDIDATES):
+        """Au plus `limit` entrées proches du texte OCR (normalisé), via l'index inversé."""
+        return self._current(db, DocumentModel).candidates(text_norm, limit)
+
+    def upsert(self, document):
+        """Hook création / mise à jour d'un document (après commit)."""
+        with self._lock:
+            self._drop_if_stale()
+            if self._snapshot is not None:
+                self._snapshot = self._snapshot.replace(document.id, _entry(document))
+            self._bump_version()
+
+    def remove(self, document_id):
+        """Hook suppression d'un document (après commit)."""
+        with self._lock:
+            self._drop_if_stale()
+            if self._snapshot is not None:
+                self._snapshot = self._snapshot.replace(document_id)
+            self._bump_version()
+
+    def invalidate(self):
+        """Modification en masse (import) : rechargement complet au prochain matching."""
+        with self._lock:
+            self._snapshot = None
+            self._bump_version()
+
+    def stats(self):
+        return {
+            "size": len(self._snapshot.entries) if self._snapshot is not None else None,
+            "grams": len(self._snapshot.postings) if self._snapshot is not None else None,
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+        }
+
+
+DOCUMENT_INDEX = DocumentIndex()
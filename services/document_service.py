@@ -1,16 +1,25 @@
 from models.document import Document
 from config.database import db
+from services.document_index import DOCUMENT_INDEX
+from services.file_storage import FileStorage
+from contextlib import contextmanager
 from datetime import datetime
 import base64
-import uuid
-import os
+import threading
+
+# Hooks d'index suspendus pendant un import en masse (par thread de requête)
+_BULK_IMPORT = threading.local()
+
+
+def _index_upsert(document):
+    if not getattr(_BULK_IMPORT, "active", False):
+        DOCUMENT_INDEX.upsert(document)
+
 
 class DocumentService:
-    UPLOAD_FOLDER = 'public/uploads'
-    
     @staticmethod
     def save_base64_image(base64_string):
-        """Sauvegarde une image base64 et retourne le chemin relatif"""
+        """Sauvegarde une image base64 (stockage par contenu) et retourne le StoredFile"""
         try:
             
             if not base64_string or not isinstance(base64_string, str):
@@ -36,21 +45,8 @@ class DocumentService:
                 data = base64_string
                 file_extension = 'png'  # extension par défaut
             
-            # Créer le dossier s'il n'existe pas
-            os.makedirs(DocumentService.UPLOAD_FOLDER, exist_ok=True)
-            
-            # Générer un nom de fichier unique
-            filename = f"{uuid.uuid4()}.{file_extension}"
-            filepath = os.path.join(DocumentService.UPLOAD_FOLDER, filename)
-            
-            # Décoder et sauvegarder l'image
-            with open(filepath, 'wb') as f:
-                f.write(base64.b64decode(data))
-            
-            # Retourner uniquement le chemin relatif
-            chemin_web = f"/api/uploads/{filename}"
-            
-            return chemin_web
+            # Décoder et sauvegarder l'image (une image déjà reçue n'est pas réécrite)
+            return FileStorage.save_bytes(base64.b64decode(data), file_extension)
             
         except Exception as e:
             print(f"Erreur sauvegarde image: {e}")
@@ -66,11 +62,13 @@ class DocumentService:
                     organisme_delivrance, info_nfc, type_document_id):
         
         # Sauvegarder l'image si c'est base64
+        fichier_sha256 = None
         if chemin_image and isinstance(chemin_image, str) and (chemin_image.startswith('data:image') or len(chemin_image) > 1000):
             # Si c'est une string longue, c'est probablement base64
-            saved_image_path = DocumentService.save_base64_image(chemin_image)
-            if saved_image_path:
-                chemin_image = saved_image_path  # Utiliser le chemin du fichier sauvegardé
+            stored = DocumentService.save_base64_image(chemin_image)
+            if stored:
+                chemin_image = FileStorage.web_path(stored)  # Utiliser le chemin du fichier sauvegardé
+                fichier_sha256 = stored.sha256
             else:
                 chemin_image = None
         elif chemin_image and isinstance(chemin_image, str) and chemin_image.startswith('http'):
@@ -133,12 +131,15 @@ class DocumentService:
             domicile=domicile or '',
             organisme_delivrance=organisme_delivrance or '',
             info_nfc=info_nfc or '',
-            type_document_id=type_document_id
+            type_document_id=type_document_id,
+            fichier_sha256=fichier_sha256
         )
         
         try:
             db.session.add(document)
+            FileStorage.acquire(fichier_sha256)
             db.session.commit()
+            _index_upsert(document)
             return document
         except Exception as e:
             db.session.rollback()
@@ -172,16 +173,21 @@ class DocumentService:
             return None
 
         # Si une nouvelle image est fournie en base64
+        fichier_sha256 = document.fichier_sha256
         if chemin_image and isinstance(chemin_image, str) and (chemin_image.startswith('data:image') or len(chemin_image) > 1000):
-            saved_image_path = DocumentService.save_base64_image(chemin_image)
-            if saved_image_path:
-                chemin_image = saved_image_path
+            stored = DocumentService.save_base64_image(chemin_image)
+            if stored:
+                chemin_image = FileStorage.web_path(stored)
+                fichier_sha256 = stored.sha256
             else:
                 # Garder l'ancienne image si la nouvelle échoue
                 chemin_image = document.chemin_image
         elif chemin_image == '' or chemin_image is None:
             # Si l'image est vide, garder l'ancienne
             chemin_image = document.chemin_image
+        elif chemin_image != document.chemin_image:
+            # URL ou chemin externe : l'image stockée n'est plus référencée
+            fichier_sha256 = None
         
         # Même logique de parsing de dates que dans creer_document
         def parse_date(date_value):
@@ -214,9 +220,14 @@ class DocumentService:
         document.organisme_delivrance = organisme_delivrance or document.organisme_delivrance
         document.info_nfc = info_nfc or document.info_nfc
         document.type_document_id = type_document_id or document.type_document_id
+        if fichier_sha256 != document.fichier_sha256:
+            FileStorage.release(document.fichier_sha256)
+            FileStorage.acquire(fichier_sha256)
+            document.fichier_sha256 = fichier_sha256
 
         try:
             db.session.commit()
+            _index_upsert(document)
             return document
         except Exception as e:
             db.session.rollback()
@@ -226,5 +237,32 @@ class DocumentService:
     @staticmethod
     def delete_document(id):
         document = Document.query.get(id)
+        FileStorage.release(document.fichier_sha256)
         db.session.delete(document)
-        db.session.commit()
\ No newline at end of file
+        db.session.commit()
+        DOCUMENT_INDEX.remove(id)
+
+    @staticmethod
+    @contextmanager
+    def import_en_masse():
+        """
+        Bloc d'import en masse : creer_document / update_document ne mettent plus
+        l'index à jour ligne par ligne (chaque mise à jour recopie tout l'index).
+        En fin de bloc, valider_import() recharge l'index une seule fois ; en cas
+        d'erreur, l'index est seulement invalidé (les créations sont déjà validées).
+        """
+        _BULK_IMPORT.active = True
+        try:
+            yield
+        except Exception:
+            _BULK_IMPORT.active = False
+            DOCUMENT_INDEX.invalidate()
+            raise
+        _BULK_IMPORT.active = False
+        DocumentService.valider_import()
+
+    @staticmethod
+    def valider_import():
+        """Valide les mises à jour d'un import en masse et fait recharger l'index de matching."""
+        db.session.commit()
+        DOCUMENT_INDEX.invalidate()
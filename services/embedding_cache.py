@@ -0,0 +1,73 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class EmbeddingCache:
+    """
+    Cache LRU borné avec TTL, indexé par une empreinte rapide des octets de l'image.
+    Sert à ne pas recalculer détection + embedding quand un client mobile
+    renvoie la même image après un timeout. Thread-safe.
+    """
+
+    def __init__(self, max_entries=512, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # clé -> (expiration, valeur)
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    @staticmethod
+    def key(image_data, variant=""):
+        """Empreinte blake2b (128 bits) du contenu, suffixée par la variante de traitement."""
+        return f"{hashlib.blake2b(image_data, digest_size=16).hexdigest()}:{variant}"
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self._counters["misses"] += 1
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def record(self, counter):
+        """Incrémente un compteur libre (ex: réutilisation du résultat de matching)."""
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else None,
+            }
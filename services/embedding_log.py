@@ -0,0 +1,77 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+
+
+class EmbeddingLog:
+    """
+    Journal append-only des modifications de la galerie (une ligne JSON par opération) :
+        {"op": "add", "name": ..., "embedding": [...]}
+        {"op": "delete", "name": ...}
+    Rejouer le journal est idempotent : pour un nom donné seule la dernière
+    opération compte. Un verrou fcntl sérialise les écritures entre workers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+
+    @contextmanager
+    def locked(self):
+        """Verrou exclusif inter-processus (enrôlement, suppression, compaction)."""
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, op, name, embedding=None):
+        """Ajoute une opération au journal (à appeler sous `locked()`)."""
+        entry = {"op": op, "name": name}
+        if embedding is not None:
+            entry["embedding"] = [float(v) for v in embedding]
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def read(self, offset=0):
+        """
+        Lit les opérations à partir de `offset` (octets).
+        Renvoie (operations, nouvel_offset) ; une ligne incomplète n'est pas consommée.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], 0
+
+        end = data.rfind(b"\n") + 1
+        entries = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        return entries, offset + end
+
+    def truncate(self, offset):
+        """Supprime les opérations déjà compactées (les `offset` premiers octets)."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                tail = f.read()
+        except FileNotFoundError:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,114 @@
+"""
+Format binaire de la galerie d'embeddings (partagé entre workers via np.memmap).
+
+    [en-tête 64 octets]
+        magic "IDSEMB\\0\\0" | version u32 | dim u32 | count u64
+        raw_offset u64 | norm_offset u64 | names_offset u64 | names_size u64
+    [bloc raw]    float32 C-contigu (count, dim) : embeddings bruts
+    [bloc norm]   float32 C-contigu (count, dim) : embeddings normalisés L2
+    [table noms]  offsets u64 (count + 1) puis noms UTF-8 concaténés
+
+Les embeddings Facenet512 sortent du modèle en float32 : le bloc raw est donc
+une copie sans perte des listes du pickle.
+"""
+import os
+import struct
+import numpy as np
+from .face_gallery import FaceGallery, l2_normalize_rows
+
+
+MAGIC = b"IDSEMB\0\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQQQ")
+HEADER_SIZE = 64
+ALIGN = 64
+
+
+def _align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_store(path, names, vectors):
+    """Ecrit la galerie au format binaire (écriture atomique via fichier temporaire)."""
+    raw = np.ascontiguousarray(vectors, dtype=np.float32)
+    count = len(names)
+    if count == 0:
+        raw = raw.reshape(0, 0)
+    dim = raw.shape[1] if raw.ndim == 2 else 0
+    norm = np.ascontiguousarray(l2_normalize_rows(raw), dtype=np.float32)
+
+    encoded = [str(name).encode("utf-8") for name in names]
+    name_offsets = np.zeros(count + 1, dtype=np.uint64)
+    name_offsets[1:] = np.cumsum([len(e) for e in encoded]) if encoded else []
+    names_blob = name_offsets.tobytes() + b"".join(encoded)
+
+    raw_offset = _align(HEADER_SIZE)
+    norm_offset = _align(raw_offset + raw.nbytes)
+    names_offset = _align(norm_offset + norm.nbytes)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        header = HEADER.pack(MAGIC, VERSION, dim, count, raw_offset, norm_offset,
+                             names_offset, len(names_blob))
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        for offset, block in ((raw_offset, raw.tobytes()),
+                              (norm_offset, norm.tobytes()),
+                              (names_offset, names_blob)):
+            f.seek(offset)
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        data = f.read(HEADER.size)
+    magic, version, dim, count, raw_offset, norm_offset, names_offset, names_size = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError(f"Fichier d'embeddings invalide: {path}")
+    if version != VERSION:
+        raise ValueError(f"Version de format non supportée: {version}")
+    return {
+        "dim": dim,
+        "count": count,
+        "raw_offset": raw_offset,
+        "norm_offset": norm_offset,
+        "names_offset": names_offset,
+        "names_size": names_size,
+    }
+
+
+def store_stamp(path, header):
+    """Identité du store pour FaceGallery.fingerprint : en-tête, taille et mtime, sans lire les vecteurs."""
+    stat = os.stat(path)
+    fields = ",".join(f"{key}={header[key]}" for key in sorted(header))
+    return f"{VERSION}:{fields}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def load_gallery(path):
+    """
+    Ouvre la galerie en lecture seule avec np.memmap : les blocs de vecteurs
+    restent dans le page cache et sont partagés entre les processus.
+    """
+    header = read_header(path)
+    count, dim = header["count"], header["dim"]
+    stamp = store_stamp(path, header)
+    if count == 0:
+        return FaceGallery.from_embeddings({}, stamp)
+
+    raw = np.memmap(path, dtype=np.float32, mode="r",
+                    offset=header["raw_offset"], shape=(count, dim))
+    norm = np.memmap(path, dtype=np.float32, mode="r",
+                     offset=header["norm_offset"], shape=(count, dim))
+
+    with open(path, "rb") as f:
+        f.seek(header["names_offset"])
+        blob = f.read(header["names_size"])
+    offsets = np.frombuffer(blob, dtype=np.uint64, count=count + 1)
+    base = offsets.nbytes
+    names = np.array(
+        [blob[base + int(offsets[i]):base + int(offsets[i + 1])].decode("utf-8") for i in range(count)],
+        dtype=object,
+    )
+    return FaceGallery(names, norm, raw, stamp)
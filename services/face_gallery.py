@@ -0,0 +1,251 @@
+import hashlib
+import itertools
+import numpy as np
+
+
+# Chaque galerie publiée reçoit un numéro de version distinct
+_VERSIONS = itertools.count(1)
+
+
+def find_distance(a, b, metric):
+    """
+    Distances de deepface (verification.find_distance) recalculées en NumPy :
+    importer deepface ici chargerait TensorFlow dans le processus API.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if metric == "cosine":
+        return 1 - float(np.dot(a, b)) / (np.linalg.norm(a) * np.linalg.norm(b))
+    if metric == "euclidean":
+        return float(np.linalg.norm(a - b))
+    if metric == "euclidean_l2":
+        return float(np.linalg.norm(a / np.linalg.norm(a) - b / np.linalg.norm(b)))
+    raise ValueError(f"Métrique de distance inconnue : {metric}")
+
+
+class FaceGallery:
+    """
+    Galerie des visages connus sous forme matricielle.
+    - names : tableau des noms (même ordre que les lignes de la matrice)
+    - matrix : embeddings float32 contigus, pré-normalisés L2
+    """
+
+    # Nombre de candidats re-scorés avec find_distance pour garantir
+    # le même résultat que la boucle euclidean_l2 d'origine.
+    RERANK_K = 8
+
+    def __init__(self, names, matrix, raw=None, stamp=None):
+        self.names = names
+        self.matrix = matrix
+        self.raw = raw if raw is not None else matrix
+        self.stamp = stamp   # identité du fichier source (en-tête, taille, mtime), voir fingerprint()
+        self.index = None
+        self.version = next(_VERSIONS)
+        self._positions = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_embeddings(cls, embeddings, stamp=None):
+        """Construit la galerie à partir du dict {nom: embedding}."""
+        names = np.array(list(embeddings.keys()), dtype=object)
+        if len(names) == 0:
+            return cls(names, np.empty((0, 0), dtype=np.float32), stamp=stamp)
+
+        raw = np.ascontiguousarray(list(embeddings.values()), dtype=np.float64)
+        matrix = np.ascontiguousarray(l2_normalize_rows(raw), dtype=np.float32)
+        return cls(names, matrix, raw, stamp)
+
+    def __len__(self):
+        return len(self.names)
+
+    def fingerprint(self):
+        """
+        Empreinte des noms (ordre compris) et du fichier source (stamp) pour valider
+        un index persisté : un store réécrit avec les mêmes noms mais des vecteurs
+        recalculés (réenrôlement, conversion) change de taille ou de mtime et invalide
+        l'index, sans relire les vecteurs à chaque démarrage. Calculée une fois.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            for name in self.names:
+                digest.update(str(name).encode("utf-8"))
+                digest.update(b"\0")
+            self._fingerprint = f"{len(self.names)}:{digest.hexdigest()}"
+            if self.stamp is not None:
+                self._fingerprint += f":{self.stamp}"
+        return self._fingerprint
+
+    def position(self, name):
+        """Indice de la ligne du visage `name`, ou None (table nom -> ligne construite au premier appel)."""
+        if self._positions is None:
+            positions = {}
+            for i, known in enumerate(self.names):
+                positions.setdefault(known, i)
+            self._positions = positions
+        return self._positions.get(name)
+
+    def attach_index(self, index):
+        """Branche un index ANN (ex: IVFFlatIndex) utilisé par candidates()."""
+        self.index = index
+
+    def candidates(self, query, k, removed=None):
+        """
+        Renvoie les indices des k lignes les plus proches (euclidean_l2),
+        via un seul produit matriciel : d² = 2 - 2·cos.
+        `removed` : masque des lignes à ignorer (visages supprimés depuis le chargement).
+        """
+        q = l2_normalize_rows(np.asarray(query, dtype=np.float32)[None, :])[0]
+        if self.index is not None:
+            extra = int(removed.sum()) if removed is not None else 0
+            ids = self.index.search(self.matrix, q, k + extra)
+            return ids[~removed[ids]][:k] if extra else ids
+
+        scores = np.asarray(self.matrix @ q)
+        if removed is not None:
+            scores[removed] = -np.inf
+        k = min(k, len(scores))
+        if k == len(scores):
+            top = np.arange(len(scores))
+        else:
+            top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return top[~removed[top]] if removed is not None else top
+
+    def rerank(self, query, indices, metric):
+        """
+        Recalcule la distance exacte (find_distance) sur les candidats.
+        En cas d'égalité, l'indice le plus petit l'emporte, comme la boucle d'origine.
+        """
+        best_idx, best_dist = None, float("inf")
+        for idx in sorted(int(i) for i in indices):
+            # float64 comme les listes Python du pickle d'origine
+            dst = find_distance(query, np.asarray(self.raw[idx], dtype=np.float64), metric)
+            if dst < best_dist:
+                best_dist = dst
+                best_idx = idx
+        return best_idx, best_dist
+
+    def candidates_batch(self, queries, k, removed=None):
+        """Version batch de candidates() : un seul produit matriciel pour toutes les requêtes."""
+        if self.index is not None:
+            return [self.candidates(q, k, removed) for q in queries]
+
+        q = l2_normalize_rows(np.asarray(queries, dtype=np.float32))
+        scores = np.asarray(q @ self.matrix.T)
+        if removed is not None:
+            scores[:, removed] = -np.inf
+        k = min(k, scores.shape[1])
+        if k == scores.shape[1]:
+            top = np.broadcast_to(np.arange(k), scores.shape)
+        else:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        ordered = [row_top[np.argsort(-row_scores[row_top], kind="stable")]
+                   for row_top, row_scores in zip(top, scores)]
+        if removed is not None:
+            ordered = [row[~removed[row]] for row in ordered]
+        return ordered
+
+    def search_batch(self, queries, metric, k=None, removed=None):
+        """Renvoie [(nom, distance), ...] dans l'ordre des requêtes."""
+        if len(self) == 0:
+            return [("Inconnu", float("inf")) for _ in queries]
+        if len(queries) == 0:
+            return []
+
+        results = []
+        for query, indices in zip(queries, self.candidates_batch(queries, k or self.RERANK_K, removed)):
+            best_idx, best_dist = self.rerank(query, indices, metric)
+            results.append(("Inconnu", float("inf")) if best_idx is None else (self.names[best_idx], best_dist))
+        return results
+
+    def search(self, query, metric, k=None):
+        """Renvoie (nom, distance) du visage le plus proche."""
+        if len(self) == 0:
+            return "Inconnu", float("inf")
+
+        indices = self.candidates(query, k or self.RERANK_K)
+        best_idx, best_dist = self.rerank(query, indices, metric)
+        if best_idx is None:
+            return "Inconnu", float("inf")
+        return self.names[best_idx], best_dist
+
+
+class OverlayGallery:
+    """
+    Galerie de base (memmap du store, partagée entre processus et jamais copiée)
+    plus les opérations du journal appliquées depuis le chargement :
+    - `removed` : masque des lignes de base supprimées ou remplacées ;
+    - `delta`   : petite FaceGallery en RAM des visages ajoutés (recherche exacte).
+    Les recherches parcourent la base et le delta puis gardent le plus proche.
+    Comme FaceGallery, une instance n'est jamais modifiée : apply() en renvoie une nouvelle.
+    """
+
+    def __init__(self, base, removed=None, delta=None):
+        self.base = base
+        self.removed = removed
+        self.delta = delta if delta is not None else FaceGallery.from_embeddings({})
+        self.version = next(_VERSIONS)
+
+    def __len__(self):
+        removed = int(self.removed.sum()) if self.removed is not None else 0
+        return len(self.base) - removed + len(self.delta)
+
+    def __contains__(self, name):
+        if self.delta.position(name) is not None:
+            return True
+        pos = self.base.position(name)
+        return pos is not None and (self.removed is None or not self.removed[pos])
+
+    def apply(self, entries):
+        """
+        Nouvelle galerie avec les entrées du journal ({op, name, embedding}) appliquées
+        en une fois : seuls le masque et le delta sont reconstruits, pas la base.
+        """
+        if not entries:
+            return self
+        removed = self.removed.copy() if self.removed is not None else np.zeros(len(self.base), dtype=bool)
+        added = {name: self.delta.raw[i] for i, name in enumerate(self.delta.names)}
+        for entry in entries:
+            name = entry["name"]
+            pos = self.base.position(name)
+            if pos is not None:
+                removed[pos] = True
+            # Un visage remplacé passe en fin de galerie, comme avant
+            added.pop(name, None)
+            if entry["op"] == "add":
+                added[name] = entry["embedding"]
+        return OverlayGallery(
+            self.base,
+            removed if removed.any() else None,
+            FaceGallery.from_embeddings({name: np.asarray(emb, dtype=np.float64).tolist()
+                                         for name, emb in added.items()}),
+        )
+
+    def rows(self):
+        """(noms, embeddings bruts) de la galerie complète, pour la compaction du store."""
+        keep = ~self.removed if self.removed is not None else slice(None)
+        names = list(self.base.names[keep]) + list(self.delta.names)
+        parts = [np.asarray(self.base.raw[keep], dtype=np.float32)] if len(self.base) else []
+        if len(self.delta):
+            parts.append(np.asarray(self.delta.raw, dtype=np.float32))
+        return names, np.vstack(parts) if parts else np.empty((0, 0), dtype=np.float32)
+
+    def search_batch(self, queries, metric, k=None):
+        """Renvoie [(nom, distance), ...] dans l'ordre des requêtes."""
+        results = self.base.search_batch(queries, metric, k, self.removed)
+        if len(self.delta) == 0:
+            return results
+        # A distance égale, la base l'emporte (lignes ajoutées en fin de galerie)
+        return [found if found[1] < best[1] else best
+                for best, found in zip(results, self.delta.search_batch(queries, metric, k))]
+
+    def search(self, query, metric, k=None):
+        """Renvoie (nom, distance) du visage le plus proche."""
+        return self.search_batch([query], metric, k)[0]
+
+
+def l2_normalize_rows(matrix):
+    """Normalise chaque ligne (norme L2), les lignes nulles restent nulles."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
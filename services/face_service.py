@@ -2,139 +2,618 @@
 import cv2
 import pickle
 import numpy as np
-from deepface import DeepFace
-from deepface.modules.verification import find_distance
 from PIL import Image
 import io
 import os
+import threading
+from .face_gallery import FaceGallery, OverlayGallery
+from .ann_index import IVFFlatIndex
+from .embedding_store import load_gallery, write_store
+from .embedding_log import EmbeddingLog
+from .embedding_cache import EmbeddingCache
+from .inference_pool import InferenceUnavailableError
 
 # Configuration
 MODEL_NAME = "Facenet512"
 METRIC = "euclidean_l2"
 THRESHOLD = 0.78
 
+# Index ANN (IVF-flat) : recherche exacte en dessous de ANN_MIN_GALLERY_SIZE
+ANN_MIN_GALLERY_SIZE = 50000
+ANN_NLIST = None   # None -> IVFFlatIndex.default_nlist(taille galerie)
+ANN_NPROBE = 16
+
+# Nombre maximum d'images par appel à /recognize_batch
+MAX_BATCH_SIZE = 32
+
+# Mode multi-visages : visages ignorés en dessous de ces seuils
+MIN_FACE_SIZE = 40
+MIN_FACE_CONFIDENCE = 0.5
+
+# Cache détection + embeddings par empreinte d'image (retries des clients mobiles)
+FACE_CACHE_SIZE = 512
+FACE_CACHE_TTL = 600   # secondes
+
+# Journal des enrôlements : compaction en arrière-plan au-delà de cette taille
+COMPACT_LOG_BYTES = 1024 * 1024
+
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 EMBS_PATH = os.path.join(BASE_DIR, "..", "public", "embeddings", "embs_facenet512.pkl")
 EMBS_PATH = os.path.abspath(EMBS_PATH)
+STORE_PATH = os.path.splitext(EMBS_PATH)[0] + ".bin"
+INDEX_PATH = os.path.splitext(EMBS_PATH)[0] + ".ivf.npz"
+LOG_PATH = os.path.splitext(EMBS_PATH)[0] + ".log"
+
+
+# Galerie chargée par le processus API seulement (load_embeddings au préchauffage, ou
+# sync_gallery au premier appel), jamais à l'import : les processus du pool n'en ont pas besoin.
+GALLERY = OverlayGallery(FaceGallery.from_embeddings({}))
+EMBEDDING_LOG = EmbeddingLog(LOG_PATH)
+FACE_CACHE = EmbeddingCache(max_entries=FACE_CACHE_SIZE, ttl=FACE_CACHE_TTL)
+
+# Etat de synchronisation avec le disque (store binaire + journal)
+_STATE_LOCK = threading.Lock()   # sérialise les écritures de GALLERY dans ce processus
+_STAMPS = (None, None)           # (inode/mtime du store, inode du journal) au dernier chargement
+_LOG_OFFSET = 0                  # octets du journal déjà appliqués
+_COMPACTION = None
+
+# Calculs modèle (détection + embeddings) : dans ce processus par défaut, ou envoyés au
+# pool d'inférence (set_compute, voir model_registry). Galerie, journal et cache restent
+# ici : un seul cache par processus API, partagé par tous les processus du pool.
+_COMPUTE = None
+
+def set_compute(compute):
+    """compute(nom_fonction, *args) exécute une fonction modèle de ce module ailleurs (pool)."""
+    global _COMPUTE
+    _COMPUTE = compute
+
+def _compute(name, *args):
+    if _COMPUTE is None:
+        return globals()[name](*args)
+    return _COMPUTE(name, *args)
+
+def _deepface():
+    """DeepFace (et TensorFlow) importé au premier calcul : inutile au processus API avec un pool."""
+    from deepface import DeepFace
+    return DeepFace
+
+def _file_stat(path):
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+def _current_stamps():
+    store, log = _file_stat(STORE_PATH), _file_stat(LOG_PATH)
+    return (
+        (store.st_ino, store.st_mtime_ns) if store else None,
+        log.st_ino if log else None,
+    ), (log.st_size if log else 0)
 
+def _read_gallery():
+    """Ouvre la galerie binaire (memmap) si elle existe, sinon le pickle d'origine."""
+    if os.path.exists(STORE_PATH):
+        return load_gallery(STORE_PATH)
+    if os.path.exists(EMBS_PATH):
+        stat = os.stat(EMBS_PATH)
+        with open(EMBS_PATH, "rb") as file:
+            return FaceGallery.from_embeddings(pickle.load(file), f"pickle:{stat.st_size}:{stat.st_mtime_ns}")
+    if EMBEDDING_LOG.size():
+        # Galerie construite uniquement par enrôlements en ligne
+        return FaceGallery.from_embeddings({})
+    raise FileNotFoundError(EMBS_PATH)
 
-EMBEDDINGS = {}
+def _reload_gallery():
+    """
+    Relit la base puis rejoue tout le journal (sous _STATE_LOCK). La base (memmap)
+    n'est jamais recopiée : le journal s'applique en un masque + un petit delta en RAM.
+    """
+    global GALLERY, _STAMPS, _LOG_OFFSET
+    stamps, _ = _current_stamps()
+    gallery = _read_gallery()
+    load_ann_index(gallery)
+    entries, offset = EMBEDDING_LOG.read(0)
+    GALLERY = OverlayGallery(gallery).apply(entries)
+    _STAMPS, _LOG_OFFSET = stamps, offset
+
+def _catch_up():
+    """Applique les opérations écrites par les autres workers (sous _STATE_LOCK)."""
+    global GALLERY, _LOG_OFFSET
+    stamps, log_size = _current_stamps()
+    if stamps != _STAMPS:
+        # Le store a été compacté ou le journal remplacé : rechargement complet
+        _reload_gallery()
+    elif log_size > _LOG_OFFSET:
+        entries, offset = EMBEDDING_LOG.read(_LOG_OFFSET)
+        GALLERY = GALLERY.apply(entries)
+        _LOG_OFFSET = offset
+
+def sync_gallery():
+    """
+    Met à jour la galerie si le disque a changé. Ne bloque jamais :
+    si une écriture est en cours, la recherche utilise la galerie courante.
+    """
+    stamps, log_size = _current_stamps()
+    if stamps == _STAMPS and log_size <= _LOG_OFFSET:
+        return
+    if not _STATE_LOCK.acquire(blocking=False):
+        return
+    try:
+        _catch_up()
+    except Exception as e:
+        print(f"[Service] Erreur lors de la synchronisation des embeddings: {str(e)}")
+    finally:
+        _STATE_LOCK.release()
 
 def load_embeddings():
-    """Charge les embeddings depuis le fichier pickle."""
-    global EMBEDDINGS
-    if not EMBEDDINGS:
+    """Charge les embeddings (format binaire memmap, ou pickle à défaut) et rejoue le journal."""
+    global GALLERY
+    if len(GALLERY) == 0:
         try:
-            with open(EMBS_PATH, "rb") as file:
-                EMBEDDINGS = pickle.load(file)
-                print(f"[Service] Embeddings chargés : {len(EMBEDDINGS)} visages connus.")
-                return True
+            with _STATE_LOCK:
+                _reload_gallery()
+            print(f"[Service] Embeddings chargés : {len(GALLERY)} visages connus.")
+            return True
         except FileNotFoundError:
             print("[Service] Erreur : Fichier d'embeddings introuvable.")
-            EMBEDDINGS = {}
+            GALLERY = OverlayGallery(FaceGallery.from_embeddings({}))
             return False
         except Exception as e:
             print(f"[Service] Erreur lors du chargement des embeddings: {str(e)}")
-            EMBEDDINGS = {}
+            GALLERY = OverlayGallery(FaceGallery.from_embeddings({}))
             return False
 
+def _commit_operation(op, name, embedding=None):
+    """
+    Journalise l'opération puis remplace la galerie en mémoire.
+    La nouvelle galerie est construite à part puis publiée par une seule
+    affectation : les /recognize en cours gardent l'ancienne.
+    """
+    global GALLERY, _LOG_OFFSET
+    with _STATE_LOCK, EMBEDDING_LOG.locked():
+        _catch_up()
+        EMBEDDING_LOG.append(op, name, embedding)
+        entries, offset = EMBEDDING_LOG.read(_LOG_OFFSET)
+        GALLERY = GALLERY.apply(entries)
+        _LOG_OFFSET = offset
+    _maybe_compact()
+
+def _maybe_compact():
+    global _COMPACTION
+    if EMBEDDING_LOG.size() < COMPACT_LOG_BYTES:
+        return
+    if _COMPACTION is not None and _COMPACTION.is_alive():
+        return
+    _COMPACTION = threading.Thread(target=compact_embeddings, daemon=True)
+    _COMPACTION.start()
+
+def compact_embeddings():
+    """Réécrit le store binaire avec la galerie courante puis vide le journal."""
+    try:
+        with _STATE_LOCK, EMBEDDING_LOG.locked():
+            _catch_up()
+            gallery = GALLERY
+            write_store(STORE_PATH, *gallery.rows())
+            if gallery.base.index is not None:
+                # Mêmes centroïdes, listes recalculées sur le store compacté (pas de k-means)
+                compacted = load_gallery(STORE_PATH)
+                index = gallery.base.index.reassigned(compacted.matrix)
+                index.fingerprint = compacted.fingerprint()
+                index.save(INDEX_PATH)
+            EMBEDDING_LOG.truncate(_LOG_OFFSET)
+            _reload_gallery()
+        print(f"[Service] Galerie compactée : {len(GALLERY)} visages connus.")
+    except Exception as e:
+        print(f"[Service] Erreur lors de la compaction des embeddings: {str(e)}")
+
+def load_ann_index(gallery):
+    """
+    Branche l'index IVF-flat sur la galerie si elle dépasse ANN_MIN_GALLERY_SIZE.
+    L'index persisté à côté du pickle est réutilisé s'il correspond à la galerie,
+    sinon il est ré-entraîné puis sauvegardé.
+    """
+    if len(gallery) < ANN_MIN_GALLERY_SIZE:
+        gallery.attach_index(None)
+        return None
+
+    fingerprint = gallery.fingerprint()
+    index = None
+    if os.path.exists(INDEX_PATH):
+        try:
+            index = IVFFlatIndex.load(INDEX_PATH)
+            if index.fingerprint != fingerprint:
+                print("[Service] Index ANN obsolète, ré-entraînement.")
+                index = None
+        except Exception as e:
+            print(f"[Service] Erreur lors du chargement de l'index ANN: {str(e)}")
+            index = None
+
+    if index is None:
+        nlist = ANN_NLIST or IVFFlatIndex.default_nlist(len(gallery))
+        index = IVFFlatIndex(nlist, nprobe=ANN_NPROBE).train(gallery.matrix)
+        index.fingerprint = fingerprint
+        try:
+            index.save(INDEX_PATH)
+        except OSError as e:
+            print(f"[Service] Impossible de sauvegarder l'index ANN: {str(e)}")
+
+    index.nprobe = ANN_NPROBE
+    gallery.attach_index(index)
+    print(f"[Service] Index ANN actif : {index.nlist} listes, nprobe={index.nprobe}.")
+    return index
+
 def clahe(image):
     """Applique l'égalisation d'histogramme CLAHE."""
     clahe_obj = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
     return clahe_obj.apply(image)
 
-def recognize_face(image_data):
+def _decode_image(image_data):
+    """Convertit les octets reçus en image OpenCV (BGR)."""
+    img = Image.open(io.BytesIO(image_data)).convert('RGB')
+    frame = np.array(img)
+    return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+
+def _preprocess_face(frame, facial_area):
+    """Recadrage, redimensionnement 224x224 et CLAHE -> visage RGB pour Facenet512."""
+    x, y, w, h = facial_area["x"], facial_area["y"], facial_area["w"], facial_area["h"]
+    cropped_face = frame[y:y + h, x:x + w]
+    cropped_resized = cv2.resize(cropped_face, (224, 224))
+    gray_face = cv2.cvtColor(cropped_resized, cv2.COLOR_BGR2GRAY)
+    clahe_face = clahe(gray_face)
+    return cv2.cvtColor(clahe_face, cv2.COLOR_GRAY2RGB)
+
+def _represent(rgb_face):
+    """Calcule l'embedding Facenet512 d'un visage prétraité (None en cas d'échec)."""
+    emb_result = _deepface().represent(
+        rgb_face,
+        model_name=MODEL_NAME,
+        enforce_detection=False,
+        detector_backend="skip",
+    )
+    return emb_result[0]["embedding"] if emb_result else None
+
+def _represent_batch(rgb_faces):
+    """
+    Calcule les embeddings de plusieurs visages en une seule passe Facenet512.
+    Reprend le prétraitement de DeepFace.represent (detector_backend="skip") :
+    normalisation [0, 1], RGB -> BGR, redimensionnement à l'entrée du modèle.
+    """
+    if not rgb_faces:
+        return []
+
+    from deepface.modules import preprocessing
+    model = _deepface().build_model(MODEL_NAME)
+    target_size = model.input_shape
+    batch = []
+    for face in rgb_faces:
+        img = face.astype(np.float32) / 255.0 if face.max() > 1 else face
+        img = img[:, :, ::-1]
+        img = preprocessing.resize_image(img=img, target_size=(target_size[1], target_size[0]))
+        batch.append(img)
+
+    embeddings = model.model(np.concatenate(batch, axis=0), training=False).numpy()
+    return [emb.tolist() for emb in embeddings]
+
+def warm_up_models():
+    """Construit YOLOv8 et Facenet512 puis lance une inférence factice (simple et batch)."""
+    dummy = np.zeros((224, 224, 3), dtype=np.uint8)
+    _deepface().extract_faces(dummy, detector_backend="yolov8", enforce_detection=False)
+    _represent(dummy)
+    _represent_batch([dummy])
+
+def _prediction(match_name, min_dist, faces_detected):
+    """Réponse de reconnaissance (seuil appliqué) pour un visage comparé à la galerie."""
+    if min_dist > THRESHOLD:
+        match_name = "Inconnu"
+
+    return {
+        "prediction": match_name,
+        "distance": round(min_dist, 4),
+        "threshold": THRESHOLD,
+        "metric": METRIC,
+        "status": "success",
+        "faces_detected": faces_detected
+    }
+
+def _keep_face(detection, min_face_size, min_confidence):
+    """Filtre les petits visages d'arrière-plan et les détections peu fiables."""
+    facial_area = detection.get("facial_area") or {}
+    if not facial_area:
+        return False
+    if min(facial_area.get("w", 0), facial_area.get("h", 0)) < min_face_size:
+        return False
+    return detection.get("confidence", 0) >= min_confidence
+
+def _analysis(faces_detected, detections=(), embeddings=(), message=None):
+    """Résultat détection + embeddings d'une image (ce qui est mis en cache)."""
+    return {
+        "faces_detected": faces_detected,
+        "faces": [
+            {"facial_area": d["facial_area"], "confidence": d.get("confidence"), "embedding": emb}
+            for d, emb in zip(detections, embeddings)
+        ],
+        "message": message,
+    }
+
+def _detect(frame, multi_face, min_face_size, min_confidence):
+    """
+    Détection YOLOv8 et sélection des visages à encoder.
+    Renvoie (visages retenus, nb visages détectés, message si aucun visage exploitable).
+    """
+    results = _deepface().extract_faces(
+        frame, detector_backend="yolov8", enforce_detection=False
+    )
+    if not results:
+        return [], 0, "Aucun visage détecté"
+
+    if multi_face:
+        kept = [d for d in results if _keep_face(d, min_face_size, min_confidence)]
+        if not kept:
+            return [], len(results), "Aucun visage exploitable (taille ou confiance insuffisante)"
+        return kept, len(results), None
+
+    # Traiter le premier visage détecté
+    if not results[0].get("facial_area", {}):
+        return [], len(results), "Visage détecté mais zone faciale non trouvée"
+    return results[:1], len(results), None
+
+def _analyze_image(image_data, multi_face, min_face_size, min_confidence):
+    """Décodage, détection, prétraitement et embeddings d'une image (sans la galerie)."""
+    frame = _decode_image(image_data)
+    kept, faces_detected, message = _detect(frame, multi_face, min_face_size, min_confidence)
+    if message:
+        return _analysis(faces_detected, message=message)
+
+    faces = [_preprocess_face(frame, d["facial_area"]) for d in kept]
+    if multi_face:
+        embeddings = _represent_batch(faces)
+    else:
+        emb = _represent(faces[0])
+        if emb is None:
+            return None
+        embeddings = [emb]
+    return _analysis(faces_detected, kept, embeddings)
+
+def _cache_variant(multi_face, min_face_size, min_confidence):
+    return f"multi:{min_face_size}:{min_confidence}" if multi_face else "single"
+
+def _matches(analyses, gallery):
+    """
+    Recherche dans la galerie pour plusieurs analyses en un seul appel.
+    Le résultat est mémorisé dans l'analyse avec la version de la galerie :
+    un changement de galerie n'invalide que cette étape, pas l'embedding.
+    """
+    todo = []
+    for analysis in analyses:
+        if not analysis["faces"]:
+            continue
+        cached = analysis.get("match")
+        if cached is not None and cached[0] == gallery.version:
+            FACE_CACHE.record("match_reuses")
+        else:
+            todo.append(analysis)
+
+    embeddings = [face["embedding"] for analysis in todo for face in analysis["faces"]]
+    if embeddings:
+        found = iter(gallery.search_batch(embeddings, METRIC))
+        for analysis in todo:
+            analysis["match"] = (gallery.version, [next(found) for _ in analysis["faces"]])
+            FACE_CACHE.record("match_computations")
+
+    return [analysis["match"][1] if analysis["faces"] else [] for analysis in analyses]
+
+def _response(analysis, matches, multi_face):
+    """Construit la réponse de /recognize à partir de l'analyse et du matching."""
+    if analysis["message"]:
+        response = {
+            "prediction": "Inconnu",
+            "message": analysis["message"],
+            "distance": None,
+            "status": "success"
+        }
+        if multi_face and analysis["faces_detected"]:
+            response["faces"] = []
+            response["faces_detected"] = analysis["faces_detected"]
+        return response
+
+    # Champs de premier niveau : premier visage (compatibilité des clients existants)
+    response = _prediction(*matches[0], analysis["faces_detected"])
+    if multi_face:
+        faces = []
+        for face, (match_name, min_dist) in zip(analysis["faces"], matches):
+            area = face["facial_area"]
+            prediction = _prediction(match_name, min_dist, analysis["faces_detected"])
+            faces.append({
+                "bbox": {"x": area["x"], "y": area["y"], "w": area["w"], "h": area["h"]},
+                "confidence": face["confidence"],
+                "prediction": prediction["prediction"],
+                "distance": prediction["distance"],
+            })
+        response["faces"] = faces
+    return response
+
+def get_cache_stats():
+    return FACE_CACHE.stats()
+
+def recognize_face(image_data, multi_face=False, min_face_size=MIN_FACE_SIZE,
+                   min_confidence=MIN_FACE_CONFIDENCE):
     """
     Traite l'image fournie (bytes ou stream) et renvoie la prédiction.
+    Détection et embeddings sont mis en cache par empreinte du contenu de l'image,
+    dans le processus API : seules les images absentes du cache partent au pool.
     
     Args:
         image_data: Données brutes de l'image (bytes)
+        multi_face: si True, reconnaît tous les visages détectés (liste "faces")
+        min_face_size: côté minimal (px) d'un visage en mode multi_face
+        min_confidence: confiance minimale du détecteur en mode multi_face
     
     Returns:
         tuple: (resultat_dict, code_statut)
     """
-    if not EMBEDDINGS:
+    sync_gallery()
+    gallery = GALLERY
+    if len(gallery) == 0:
         return {"error": "Base de données d'embeddings non chargée", "status": "error"}, 503
 
     try:
-        # 1. Convertir l'image en format OpenCV
-        img = Image.open(io.BytesIO(image_data)).convert('RGB')
-        frame = np.array(img)
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-
-        # 2. Détection de visages
-        results = DeepFace.extract_faces(
-            frame, detector_backend="yolov8", enforce_detection=False
-        )
-
-        if not results or len(results) == 0:
-            return {
-                "prediction": "Inconnu", 
-                "message": "Aucun visage détecté", 
-                "distance": None,
-                "status": "success"
-            }, 200
-
-        # Traiter le premier visage détecté
-        result = results[0]
-        facial_area = result.get("facial_area", {})
-        
-        if not facial_area:
-            return {
-                "prediction": "Inconnu", 
-                "message": "Visage détecté mais zone faciale non trouvée", 
-                "distance": None,
-                "status": "success"
-            }, 200
-
-        x, y, w, h = facial_area["x"], facial_area["y"], facial_area["w"], facial_area["h"]
-
-        # 3. Prétraitement de l'image (cropping, CLAHE, resize)
-        cropped_face = frame[y:y + h, x:x + w]
-        cropped_resized = cv2.resize(cropped_face, (224, 224))
-        gray_face = cv2.cvtColor(cropped_resized, cv2.COLOR_BGR2GRAY)
-        clahe_face = clahe(gray_face)
-        rgb_face = cv2.cvtColor(clahe_face, cv2.COLOR_GRAY2RGB)
-
-        # 4. Calcul de l'embedding
-        emb_result = DeepFace.represent(
-            rgb_face,
-            model_name=MODEL_NAME,
-            enforce_detection=False,
-            detector_backend="skip",
-        )
-        
-        if not emb_result:
-            return {"error": "Impossible de calculer l'embedding", "status": "error"}, 500
-            
-        emb = emb_result[0]["embedding"]
-
-        # 5. Comparaison avec la base de données
-        min_dist = float("inf")
-        match_name = "Inconnu"
-        
-        for name, emb2 in EMBEDDINGS.items():
-            dst = find_distance(emb, emb2, METRIC)
-            if dst < min_dist:
-                min_dist = dst
-                match_name = name
-        
-        # 6. Appliquer le seuil
-        if min_dist > THRESHOLD:
-            match_name = "Inconnu"
+        cache_key = FACE_CACHE.key(image_data, _cache_variant(multi_face, min_face_size, min_confidence))
+        analysis = FACE_CACHE.get(cache_key)
+        if analysis is None:
+            # Détection, prétraitement (cropping, CLAHE, resize) et calcul des embeddings
+            analysis = _compute("_analyze_image", image_data, multi_face, min_face_size, min_confidence)
+            if analysis is None:
+                return {"error": "Impossible de calculer l'embedding", "status": "error"}, 500
+            FACE_CACHE.put(cache_key, analysis)
 
-        return {
-            "prediction": match_name,
-            "distance": round(min_dist, 4),
-            "threshold": THRESHOLD,
-            "metric": METRIC,
-            "status": "success",
-            "faces_detected": len(results)
-        }, 200
+        # Comparaison avec la base de données puis application du seuil
+        matches = _matches([analysis], gallery)[0]
+        return _response(analysis, matches, multi_face), 200
+
+    except InferenceUnavailableError:
+        raise
+    except Exception as e:
+        return {"error": f"Erreur lors du traitement: {str(e)}", "status": "error"}, 500
+
+def _analyze_batch(images):
+    """
+    Détection par image, puis une seule passe Facenet512 sur tous les visages recadrés.
+    Renvoie [(analyse, None) ou (None, erreur)] dans l'ordre des images.
+    """
+    analyses = [None] * len(images)
+    pending = []   # (position, détection, visage prétraité, nb visages détectés)
+
+    for i, image_data in enumerate(images):
+        try:
+            frame = _decode_image(image_data)
+            kept, faces_detected, message = _detect(frame, False, None, None)
+            if message:
+                analyses[i] = (_analysis(faces_detected, message=message), None)
+                continue
+            pending.append((i, kept[0], _preprocess_face(frame, kept[0]["facial_area"]), faces_detected))
+        except Exception as e:
+            analyses[i] = (None, {"error": f"Erreur lors du traitement: {str(e)}", "status": "error"})
+
+    embeddings = _represent_batch([face for _, _, face, _ in pending])
+    for (i, detection, _, faces_detected), emb in zip(pending, embeddings):
+        analyses[i] = (_analysis(faces_detected, [detection], [emb]), None)
+    return analyses
+
+def recognize_faces_batch(images):
+    """
+    Reconnaissance d'une rafale d'images :
+    détection par image, puis une seule passe Facenet512 sur tous les visages
+    recadrés, puis une seule recherche dans la galerie.
+    Les images déjà vues (cache) ne repassent ni par la détection ni par le modèle.
+
+    Args:
+        images: liste d'images brutes (bytes)
+
+    Returns:
+        tuple: (resultat_dict, code_statut) ; "results" suit l'ordre des images reçues
+    """
+    sync_gallery()
+    gallery = GALLERY
+    if len(gallery) == 0:
+        return {"error": "Base de données d'embeddings non chargée", "status": "error"}, 503
+    if len(images) > MAX_BATCH_SIZE:
+        return {"error": f"Trop d'images (max {MAX_BATCH_SIZE})", "status": "error"}, 400
+
+    cache_keys = [FACE_CACHE.key(image_data, _cache_variant(False, None, None)) for image_data in images]
+    analyses = [FACE_CACHE.get(cache_key) for cache_key in cache_keys]
+    errors = {}
+    misses = [i for i, analysis in enumerate(analyses) if analysis is None]
+
+    try:
+        if misses:
+            computed = _compute("_analyze_batch", [images[i] for i in misses])
+            for i, (analysis, error) in zip(misses, computed):
+                if error:
+                    errors[i] = error
+                    continue
+                analyses[i] = analysis
+                FACE_CACHE.put(cache_keys[i], analysis)
 
+        done = [i for i, analysis in enumerate(analyses) if analysis is not None]
+        matches = dict(zip(done, _matches([analyses[i] for i in done], gallery)))
+    except InferenceUnavailableError:
+        raise
     except Exception as e:
         return {"error": f"Erreur lors du traitement: {str(e)}", "status": "error"}, 500
 
-# Charger les embeddings au démarrage du module
-load_embeddings()
+    results = []
+    for i in range(len(images)):
+        result = errors[i] if i in errors else _response(analyses[i], matches[i], False)
+        result["index"] = i
+        results.append(result)
+
+    return {"results": results, "count": len(results), "status": "success"}, 200
+
+def enrollment_embedding(image_data):
+    """
+    Détection + embedding du visage à enrôler (calcul modèle).
+    Renvoie (embedding, None) ou (None, (resultat_dict, code_statut)) en cas d'échec.
+    """
+    frame = _decode_image(image_data)
+    results = _deepface().extract_faces(
+        frame, detector_backend="yolov8", enforce_detection=False
+    )
+    # enforce_detection=False renvoie l'image entière (confiance 0) sans visage
+    faces = [r for r in results or [] if r.get("facial_area") and r.get("confidence", 0) > 0]
+    if not faces:
+        return None, ({"error": "Aucun visage détecté", "status": "error"}, 422)
+
+    emb = _represent(_preprocess_face(frame, faces[0]["facial_area"]))
+    if emb is None:
+        return None, ({"error": "Impossible de calculer l'embedding", "status": "error"}, 500)
+    return emb, None
+
+def enroll_face(image_data, name):
+    """
+    Enrôle un visage en ligne : détection, recadrage, CLAHE, embedding,
+    puis ajout au journal et à la galerie (remplace l'embedding si le nom existe).
+
+    Returns:
+        tuple: (resultat_dict, code_statut)
+    """
+    name = (name or "").strip()
+    if not name:
+        return {"error": "Champ name manquant", "status": "error"}, 400
+
+    try:
+        emb, error = _compute("enrollment_embedding", image_data)
+        if error:
+            return error
+
+        _commit_operation("add", name, emb)
+        return {
+            "message": "Visage enrôlé avec succès",
+            "name": name,
+            "faces_known": len(GALLERY),
+            "status": "success"
+        }, 201
+
+    except InferenceUnavailableError:
+        raise
+    except Exception as e:
+        return {"error": f"Erreur lors de l'enrôlement: {str(e)}", "status": "error"}, 500
+
+def delete_face(name):
+    """Retire un visage de la galerie (journalisé comme un enrôlement)."""
+    try:
+        with _STATE_LOCK:
+            _catch_up()
+        if name not in GALLERY:
+            return {"error": "Visage inconnu", "status": "error"}, 404
+
+        _commit_operation("delete", name)
+        return {
+            "message": "Visage supprimé avec succès",
+            "name": name,
+            "faces_known": len(GALLERY),
+            "status": "success"
+        }, 200
+
+    except Exception as e:
+        return {"error": f"Erreur lors de la suppression: {str(e)}", "status": "error"}, 500
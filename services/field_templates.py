@@ -0,0 +1,82 @@
+"""
+Gabarits de champs par type de document (CNI, passeport, permis...).
+Un gabarit est stocké dans `type_documents.gabarit_champs` (JSON) :
+    {
+        "nom":             {"roi": [x, y, largeur, hauteur], "allowlist": "ABCDEFGHIJKLMNOPQRSTUVWXYZ -'"},
+        "prenom":          {"roi": [...], "allowlist": "..."},
+        "numero_document": {"roi": [...], "allowlist": "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"}
+    }
+Les rectangles sont normalisés (0..1) dans le repère du document recadré et redressé
+(voir image_preprocessing.document_frame). Les gabarits sont gardés en mémoire et
+rechargés après modification d'un type de document ou au bout de TEMPLATE_TTL secondes.
+"""
+import threading
+import time
+
+from models.type_document import TypeDocument
+
+TEMPLATE_TTL = 300  # secondes : les autres processus voient une modification au plus tard après ce délai
+TEMPLATE_FIELDS = ("nom", "prenom", "numero_document", "nationalite", "date_de_naissance", "date_d_expiration")
+
+
+def validate_template(gabarit):
+    """Vérifie et normalise un gabarit ; lève ValueError si invalide. None = pas de gabarit."""
+    if gabarit is None:
+        return None
+    if not isinstance(gabarit, dict) or not gabarit:
+        raise ValueError("gabarit_champs doit être un objet {champ: {roi, allowlist}}")
+
+    normalized = {}
+    for champ, spec in gabarit.items():
+        if champ not in TEMPLATE_FIELDS:
+            raise ValueError(f"Champ de gabarit inconnu: {champ}")
+        roi = spec.get("roi") if isinstance(spec, dict) else None
+        if not isinstance(roi, (list, tuple)) or len(roi) != 4:
+            raise ValueError(f"{champ}: roi doit être [x, y, largeur, hauteur]")
+        x, y, w, h = (float(v) for v in roi)
+        if not (0 <= x < 1 and 0 <= y < 1 and 0 < w <= 1 - x and 0 < h <= 1 - y):
+            raise ValueError(f"{champ}: roi hors du document (valeurs normalisées 0..1)")
+        allowlist = spec.get("allowlist")
+        if allowlist is not None and not isinstance(allowlist, str):
+            raise ValueError(f"{champ}: allowlist doit être une chaîne de caractères")
+        normalized[champ] = {"roi": [x, y, w, h], "allowlist": allowlist or None}
+    return normalized
+
+
+class FieldTemplateCache:
+    """Gabarits de tous les types de document, chargés en une requête et gardés en mémoire."""
+
+    def __init__(self, ttl=TEMPLATE_TTL):
+        self.ttl = ttl
+        self._templates = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        rows = TypeDocument.query.filter(TypeDocument.gabarit_champs.isnot(None)).all()
+        templates = {}
+        for type_document in rows:
+            try:
+                templates[type_document.id] = validate_template(type_document.gabarit_champs)
+            except ValueError as e:
+                print(f"[FieldTemplates] gabarit ignoré pour le type {type_document.id}: {e}")
+        return templates
+
+    def get(self, type_document_id):
+        """Gabarit du type de document, ou None s'il n'en a pas."""
+        if type_document_id is None:
+            return None
+        templates = self._templates
+        if templates is None or time.monotonic() - self._loaded_at > self.ttl:
+            with self._lock:
+                templates = self._load()
+                self._templates = templates
+                self._loaded_at = time.monotonic()
+        return templates.get(int(type_document_id))
+
+    def invalidate(self):
+        with self._lock:
+            self._templates = None
+
+
+FIELD_TEMPLATES = FieldTemplateCache()
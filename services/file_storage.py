@@ -0,0 +1,153 @@
+"""
+Stockage des fichiers envoyés, adressé par le contenu.
+Chaque fichier est écrit une seule fois sous public/store/ab/cd/<sha256>.<ext> :
+un envoi identique (nouvel essai du client, même photo) réutilise le fichier
+existant, et deux envois portant le même nom ne s'écrasent plus.
+Les lignes qui pointent vers un fichier (OCRResult, Document, Verification)
+le comptent dans `StoredFile.nb_references` ; les fichiers sans référence sont
+supprimés par purge_orphans (flask purge-uploads), jamais pendant une requête.
+Un job OCR asynchrone garde aussi une référence sur son image tant qu'il n'est pas terminé.
+Toutes les dates sont en UTC naïf, comme `derniere_utilisation`.
+"""
+import hashlib
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+
+from config.database import db
+from models.stored_file import StoredFile
+
+STORAGE_ROOT = "public/store"
+STORAGE_URL_PREFIX = "/api/store"
+STORAGE_TMP = os.path.join(STORAGE_ROOT, ".tmp")   # même disque que le stockage : os.replace atomique
+CHUNK_SIZE = 1024 * 1024
+ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "webp", "bmp"}
+DEFAULT_EXTENSION = "jpg"
+ORPHAN_GRACE = 3600  # secondes sans référence avant suppression
+
+
+def _now():
+    return datetime.utcnow()
+
+
+def _extension(filename):
+    extension = os.path.splitext(secure_filename(filename or ""))[1].lstrip(".").lower()
+    return extension if extension in ALLOWED_EXTENSIONS else DEFAULT_EXTENSION
+
+
+class FileStorage:
+
+    @staticmethod
+    def relative_path(sha256, extension):
+        return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.{extension}"
+
+    @staticmethod
+    def absolute_path(stored):
+        return os.path.join(STORAGE_ROOT, stored.chemin)
+
+    @staticmethod
+    def web_path(stored):
+        """Chemin servi par /api/store (relatif à l'hôte, comme les chemin_image existants)."""
+        return f"{STORAGE_URL_PREFIX}/{stored.chemin}"
+
+    @staticmethod
+    def save_stream(stream, filename=None):
+        """
+        Copie le flux dans un fichier temporaire en calculant son SHA-256, puis le
+        range à son adresse de contenu. Renvoie le StoredFile (existant si ce
+        contenu a déjà été reçu : le fichier temporaire est alors simplement supprimé).
+        """
+        os.makedirs(STORAGE_TMP, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=STORAGE_TMP)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            return FileStorage._store(tmp_path, digest.hexdigest(), _extension(filename), size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def save_upload(file):
+        """Fichier multipart (werkzeug FileStorage) reçu par un endpoint."""
+        return FileStorage.save_stream(file.stream, file.filename)
+
+    @staticmethod
+    def save_bytes(data, extension=DEFAULT_EXTENSION):
+        return FileStorage.save_stream(io.BytesIO(data), f"image.{extension}")
+
+    @staticmethod
+    def _store(tmp_path, sha256, extension, size):
+        stored = StoredFile.query.get(sha256)
+        if stored is not None and os.path.exists(FileStorage.absolute_path(stored)):
+            print(f"♻️ Fichier déjà stocké: {stored.chemin}")
+            stored.derniere_utilisation = _now()
+            db.session.commit()
+            return stored
+
+        chemin = stored.chemin if stored is not None else FileStorage.relative_path(sha256, extension)
+        path = os.path.join(STORAGE_ROOT, chemin)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+        if stored is None:
+            stored = StoredFile(sha256=sha256, extension=extension, chemin=chemin, taille=size, nb_references=0)
+            db.session.add(stored)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Même contenu reçu en parallèle : la ligne existe déjà, le fichier est identique
+                db.session.rollback()
+                stored = StoredFile.query.get(sha256)
+        return stored
+
+    @staticmethod
+    def acquire(sha256):
+        """+1 référence, dans la transaction de l'appelant (validée avec la ligne qui référence le fichier)."""
+        if not sha256:
+            return
+        StoredFile.query.filter_by(sha256=sha256).update(
+            {StoredFile.nb_references: StoredFile.nb_references + 1, StoredFile.derniere_utilisation: _now()},
+            synchronize_session=False
+        )
+
+    @staticmethod
+    def release(sha256):
+        """-1 référence, dans la transaction de l'appelant. Le fichier reste sur disque jusqu'à purge_orphans."""
+        if not sha256:
+            return
+        StoredFile.query.filter(StoredFile.sha256 == sha256, StoredFile.nb_references > 0).update(
+            {StoredFile.nb_references: StoredFile.nb_references - 1, StoredFile.derniere_utilisation: _now()},
+            synchronize_session=False
+        )
+
+    @staticmethod
+    def purge_orphans(grace=ORPHAN_GRACE):
+        """
+        Supprime les fichiers sans référence depuis plus de `grace` secondes
+        (envoi dont le traitement a échoué, document supprimé...). Renvoie le nombre supprimé.
+        """
+        limit = _now() - timedelta(seconds=grace)
+        orphan_filter = (StoredFile.nb_references == 0, StoredFile.derniere_utilisation < limit)
+        purged = 0
+        for stored in StoredFile.query.filter(*orphan_filter).all():
+            path = FileStorage.absolute_path(stored)
+            # Suppression conditionnelle : un envoi identique reçu entre-temps a rafraîchi derniere_utilisation
+            deleted = StoredFile.query.filter(StoredFile.sha256 == stored.sha256, *orphan_filter).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
+            if deleted:
+                if os.path.exists(path):
+                    os.remove(path)
+                purged += 1
+        return purged
@@ -2,6 +2,11 @@ from typing import Optional
 import cv2
 import numpy as np
 
+# Recadrage du document avant OCR
+CARD_DETECTION_DIM = 640      # côté max de l'image réduite utilisée pour la détection
+CARD_MIN_AREA_RATIO = 0.15    # surface minimale du quadrilatère (part de l'image)
+CARD_WIDTH = 1200             # largeur canonique du document redressé (px)
+
 def adaptive_resize(image: np.ndarray, max_dim: int = 1600, upscale_factor: float = 2.2) -> np.ndarray:
     """
     Redimensionne l'image si elle est trop petite ou trop grande.
@@ -21,20 +26,86 @@ def adaptive_resize(image: np.ndarray, max_dim: int = 1600, upscale_factor: floa
     return image
 
 
-def preprocess_for_ocr(image_path: str, use_clahe: bool = True) -> np.ndarray:
-    """
-    Pipeline optimisé de prétraitement.
-    Retourne une image binaire (numpy.ndarray) prête pour l'OCR.
-    """
+def load_image(image_path: str) -> np.ndarray:
     image = cv2.imread(image_path)
     if image is None:
         raise FileNotFoundError(f"Image introuvable: {image_path}")
+    return image
+
+
+def _order_corners(pts: np.ndarray) -> np.ndarray:
+    """Coins dans l'ordre haut-gauche, haut-droit, bas-droit, bas-gauche."""
+    s = pts.sum(axis=1)
+    d = np.diff(pts, axis=1).ravel()
+    return np.array([pts[np.argmin(s)], pts[np.argmin(d)], pts[np.argmax(s)], pts[np.argmax(d)]], dtype=np.float32)
+
+
+def detect_card(image: np.ndarray, min_area_ratio: float = CARD_MIN_AREA_RATIO) -> Optional[np.ndarray]:
+    """
+    Cherche le quadrilatère du document (contours après Canny) sur une version réduite de l'image.
+    Retourne les 4 coins ordonnés dans le repère de l'image d'origine, ou None.
+    """
+    h, w = image.shape[:2]
+    scale = min(1.0, CARD_DETECTION_DIM / max(h, w))
+    small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else image
+
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    gray = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(gray, 50, 150)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = min_area_ratio * small.shape[0] * small.shape[1]
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        if cv2.contourArea(contour) < min_area:
+            break
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) == 4 and cv2.isContourConvex(approx):
+            return _order_corners(approx.reshape(4, 2).astype(np.float32) / scale)
+    return None
+
+
+def warp_card(image: np.ndarray, corners: np.ndarray, width: int = CARD_WIDTH) -> np.ndarray:
+    """Redresse le document (transformation perspective) à une largeur canonique, en paysage."""
+    tl, tr, br, bl = corners
+    side_w = max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl))
+    side_h = max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))
+    if side_h > side_w:
+        # Document photographié en portrait : le grand côté devient la largeur
+        corners = np.array([bl, tl, tr, br], dtype=np.float32)
+        side_w, side_h = side_h, side_w
+
+    height = int(round(width * side_h / side_w))
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(corners, target)
+    return cv2.warpPerspective(image, matrix, (width, height), flags=cv2.INTER_CUBIC)
+
+
+def document_frame(image: np.ndarray, detect: bool = True):
+    """
+    Repère de travail de l'OCR : document détecté et redressé (sinon image entière), redimensionné.
+    Retourne (image, document_trouvé). Les bbox OCR sont exprimées dans ce repère.
+    """
+    corners = detect_card(image) if detect else None
+    if corners is not None:
+        image = warp_card(image, corners)
+    return adaptive_resize(image), corners is not None
+
 
-    image = adaptive_resize(image)
+def fast_preprocess(image: np.ndarray, detect: bool = True):
+    """
+    Palier rapide : recadrage du document + redimensionnement + niveaux de gris (quelques ms).
+    Suffisant pour la plupart des photos nettes. Retourne (gris, document_trouvé).
+    """
+    frame, found = document_frame(image, detect)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), found
 
-    # convertir en gris
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
+def heavy_preprocess(gray: np.ndarray, use_clahe: bool = True) -> np.ndarray:
+    """
+    Palier lourd, à partir de la sortie de fast_preprocess :
+    débruitage, contraste, seuillage adaptatif et morphologie.
+    """
     # denoise (param modéré pour ne pas perdre de traits fins)
     gray = cv2.fastNlMeansDenoising(gray, h=20)
 
@@ -58,4 +129,32 @@ def preprocess_for_ocr(image_path: str, use_clahe: bool = True) -> np.ndarray:
     kernel = np.ones((2, 2), np.uint8)
     morph = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
 
-    return morph
\ No newline at end of file
+    return morph
+
+
+def preprocess_for_ocr(image_path: str, use_clahe: bool = True, detect: bool = False) -> np.ndarray:
+    """
+    Pipeline complet (palier rapide puis palier lourd).
+    Retourne une image binaire (numpy.ndarray) prête pour l'OCR.
+    """
+    gray, _ = fast_preprocess(load_image(image_path), detect)
+    return heavy_preprocess(gray, use_clahe=use_clahe)
+
+
+def draw_annotations(image_path: str, results, frame: bool = True) -> np.ndarray:
+    """
+    Image avec les bbox et textes OCR dessinés.
+    frame=True : dans le repère de process_image (document recadré et redressé).
+    """
+    image = load_image(image_path)
+    if frame:
+        image, _ = document_frame(image)
+
+    for res in results:
+        pts = np.array(res['bbox'], dtype=np.int32)
+        cv2.polylines(image, [pts], True, (0, 255, 0), 2)
+
+        x, y = pts[0]
+        cv2.putText(image, res['text'], (x, max(y - 6, 10)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    return image
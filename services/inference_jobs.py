@@ -0,0 +1,40 @@
+"""
+Fonctions exécutées dans les processus des pools d'inférence.
+Elles doivent rester au niveau module (sérialisables par pickle) et n'importer
+les modèles qu'à l'intérieur des processus de travail.
+"""
+import os
+import time
+
+from services.model_registry import _local_face_service, _local_ocr_service
+
+
+def init_face_worker():
+    """Initialiseur d'un processus face : YOLOv8/Facenet512 préchauffés (la galerie reste côté API)."""
+    face_service = _local_face_service()
+    face_service.warm_up_models()
+    print(f"[InferencePool] worker face prêt (pid={os.getpid()})")
+
+
+def init_ocr_worker():
+    """Initialiseur d'un processus OCR : lecteur EasyOCR préchauffé."""
+    _local_ocr_service().warm_up()
+    print(f"[InferencePool] worker OCR prêt (pid={os.getpid()})")
+
+
+def face_call(name, args, kwargs):
+    """Calcul modèle de face_service (détection, embeddings) ; cache et galerie restent côté API."""
+    return getattr(_local_face_service(), name)(*args, **kwargs)
+
+
+def ocr_call(name, args, kwargs):
+    """Renvoie (résultat, (pid, compteurs de prétraitement de ce processus))."""
+    from services.ocr_service import tier_counters
+    result = getattr(_local_ocr_service(), name)(*args, **kwargs)
+    return result, (os.getpid(), tier_counters())
+
+
+def ping():
+    """Job vide : occupe brièvement un processus pour forcer le démarrage de tous les autres."""
+    time.sleep(0.2)
+    return os.getpid()
@@ -0,0 +1,110 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+
+class InferenceUnavailableError(RuntimeError):
+    """Le pool d'inférence ne peut pas traiter la requête (saturé ou trop lent)."""
+    status_code = 503
+
+
+class PoolSaturatedError(InferenceUnavailableError):
+    status_code = 503
+
+
+class InferenceTimeoutError(InferenceUnavailableError):
+    status_code = 504
+
+
+class InferencePool:
+    """
+    Pool de processus dédié à l'inférence (OpenCV / TensorFlow / PyTorch hors GIL).
+    - `initializer` charge et préchauffe le modèle une fois par processus ;
+    - la file est bornée à `max_pending` jobs (en cours + en attente) ;
+    - chaque job a un timeout : au-delà, la requête échoue (le processus
+      termine son calcul et reste occupé jusque-là).
+    """
+
+    def __init__(self, name, workers, initializer, max_pending=None, timeout=60, submit_timeout=2):
+        self.name = name
+        self.workers = workers
+        self.initializer = initializer
+        self.max_pending = max_pending or workers * 4
+        self.timeout = timeout
+        self.submit_timeout = submit_timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "saturated": 0,
+        }
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn : ne pas dupliquer par fork un processus qui a déjà des threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.initializer,
+                )
+            return self._executor
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _release(self, future):
+        self._slots.release()
+        if future.cancelled():
+            return
+        self._count("failed" if future.exception() is not None else "completed")
+
+    def submit(self, fn, *args, **kwargs):
+        """Soumet un job ; lève PoolSaturatedError si la file reste pleine."""
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            self._count("saturated")
+            raise PoolSaturatedError(f"Pool d'inférence {self.name} saturé, réessayez plus tard")
+
+        try:
+            future = self._get_executor().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._count("submitted")
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """Soumet un job et attend son résultat (timeout par job)."""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self._count("timeouts")
+            raise InferenceTimeoutError(f"Délai dépassé pour le pool d'inférence {self.name}")
+        except BrokenProcessPool:
+            # Un worker est mort (OOM...) : le pool sera recréé au prochain appel
+            with self._lock:
+                self._executor = None
+            raise
+
+    def start(self, ping):
+        """Démarre tous les processus (et donc leur initializer) avant le premier job réel."""
+        futures = [self.submit(ping) for _ in range(self.workers)]
+        return sorted({future.result(timeout=None) for future in futures})
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "timeout": self.timeout,
+            }
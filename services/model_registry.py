@@ -0,0 +1,186 @@
+"""
+Accès paresseux aux services adossés à des modèles (EasyOCR, DeepFace).
+Rien n'est importé tant qu'un endpoint n'en a pas besoin, et un worker lancé
+avec IDSECURITY_API_ONLY=1 (CRUD / administration) ne les importe jamais.
+
+Par défaut l'inférence tourne dans des pools de processus dédiés (un modèle
+préchargé par processus) : le processus Flask ne fait que soumettre les jobs
+et attendre leur résultat. IDSECURITY_FACE_WORKERS / IDSECURITY_OCR_WORKERS
+fixent la taille des pools ("auto" = moitié des cœurs, "0" = inférence dans
+le thread de la requête, comme avant).
+"""
+import functools
+import os
+import threading
+
+
+API_ONLY = os.environ.get("IDSECURITY_API_ONLY", "0").lower() in ("1", "true", "yes")
+
+OCR_LANGS = ['fr', 'en']
+OCR_USE_GPU = False
+
+
+def _pool_size(env_name):
+    value = os.environ.get(env_name, "auto").strip().lower()
+    if value == "auto":
+        return max(1, (os.cpu_count() or 2) // 2)
+    return max(0, int(value))
+
+
+FACE_WORKERS = _pool_size("IDSECURITY_FACE_WORKERS")
+OCR_WORKERS = _pool_size("IDSECURITY_OCR_WORKERS")
+FACE_JOB_TIMEOUT = 30      # secondes
+OCR_JOB_TIMEOUT = 120
+POOL_QUEUE_FACTOR = 4      # jobs en attente autorisés par processus
+
+_LOCK = threading.Lock()
+_OCR_SERVICE = None
+_POOLS = {}
+_PROXIES = {}
+
+
+class ModelsDisabledError(RuntimeError):
+    """Levée quand un endpoint modèle est appelé sur un worker API-only."""
+
+
+def _check_enabled(name):
+    if API_ONLY:
+        raise ModelsDisabledError(f"Worker API-only : {name} désactivé sur ce processus")
+
+
+def _pool(name):
+    """Pool d'inférence `face` ou `ocr`, créé au premier appel (None si désactivé)."""
+    if name not in _POOLS:
+        with _LOCK:
+            if name not in _POOLS:
+                from services import inference_jobs
+                from services.inference_pool import InferencePool
+                workers, initializer, timeout = {
+                    "face": (FACE_WORKERS, inference_jobs.init_face_worker, FACE_JOB_TIMEOUT),
+                    "ocr": (OCR_WORKERS, inference_jobs.init_ocr_worker, OCR_JOB_TIMEOUT),
+                }[name]
+                _POOLS[name] = InferencePool(
+                    name,
+                    workers,
+                    initializer,
+                    max_pending=workers * POOL_QUEUE_FACTOR,
+                    timeout=timeout,
+                ) if workers else None
+    return _POOLS[name]
+
+
+class _PooledService:
+    """
+    Façade d'un service dont les méthodes `pooled` s'exécutent dans un pool d'inférence ;
+    les autres sont appelées sur `local` (dans le processus API).
+    Chaque job renvoie aussi les compteurs du processus qui l'a traité : les méthodes de
+    `merged` (statistiques) les additionnent sur tous les processus du pool.
+    """
+
+    def __init__(self, pool, call, pooled, local, merged=None):
+        self._pool = pool
+        self._call = call
+        self._pooled = pooled
+        self._local = local
+        self._merged = merged or {}
+        self._reports = {}   # pid -> derniers compteurs renvoyés par ce processus
+
+    def run(self, name, *args, **kwargs):
+        result, (pid, report) = self._pool.run(self._call, name, args, kwargs)
+        self._reports[pid] = report
+        return result
+
+    def __getattr__(self, name):
+        if name in self._merged:
+            return lambda: self._merged[name](list(self._reports.values()))
+        if name not in self._pooled:
+            return getattr(self._local, name)
+        return functools.partial(self.run, name)
+
+
+def _local_ocr_service():
+    """Singleton OCRService du processus courant, construit (et easyocr importé) au premier appel."""
+    global _OCR_SERVICE
+    if _OCR_SERVICE is None:
+        with _LOCK:
+            if _OCR_SERVICE is None:
+                from services.ocr_service import OCRService
+                _OCR_SERVICE = OCRService(langs=OCR_LANGS, use_gpu=OCR_USE_GPU)
+    return _OCR_SERVICE
+
+
+def _local_face_service():
+    """Module face_service du processus courant (deepface + embeddings)."""
+    from services import face_service
+    return face_service
+
+
+def get_ocr_service():
+    """
+    Service OCR : façade vers le pool d'inférence (process_image, process_fields)
+    ou OCRService local quand le pool est désactivé. Le reste (extraction, matching)
+    n'a pas besoin du modèle et tourne dans le processus ; preprocess_stats additionne
+    les compteurs de tous les processus du pool.
+    """
+    _check_enabled("OCR")
+    pool = _pool("ocr")
+    if pool is None:
+        return _local_ocr_service()
+    if "ocr" not in _PROXIES:
+        from services import inference_jobs
+        from services.ocr_service import OCRService, merge_preprocess_stats
+        _PROXIES["ocr"] = _PooledService(
+            pool,
+            inference_jobs.ocr_call,
+            pooled=("process_image", "process_fields"),
+            local=OCRService(langs=OCR_LANGS, use_gpu=OCR_USE_GPU, load_reader=False),
+            merged={"preprocess_stats": merge_preprocess_stats},
+        )
+    return _PROXIES["ocr"]
+
+
+def get_face_service():
+    """
+    Service de reconnaissance faciale (module face_service du processus API).
+    Avec un pool, seuls les calculs modèle (détection, embeddings) y sont envoyés
+    (set_compute) : galerie, cache d'embeddings, enrôlement et suppression restent
+    dans ce processus, un seul cache sert donc tous les processus du pool.
+    """
+    _check_enabled("reconnaissance faciale")
+    face_service = _local_face_service()
+    pool = _pool("face")
+    if pool is not None and "face" not in _PROXIES:
+        with _LOCK:
+            if "face" not in _PROXIES:
+                from services import inference_jobs
+                face_service.set_compute(
+                    lambda name, *args: pool.run(inference_jobs.face_call, name, args, {})
+                )
+                _PROXIES["face"] = face_service
+    return face_service
+
+
+def warm_up_pipeline(name):
+    """
+    Préchauffe le pipeline `face` ou `ocr` : démarre tous les processus du pool
+    (chacun charge et préchauffe son modèle), ou le modèle local sans pool.
+    """
+    _check_enabled(name)
+    pool = _pool(name)
+    if pool is not None:
+        from services import inference_jobs
+        return pool.start(inference_jobs.ping)
+    if name == "face":
+        _local_face_service().warm_up_models()
+    else:
+        _local_ocr_service().warm_up()
+    return []
+
+
+def pool_stats():
+    """Compteurs des pools d'inférence (dont `saturated` : jobs refusés file pleine)."""
+    return {
+        "cpu_count": os.cpu_count(),
+        "face": _pool("face").stats() if _pool("face") else None,
+        "ocr": _pool("ocr").stats() if _pool("ocr") else None,
+    }
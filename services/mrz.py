@@ -0,0 +1,190 @@
+"""
+Détection et lecture de la zone MRZ (ICAO 9303) dans la sortie de `process_image`.
+Formats pris en charge :
+- TD1 (cartes d'identité) : 3 lignes de 30 caractères ;
+- TD3 (passeports)        : 2 lignes de 44 caractères.
+Les chiffres de contrôle sont vérifiés ; seuls les numéros de document dont le
+chiffre de contrôle est valide (`document_numbers`) servent à la recherche exacte.
+"""
+import re
+
+TD1_LENGTH = 30
+TD3_LENGTH = 44
+# Longueur minimale lue par ligne : les chevrons de fin sont souvent tronqués par l'OCR,
+# mais les champs utiles (numéro, dates, chiffres de contrôle) doivent être présents
+TD1_MIN_LENGTHS = (15, 29, 5)
+TD3_MIN_LENGTHS = (10, 42)
+
+_WEIGHTS = (7, 3, 1)
+_RE_MRZ_CHARS = re.compile(r"[^A-Z0-9<]")
+# Confusions OCR dans les champs strictement numériques
+_TO_DIGIT = str.maketrans({"O": "0", "Q": "0", "D": "0", "I": "1", "L": "1", "Z": "2",
+                           "S": "5", "G": "6", "B": "8", "<": "0"})
+# Confusions lettre <-> chiffre dans les champs alphanumériques (numéro de document)
+_SWAPS = {"O": "0", "0": "O", "I": "1", "1": "I", "Z": "2", "2": "Z",
+          "S": "5", "5": "S", "G": "6", "6": "G", "B": "8", "8": "B"}
+
+
+def _char_value(char):
+    if char.isdigit():
+        return int(char)
+    if "A" <= char <= "Z":
+        return ord(char) - ord("A") + 10
+    return 0  # '<'
+
+
+def check_digit(value):
+    """Chiffre de contrôle ICAO (pondération 7-3-1, modulo 10)."""
+    return str(sum(_char_value(c) * _WEIGHTS[i % 3] for i, c in enumerate(value)) % 10)
+
+
+def _valid(value, digit):
+    return check_digit(value) == digit.translate(_TO_DIGIT)
+
+
+def _normalize_line(text):
+    """Met une ligne OCR au format MRZ : majuscules, sans espaces, '<' pour les chevrons mal lus."""
+    text = text.upper().replace(" ", "").replace("«", "<<").replace("‹", "<")
+    return _RE_MRZ_CHARS.sub("<", text)
+
+
+def _group_lines(results):
+    """Regroupe les boîtes OCR par ligne (centre vertical proche), de gauche à droite."""
+    boxes = []
+    for r in results:
+        ys = [point[1] for point in r["bbox"]]
+        xs = [point[0] for point in r["bbox"]]
+        boxes.append(((min(ys) + max(ys)) / 2, max(ys) - min(ys), min(xs), r["text"]))
+    boxes.sort()
+
+    lines = []
+    for y, height, x, text in boxes:
+        if lines and abs(y - lines[-1]["y"]) <= max(height, lines[-1]["height"]) / 2:
+            lines[-1]["parts"].append((x, text))
+        else:
+            lines.append({"y": y, "height": height, "parts": [(x, text)]})
+    return ["".join(text for _, text in sorted(line["parts"])) for line in lines]
+
+
+def _fit(line, length):
+    """Ajuste une ligne à la longueur attendue (chevrons finaux souvent tronqués par l'OCR)."""
+    if len(line) > length:
+        return None
+    return line.ljust(length, "<")
+
+
+def _names(field):
+    surname, _, given = field.partition("<<")
+    return surname.replace("<", " ").strip(), given.replace("<", " ").strip()
+
+
+def _document_numbers(number, digit, overflow=""):
+    """
+    Numéros de document dont le chiffre de contrôle est valide (débordement TD1 inclus).
+    Si la lecture brute est invalide, essaie chaque correction d'une confusion
+    lettre/chiffre : environ une correction sur dix passe le chiffre de contrôle
+    par hasard, la correction n'est donc retenue que si elle est la seule valide.
+    """
+    if digit == "<" and overflow:
+        # TD1 : numéro de plus de 9 caractères, la suite et le chiffre sont dans la zone optionnelle
+        extra = overflow.split("<", 1)[0]
+        number, digit = number + extra[:-1], extra[-1:]
+    if _valid(number, digit):
+        return number.replace("<", ""), [number.replace("<", "")]
+    variants = []
+    for i, char in enumerate(number):
+        if char in _SWAPS:
+            fixed = number[:i] + _SWAPS[char] + number[i + 1:]
+            if _valid(fixed, digit):
+                variants.append(fixed.replace("<", ""))
+    return number.replace("<", ""), variants if len(variants) == 1 else []
+
+
+def _date(value, digit):
+    value = value.translate(_TO_DIGIT)
+    return value, _valid(value, digit)
+
+
+def parse_td1(lines):
+    l1, l2, l3 = (_fit(line, TD1_LENGTH) for line in lines)
+    if not (l1 and l2 and l3):
+        return None
+    number, numbers = _document_numbers(l1[5:14], l1[14], l1[15:30])
+    birth, birth_ok = _date(l2[0:6], l2[6])
+    expiry, expiry_ok = _date(l2[8:14], l2[14])
+    composite = l1[5:30] + l2[0:7] + l2[8:15] + l2[18:29]
+    surname, given = _names(l3)
+    return {
+        "format": "TD1",
+        "document_type": l1[0:2].replace("<", ""),
+        "issuing_country": l1[2:5].replace("<", ""),
+        "document_number": numbers[0] if numbers else number,
+        "document_numbers": numbers,
+        "birth_date": birth,
+        "sex": l2[7].replace("<", ""),
+        "expiry_date": expiry,
+        "nationality": l2[15:18].replace("<", ""),
+        "surname": surname,
+        "given_names": given,
+        "checks": {
+            "document_number": bool(numbers),
+            "birth_date": birth_ok,
+            "expiry_date": expiry_ok,
+            "composite": _valid(composite, l2[29]),
+        },
+    }
+
+
+def parse_td3(lines):
+    l1, l2 = (_fit(line, TD3_LENGTH) for line in lines)
+    if not (l1 and l2):
+        return None
+    number, numbers = _document_numbers(l2[0:9], l2[9])
+    birth, birth_ok = _date(l2[13:19], l2[19])
+    expiry, expiry_ok = _date(l2[21:27], l2[27])
+    composite = l2[0:10] + l2[13:20] + l2[21:43]
+    surname, given = _names(l1[5:44])
+    return {
+        "format": "TD3",
+        "document_type": l1[0:2].replace("<", ""),
+        "issuing_country": l1[2:5].replace("<", ""),
+        "document_number": numbers[0] if numbers else number,
+        "document_numbers": numbers,
+        "birth_date": birth,
+        "sex": l2[20].replace("<", ""),
+        "expiry_date": expiry,
+        "nationality": l2[10:13].replace("<", ""),
+        "surname": surname,
+        "given_names": given,
+        "checks": {
+            "document_number": bool(numbers),
+            "birth_date": birth_ok,
+            "expiry_date": expiry_ok,
+            "composite": _valid(composite, l2[43]),
+        },
+    }
+
+
+def parse_mrz(results):
+    """
+    Cherche une MRZ dans les résultats OCR ({bbox, text, confidence}).
+    Renvoie le dict des champs lus (avec `checks`) ou None si aucune MRZ n'est trouvée.
+    La MRZ est en bas du document : on parcourt les lignes du bas vers le haut.
+    """
+    lines = [_normalize_line(text) for text in _group_lines(results)]
+
+    best = None
+    for length, min_lengths, parser in ((TD3_LENGTH, TD3_MIN_LENGTHS, parse_td3),
+                                        (TD1_LENGTH, TD1_MIN_LENGTHS, parse_td1)):
+        size = len(min_lengths)
+        for end in range(len(lines), size - 1, -1):
+            window = lines[end - size:end]
+            if not all(minimum <= len(line) <= length for line, minimum in zip(window, min_lengths)):
+                continue
+            if not any("<" in line for line in window):
+                continue
+            mrz = parser(window)
+            if mrz and mrz["checks"]["document_number"]:
+                return mrz
+            best = best or mrz
+    return best
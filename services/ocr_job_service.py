@@ -0,0 +1,202 @@
+"""
+File d'attente des jobs OCR asynchrones, stockée dans la table `ocr_jobs`.
+Plusieurs processus peuvent consommer la file : un job est réservé avec
+SELECT ... FOR UPDATE SKIP LOCKED, puis marqué EN_COURS.
+Un job référence son image (`parametres["sha256"]`) de sa mise en file à sa fin :
+purge_orphans ne la supprime pas si la file prend du retard.
+"""
+import threading
+import traceback
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.exc import IntegrityError
+
+from config.database import db
+from models.ocr_job import OCRJob
+from services.file_storage import FileStorage
+from services.inference_pool import InferenceUnavailableError
+
+OCR_JOB_WORKERS = 2          # threads consommateurs par processus
+OCR_JOB_POLL_INTERVAL = 0.5  # secondes d'attente quand la file est vide
+OCR_JOB_STALE_AFTER = 600    # un job EN_COURS depuis plus longtemps est considéré abandonné
+OCR_JOB_MAX_ATTEMPTS = 3
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class OcrJobService:
+
+    @staticmethod
+    def find_by_idempotency_key(utilisateur_id, idempotency_key):
+        if not idempotency_key:
+            return None
+        return OCRJob.query.filter_by(utilisateur_id=utilisateur_id, idempotency_key=idempotency_key).first()
+
+    @staticmethod
+    def enqueue(type, utilisateur_id, parametres, idempotency_key=None):
+        """
+        Crée un job EN_ATTENTE. Avec une clé d'idempotence déjà utilisée par cet
+        utilisateur, renvoie le job existant. Renvoie (job, créé).
+        """
+        existing = OcrJobService.find_by_idempotency_key(utilisateur_id, idempotency_key)
+        if existing:
+            return existing, False
+
+        job = OCRJob(
+            type=type,
+            statut=OCRJob.EN_ATTENTE,
+            parametres=parametres,
+            idempotency_key=idempotency_key,
+            utilisateur_id=utilisateur_id,
+            tentatives=0
+        )
+        db.session.add(job)
+        FileStorage.acquire(parametres.get("sha256"))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Deux envois simultanés avec la même clé : la contrainte unique tranche
+            db.session.rollback()
+            return OcrJobService.find_by_idempotency_key(utilisateur_id, idempotency_key), False
+        return job, True
+
+    @staticmethod
+    def get_job(job_id, utilisateur_id):
+        """Job de l'utilisateur (None si inconnu ou appartenant à un autre utilisateur)."""
+        return OCRJob.query.filter_by(id=job_id, utilisateur_id=utilisateur_id).first()
+
+    @staticmethod
+    def claim_next():
+        """Réserve le plus ancien job EN_ATTENTE (sans bloquer les autres consommateurs)."""
+        job = (
+            OCRJob.query
+            .filter(OCRJob.statut == OCRJob.EN_ATTENTE)
+            .order_by(OCRJob.date_creation)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.session.rollback()
+            return None
+        job.statut = OCRJob.EN_COURS
+        job.date_debut = _now()
+        job.tentatives = (job.tentatives or 0) + 1
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def finish(job, resultat, code_http):
+        job.resultat = resultat
+        job.code_http = code_http
+        job.statut = OCRJob.TERMINE if code_http < 400 else OCRJob.ECHEC
+        job.erreur = None if code_http < 400 else (resultat or {}).get("message") or (resultat or {}).get("error")
+        job.date_fin = _now()
+        FileStorage.release(job.parametres.get("sha256"))
+        db.session.commit()
+
+    @staticmethod
+    def fail(job, erreur, code_http=500):
+        """Erreur non transitoire (image illisible, erreur de base...) : le job échoue sans nouvelle tentative."""
+        job.statut = OCRJob.ECHEC
+        job.erreur = erreur
+        job.code_http = code_http
+        job.date_fin = _now()
+        FileStorage.release(job.parametres.get("sha256"))
+        db.session.commit()
+
+    @staticmethod
+    def retry_or_fail(job, erreur):
+        """Erreur transitoire (pool saturé, timeout) : remet le job en file tant qu'il reste des tentatives."""
+        job.erreur = erreur
+        if job.tentatives < OCR_JOB_MAX_ATTEMPTS:
+            job.statut = OCRJob.EN_ATTENTE
+            job.date_debut = None
+        else:
+            job.statut = OCRJob.ECHEC
+            job.code_http = 503
+            job.date_fin = _now()
+            FileStorage.release(job.parametres.get("sha256"))
+        db.session.commit()
+
+    @staticmethod
+    def requeue_stale():
+        """Remet en file les jobs EN_COURS abandonnés (processus arrêté pendant le traitement)."""
+        limit = _now() - timedelta(seconds=OCR_JOB_STALE_AFTER)
+        stale = OCRJob.query.filter(OCRJob.statut == OCRJob.EN_COURS, OCRJob.date_debut < limit).all()
+        for job in stale:
+            OcrJobService.retry_or_fail(job, "Job abandonné par son worker")
+        return len(stale)
+
+
+class OcrJobWorkers:
+    """
+    Threads consommateurs de la file. Le calcul lourd part dans le pool
+    d'inférence : ces threads ne font qu'orchestrer (fichiers, base, matching).
+    `handlers` : type de job -> fonction(**parametres) renvoyant (payload, code_http).
+    """
+
+    def __init__(self, app, handlers, workers=OCR_JOB_WORKERS):
+        self.app = app
+        self.handlers = handlers
+        self.workers = workers
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"ocr-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[OcrJobs] {self.workers} workers démarrés")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        idle_rounds = 0
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    if idle_rounds % 120 == 0:
+                        OcrJobService.requeue_stale()
+                    job = OcrJobService.claim_next()
+                    if job is not None:
+                        self._run(job)
+            except Exception:
+                traceback.print_exc()
+                job = None
+            finally:
+                db.session.remove()
+
+            if job is None:
+                idle_rounds += 1
+                self._stop.wait(OCR_JOB_POLL_INTERVAL)
+            else:
+                idle_rounds = 0
+
+    def _run(self, job):
+        params = dict(job.parametres)
+        base_url = params.pop("base_url", "http://127.0.0.1:8000/")
+        handler = self.handlers.get(job.type)
+        if handler is None:
+            OcrJobService.finish(job, {"status": "error", "message": f"Type de job inconnu: {job.type}"}, 400)
+            return
+
+        try:
+            # Contexte de requête factice : url_for(_external=True) garde l'hôte de la requête d'origine
+            with self.app.test_request_context(base_url=base_url):
+                payload, code_http = handler(**params)
+        except InferenceUnavailableError as e:
+            db.session.rollback()
+            OcrJobService.retry_or_fail(job, str(e))
+            return
+        except Exception as e:
+            # Sans cela le job resterait EN_COURS jusqu'à requeue_stale, puis serait rejoué tel quel
+            traceback.print_exc()
+            db.session.rollback()
+            OcrJobService.fail(job, f"Erreur lors du traitement du job: {str(e)}")
+            return
+        OcrJobService.finish(job, payload, code_http)
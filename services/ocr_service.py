@@ -1,73 +1,105 @@
 from typing import List, Dict, Any, Optional
-import easyocr
 import numpy as np
 import json
 import os
 from rapidfuzz import fuzz
 from functools import lru_cache
 import logging
-from .image_preprocessing import preprocess_for_ocr
+from .image_preprocessing import load_image, document_frame, draw_annotations, fast_preprocess, heavy_preprocess
 from sqlalchemy import select
 import re
-from sqlalchemy import select
-from .text_utils import clean_text_for_matching, contains_digits, normalize_date_str
+import threading
+import time
+from .text_utils import clean_text_for_matching, normalize_date_str
+from .document_index import DOCUMENT_INDEX, MAX_CANDIDATES, _entry, score_documents
+from .mrz import parse_mrz
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Prétraitement par paliers : OCR sur l'image simplement redimensionnée en gris,
+# palier lourd (débruitage + seuillage) seulement si ce premier passage est faible
+OCR_FAST_MIN_CONFIDENCE = 0.6   # confiance moyenne minimale du palier rapide
+OCR_FAST_MIN_TOKENS = 6         # nombre minimal de textes détectés par le palier rapide
+
+# Un document trouvé par son numéro doit aussi porter le même nom et prénom
+NAME_MATCH_THRESHOLD = 85.0
+# Numéro lu par gabarit (sans chiffre de contrôle) : confiance OCR minimale pour la recherche exacte
+TEMPLATE_NUMBER_MIN_CONFIDENCE = 0.6
+
+_TIER_LOCK = threading.Lock()
+_TIER_STATS = {
+    "images": 0,
+    "escalations": 0,
+    "cards_found": 0,
+    "fast": {"count": 0, "preprocess_ms": 0.0, "ocr_ms": 0.0},
+    "heavy": {"count": 0, "preprocess_ms": 0.0, "ocr_ms": 0.0},
+    "template": {"count": 0, "preprocess_ms": 0.0, "ocr_ms": 0.0},
+}
+
+
+def _record_tier(tier, preprocess_ms, ocr_ms):
+    with _TIER_LOCK:
+        stats = _TIER_STATS[tier]
+        stats["count"] += 1
+        stats["preprocess_ms"] += preprocess_ms
+        stats["ocr_ms"] += ocr_ms
+
+def tier_counters() -> Dict[str, Any]:
+    """Compteurs bruts des paliers du processus courant (additionnables entre processus)."""
+    with _TIER_LOCK:
+        return {key: dict(value) if isinstance(value, dict) else value for key, value in _TIER_STATS.items()}
+
+
+def _format_tier_stats(counters: Dict[str, Any]) -> Dict[str, Any]:
+    stats = {key: counters[key] for key in ("images", "escalations", "cards_found")}
+    for tier in ("fast", "heavy", "template"):
+        tier_stats = counters[tier]
+        count = tier_stats["count"]
+        stats[tier] = {
+            "count": count,
+            "avg_preprocess_ms": round(tier_stats["preprocess_ms"] / count, 2) if count else None,
+            "avg_ocr_ms": round(tier_stats["ocr_ms"] / count, 2) if count else None,
+        }
+    stats["escalation_rate"] = round(stats["escalations"] / stats["images"], 4) if stats["images"] else None
+    return stats
+
+
+def merge_preprocess_stats(counters_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """preprocess_stats sommées sur plusieurs processus (compteurs de tier_counters)."""
+    total = {"images": 0, "escalations": 0, "cards_found": 0}
+    for tier in ("fast", "heavy", "template"):
+        total[tier] = {"count": 0, "preprocess_ms": 0.0, "ocr_ms": 0.0}
+    for counters in counters_list:
+        for key, value in counters.items():
+            if isinstance(value, dict):
+                for field, amount in value.items():
+                    total[key][field] += amount
+            else:
+                total[key] += value
+    return {"processes": len(counters_list), **_format_tier_stats(total)}
+
+
 class OCRService:
-    def __init__(self, langs: List[str] = None, use_gpu: bool = False):
+    def __init__(self, langs: List[str] = None, use_gpu: bool = False, load_reader: bool = True):
         langs = langs or ['fr', 'en']
+        self.reader = None
+        if not load_reader:
+            # Instance sans modèle (extraction / matching seulement), l'OCR tourne dans le pool d'inférence
+            return
         logger.info("Initialisation EasyOCR...")
+        import easyocr
         self.reader = easyocr.Reader(langs, gpu=use_gpu)
         logger.info("EasyOCR prêt.")
-        
-    def _load_documents(self, db, DocumentModel):
-        logger.info("Chargement des documents (safe mode)...")
-
-        rows = db.session.execute(
-            select(
-                DocumentModel.id,
-                DocumentModel.numero_document,
-                DocumentModel.nom,
-                DocumentModel.prenom,
-                DocumentModel.nationalite,
-                DocumentModel.date_de_naissance,
-                DocumentModel.date_d_expiration,
-                DocumentModel.sexe
-            )
-        ).all()
-
-        documents = []
-        for r in rows:
-            documents.append({
-                "id": r.id,
-                "numero_document": r.numero_document,
-                "nom": r.nom,
-                "prenom": r.prenom,
-                "nationalite": r.nationalite,
-                "date_de_naissance": r.date_de_naissance,
-                "date_d_expiration": r.date_d_expiration,
-                "sexe": r.sexe
-            })
-
-        logger.info("Documents chargés: %d", len(documents))
-        return documents
- 
-    def process_image(self, image_path: str, preprocess: bool = True) -> List[Dict[str, Any]]:
-        """
-        Lance le pipeline OCR sur l'image et renvoie une liste de dicts:
-        { bbox, text, confidence }
-        """
-        if preprocess:
-            img = preprocess_for_ocr(image_path)
-        else:
-            import cv2
-            img = cv2.imread(image_path)
-            if img is None:
-                raise FileNotFoundError(image_path)
 
+    def warm_up(self):
+        """Inférence factice (détection + reconnaissance) pour initialiser les graphes EasyOCR."""
+        import cv2
+        img = np.full((96, 480), 255, dtype=np.uint8)
+        cv2.putText(img, "IDSECURITY 0123", (10, 64), cv2.FONT_HERSHEY_SIMPLEX, 1.4, 0, 3)
+        self.reader.readtext(img, detail=1, paragraph=False)
         
+    def _readtext(self, img) -> List[Dict[str, Any]]:
         results = self.reader.readtext(img, detail=1, paragraph=False)
 
         # normaliser la sortie
@@ -80,21 +112,94 @@ class OCRService:
             })
         return normalized
 
-    def annotate_image(self, image_path: str, results: List[Dict[str, Any]], output_dir: str = "public/results") -> str:
+    @staticmethod
+    def _weak(results: List[Dict[str, Any]]) -> bool:
+        """Premier passage insuffisant : trop peu de textes ou confiance moyenne trop basse."""
+        if len(results) < OCR_FAST_MIN_TOKENS:
+            return True
+        return sum(r["confidence"] for r in results) / len(results) < OCR_FAST_MIN_CONFIDENCE
+
+    def process_image(self, image_path: str, preprocess: bool = True,
+                      crop_document: bool = True) -> List[Dict[str, Any]]:
+        """
+        Lance le pipeline OCR sur l'image et renvoie une liste de dicts:
+        { bbox, text, confidence }
+        Avec preprocess=True : document recadré (sinon image entière), palier rapide
+        d'abord, palier lourd seulement si nécessaire. Les bbox sont dans ce repère.
+        """
+        if not preprocess:
+            return self._readtext(load_image(image_path))
+
+        start = time.perf_counter()
+        gray, card_found = fast_preprocess(load_image(image_path), detect=crop_document)
+        preprocessed = time.perf_counter()
+        results = self._readtext(gray)
+        _record_tier("fast", (preprocessed - start) * 1000, (time.perf_counter() - preprocessed) * 1000)
+
+        escalate = self._weak(results)
+        with _TIER_LOCK:
+            _TIER_STATS["images"] += 1
+            _TIER_STATS["escalations"] += int(escalate)
+            _TIER_STATS["cards_found"] += int(card_found)
+        if not escalate:
+            return results
+
+        start = time.perf_counter()
+        binary = heavy_preprocess(gray)
+        preprocessed = time.perf_counter()
+        heavy_results = self._readtext(binary)
+        _record_tier("heavy", (preprocessed - start) * 1000, (time.perf_counter() - preprocessed) * 1000)
+
+        # Garder le passage le plus informatif (même repère : les deux partent de l'image redimensionnée)
+        if sum(r["confidence"] for r in heavy_results) >= sum(r["confidence"] for r in results):
+            return heavy_results
+        return results
+
+    def process_fields(self, image_path: str, template: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        OCR ciblé par gabarit : reconnaissance seule (sans détection) sur la zone de
+        chaque champ du document recadré, limitée au jeu de caractères attendu.
+        Renvoie [{field, bbox, text, confidence}] dans le repère de process_image,
+        ou None si le document n'est pas trouvé (le gabarit n'a alors pas de sens).
+        """
         import cv2
-        os.makedirs(output_dir, exist_ok=True)
-        image = cv2.imread(image_path)
-        if image is None:
-            raise FileNotFoundError(image_path)
+        start = time.perf_counter()
+        frame, card_found = document_frame(load_image(image_path))
+        if not card_found:
+            return None
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        height, width = gray.shape[:2]
+
+        fields = []
+        for field, spec in template.items():
+            x, y, w, h = spec["roi"]
+            x0, y0 = int(x * width), int(y * height)
+            x1, y1 = int((x + w) * width), int((y + h) * height)
+            crop = gray[y0:y1, x0:x1]
+            if crop.size == 0:
+                continue
+            recognized = self.reader.recognize(crop, allowlist=spec.get("allowlist"), detail=1, paragraph=False)
+            text = " ".join(t.strip() for _, t, _ in recognized if t.strip())
+            confidences = [float(c) for _, t, c in recognized if t.strip()]
+            fields.append({
+                "field": field,
+                "bbox": [[x0, y0], [x1, y0], [x1, y1], [x0, y1]],
+                "text": text,
+                "confidence": sum(confidences) / len(confidences) if confidences else 0.0
+            })
+        _record_tier("template", 0.0, (time.perf_counter() - start) * 1000)
+        return fields
 
-        for res in results:
-            pts = np.array(res['bbox'], dtype=np.int32)
-            cv2.polylines(image, [pts], True, (0, 255, 0), 2)
-            
-            x, y = pts[0]
-            cv2.putText(image, res['text'], (x, max(y - 6, 10)),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    def preprocess_stats(self) -> Dict[str, Any]:
+        """Temps moyens par palier et taux d'escalade vers le palier lourd (processus courant)."""
+        return {"pid": os.getpid(), **_format_tier_stats(tier_counters())}
 
+    def annotate_image(self, image_path: str, results: List[Dict[str, Any]], output_dir: str = "public/results",
+                       frame: bool = True) -> str:
+        """Dessine les bbox sur l'image ; frame=True : dans le repère de process_image (document recadré)."""
+        import cv2
+        os.makedirs(output_dir, exist_ok=True)
+        image = draw_annotations(image_path, results, frame)
         out_path = os.path.join(output_dir, f"annotated_{os.path.basename(image_path)}")
         cv2.imwrite(out_path, image)
         return out_path
@@ -113,58 +218,89 @@ class OCRService:
         db.session.commit()
         return entry
 
-    def fuzzy_match_document(self, text_detected: str, db, DocumentModel, threshold: float = 70.0):
+    def fuzzy_match_document(self, text_detected: str, db, DocumentModel, threshold: float = 70.0,
+                             max_candidates: int = MAX_CANDIDATES):
         text_norm = clean_text_for_matching(text_detected)
 
-        docs = self._load_documents(db, DocumentModel)
+        # Index inversé en mémoire : seuls les candidats proches sont scorés
+        docs = DOCUMENT_INDEX.candidates(text_norm, db, DocumentModel, limit=max_candidates)
 
-        fields_weights = {
-            "numero_document": 2,
-            "nom": 3,
-            "prenom": 3,
-            "nationalite": 1,
-            "date_de_naissance": 1,
-            "date_d_expiration": 1
-        }
-
-        results = []
+        return score_documents(text_norm, docs, threshold)
 
-        for doc in docs:
-            total_score = 0.0
-            total_weight = 0.0
-            scores_detail = {}
+    @staticmethod
+    def _names_match(doc, mrz, text_norm):
+        """
+        Nom et prénom du document retrouvés dans la MRZ ou, à défaut, dans le texte OCR.
+        Renvoie les scores {"nom": .., "prenom": ..} ou None si l'un d'eux ne correspond pas.
+        """
+        expected = {field: clean_text_for_matching(getattr(doc, field) or "") for field in ("nom", "prenom")}
+        expected = {field: value for field, value in expected.items() if value}
+        if not expected:
+            return None
 
-            for field, weight in fields_weights.items():
-                val = doc.get(field)
-                if not val:
+        sources = [{"nom": text_norm, "prenom": text_norm}]
+        if mrz:
+            sources.insert(0, {"nom": clean_text_for_matching(mrz["surname"]),
+                               "prenom": clean_text_for_matching(mrz["given_names"])})
+        for source in sources:
+            scores = {field: fuzz.token_set_ratio(source[field], value) for field, value in expected.items()}
+            if all(score >= NAME_MATCH_THRESHOLD for score in scores.values()):
+                return scores
+        return None
+
+    def match_document(self, results: List[Dict[str, Any]], text_detected: str, db, DocumentModel,
+                       threshold: float = 70.0):
+        """
+        Chemin rapide : numéro de document lu dans la MRZ (chiffres de contrôle du
+        numéro et composite valides) ou dans le champ numero_document d'un gabarit
+        -> recherche exacte sur numero_document (colonne indexée) pour choisir le
+        document candidat. Le candidat n'est retenu que si son nom et son prénom
+        se retrouvent dans la MRZ ou le texte OCR. Un numéro de gabarit n'a pas de
+        chiffre de contrôle : le candidat garde alors son score fuzzy complet (seuil
+        `threshold`) au lieu du score 100 d'un numéro MRZ vérifié.
+        Fuzzy matching sinon (pas de numéro exploitable, numéro inconnu ou noms différents).
+        Renvoie (matches, mrz).
+        """
+        mrz = parse_mrz(results)
+        text_norm = clean_text_for_matching(text_detected)
+        numbers = []
+        if mrz and mrz["checks"]["composite"]:
+            numbers += [(number, "mrz") for number in mrz["document_numbers"]]
+        numbers += [(r["text"].replace(" ", ""), "gabarit") for r in results
+                    if r.get("field") == "numero_document" and r["text"].strip()
+                    and r["confidence"] >= TEMPLATE_NUMBER_MIN_CONFIDENCE]
+        if numbers:
+            rows = db.session.execute(
+                select(DocumentModel).where(DocumentModel.numero_document.in_([n for n, _ in numbers]))
+            ).scalars().all()
+            by_number = {doc.numero_document: doc for doc in rows}
+            for number, source in numbers:
+                doc = by_number.get(number)
+                if doc is None:
                     continue
-
-                val_norm = clean_text_for_matching(str(val))
-
-                if "date" in field and not contains_digits(text_norm):
+                name_scores = self._names_match(doc, mrz, text_norm)
+                if name_scores is None:
+                    logger.warning("Document %s trouvé par numéro (%s) mais nom/prénom différents", doc.id, source)
                     continue
-
-                score = fuzz.token_set_ratio(text_norm, val_norm)
-                scores_detail[field] = score
-
-                total_score += score * weight
-                total_weight += weight
-
-            global_score = (total_score / total_weight) if total_weight else 0.0
-
-            if global_score >= threshold:
-                results.append({
-                    "document_id": doc["id"],
-                    "numero_document": doc["numero_document"],
-                    "nom": doc["nom"],
-                    "prenom": doc["prenom"],
-                    "sexe": doc.get("sexe"),
-                    "scores_detail": scores_detail,
-                    "global_similarity_score": round(global_score, 2)
-                })
-
-        results.sort(key=lambda x: x["global_similarity_score"], reverse=True)
-        return results
+                if source == "gabarit":
+                    scored = score_documents(text_norm, [_entry(doc)], threshold)
+                    if not scored:
+                        continue
+                    logger.info("Document %s trouvé par numéro (gabarit)", doc.id)
+                    return [dict(scored[0], source=source)], mrz
+                logger.info("Document %s trouvé par numéro (%s)", doc.id, source)
+                return [{
+                    "document_id": doc.id,
+                    "numero_document": doc.numero_document,
+                    "nom": doc.nom,
+                    "prenom": doc.prenom,
+                    "sexe": doc.sexe,
+                    "scores_detail": {"numero_document": 100, **name_scores},
+                    "global_similarity_score": 100.0,
+                    "source": source
+                }], mrz
+
+        return self.fuzzy_match_document(text_detected, db, DocumentModel, threshold), mrz
 
 
 
@@ -1,15 +1,18 @@
 from models.type_document import TypeDocument
 from config.database import db
+from services.field_templates import FIELD_TEMPLATES, validate_template
 
 class TypeDocumentService:
     @staticmethod
-    def creer_type_document(libelle,description):
+    def creer_type_document(libelle,description,gabarit_champs=None):
         type_document = TypeDocument(
             libelle = libelle,
-            description = description
+            description = description,
+            gabarit_champs = validate_template(gabarit_champs)
         )
         db.session.add(type_document)
         db.session.commit()
+        FIELD_TEMPLATES.invalidate()
         return type_document
 
 
@@ -24,18 +27,22 @@ class TypeDocumentService:
 
 
     @staticmethod
-    def update_type_document(id,libelle,description):
+    def update_type_document(id,libelle,description,gabarit_champs=None):
         type_document = TypeDocument.query.get(id)
         type_document.libelle = libelle
         type_document.description = description
+        if gabarit_champs is not None:
+            type_document.gabarit_champs = validate_template(gabarit_champs)
         db.session.commit()
+        FIELD_TEMPLATES.invalidate()
         return type_document
 
     @staticmethod
     def delete_type_document(id):
         type_document = TypeDocument.query.get(id)
         db.session.delete(type_document)
-        db.session.commit()    
+        db.session.commit()
+        FIELD_TEMPLATES.invalidate()    
 
 
 
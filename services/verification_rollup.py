@@ -0,0 +1,221 @@
+"""
+Agrégat journalier `verification_daily_stats` (jour, lieu, résultat) pour les
+tableaux de bord. Les jours complets passés sont lus dans l'agrégat ; le jour
+en cours et les bords de période qui ne couvrent pas une journée entière
+(ex : "week" = maintenant - 7 jours) sont comptés en direct sur verifications.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config.database import db
+from models.lieu import Lieu
+from models.verification import Verification
+from models.verification_daily_stat import VerificationDailyStat
+
+
+def _day_start(day):
+    return datetime.combine(day, datetime.min.time())
+
+
+def _split_range(start, end):
+    """
+    Découpe [start, end] (bornes incluses, None = non borné) en :
+    - (premier_jour, dernier_jour) des journées complètes et passées, servies par
+      l'agrégat (premier_jour None = depuis le début), ou None s'il n'y en a pas ;
+    - conditions SQL sur verifications pour le reste, lu en direct : une plage de
+      dates simple par segment (début partiel, fin / jour en cours) pour que chacune
+      reste une recherche sur l'index de date_verification.
+    """
+    yesterday = date.today() - timedelta(days=1)
+    first_day = None
+    if start is not None:
+        first_day = start.date() if start.time() == datetime.min.time() else start.date() + timedelta(days=1)
+    last_day = yesterday
+    if end is not None:
+        end_day = end.date() if end.time() == datetime.max.time() else end.date() - timedelta(days=1)
+        last_day = min(last_day, end_day)
+
+    if first_day is not None and first_day > last_day:
+        # Aucune journée complète : toute la période en direct
+        live = [Verification.date_verification >= start]
+        if end is not None:
+            live.append(Verification.date_verification <= end)
+        return None, [and_(*live)]
+
+    live = []
+    if first_day is not None and start < _day_start(first_day):
+        live.append(and_(Verification.date_verification >= start,
+                         Verification.date_verification < _day_start(first_day)))
+    tail_start = _day_start(last_day + timedelta(days=1))
+    if end is None or end >= tail_start:
+        tail = [Verification.date_verification >= tail_start]
+        if end is not None:
+            tail.append(Verification.date_verification <= end)
+        live.append(and_(*tail))
+    return (first_day, last_day), live
+
+
+def _rollup_query(query, days):
+    first_day, last_day = days
+    if first_day is not None:
+        query = query.filter(VerificationDailyStat.jour >= first_day)
+    return query.filter(VerificationDailyStat.jour <= last_day)
+
+
+class VerificationRollup:
+
+    @staticmethod
+    def record(verification):
+        """
+        Compte une nouvelle vérification dans l'agrégat, dans la transaction de
+        l'appelant (date_verification doit être chargée : flush + refresh).
+        """
+        table = VerificationDailyStat.__table__
+        values = {
+            "jour": verification.date_verification.date(),
+            "lieu_id": verification.lieu_id or VerificationDailyStat.SANS_LIEU,
+            "resultat_donnee": verification.resultat_donnee or VerificationDailyStat.SANS_RESULTAT,
+            "nb_verifications": 1,
+            "derniere_verification": verification.date_verification,
+        }
+        if db.engine.dialect.name == "mysql":
+            stmt = mysql_insert(table).values(**values)
+            stmt = stmt.on_duplicate_key_update(
+                nb_verifications=table.c.nb_verifications + 1,
+                derniere_verification=func.greatest(table.c.derniere_verification, stmt.inserted.derniere_verification)
+            )
+        else:
+            stmt = sqlite_insert(table).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["jour", "lieu_id", "resultat_donnee"],
+                set_={
+                    "nb_verifications": table.c.nb_verifications + 1,
+                    "derniere_verification": func.max(table.c.derniere_verification, stmt.excluded.derniere_verification),
+                }
+            )
+        db.session.execute(stmt)
+
+    @staticmethod
+    def rebuild(start_day=None, end_day=None):
+        """
+        Recalcule l'agrégat depuis verifications (jours inclus, None = non borné).
+        Renvoie le nombre de lignes d'agrégat écrites.
+        """
+        deleted = VerificationDailyStat.query
+        source = db.session.query(
+            func.date(Verification.date_verification),
+            func.coalesce(Verification.lieu_id, VerificationDailyStat.SANS_LIEU),
+            func.coalesce(Verification.resultat_donnee, VerificationDailyStat.SANS_RESULTAT),
+            func.count(Verification.id),
+            func.max(Verification.date_verification)
+        ).filter(Verification.date_verification.isnot(None))
+        if start_day is not None:
+            deleted = deleted.filter(VerificationDailyStat.jour >= start_day)
+            source = source.filter(Verification.date_verification >= _day_start(start_day))
+        if end_day is not None:
+            deleted = deleted.filter(VerificationDailyStat.jour <= end_day)
+            source = source.filter(Verification.date_verification < _day_start(end_day + timedelta(days=1)))
+        source = source.group_by(
+            func.date(Verification.date_verification),
+            func.coalesce(Verification.lieu_id, VerificationDailyStat.SANS_LIEU),
+            func.coalesce(Verification.resultat_donnee, VerificationDailyStat.SANS_RESULTAT)
+        )
+
+        deleted.delete(synchronize_session=False)
+        result = db.session.execute(
+            VerificationDailyStat.__table__.insert().from_select(
+                ["jour", "lieu_id", "resultat_donnee", "nb_verifications", "derniere_verification"],
+                source
+            )
+        )
+        db.session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def counts_by_resultat(start, end):
+        """
+        {resultat_donnee: nombre} sur [start, end] (None pour une vérification sans résultat),
+        en une requête : agrégat et segments lus en direct réunis (UNION ALL).
+        """
+        days, live = _split_range(start, end)
+        parts = []
+        if days is not None:
+            parts.append(_rollup_query(
+                db.session.query(
+                    VerificationDailyStat.resultat_donnee.label("resultat_donnee"),
+                    func.sum(VerificationDailyStat.nb_verifications).label("nb")
+                ),
+                days
+            ).group_by(VerificationDailyStat.resultat_donnee))
+        for condition in live:
+            parts.append(db.session.query(
+                Verification.resultat_donnee.label("resultat_donnee"),
+                func.count(Verification.id).label("nb")
+            ).filter(condition).group_by(Verification.resultat_donnee))
+        if not parts:
+            return {}
+
+        counts = {}
+        for resultat, count in parts[0].union_all(*parts[1:]).all():
+            resultat = resultat or None
+            counts[resultat] = counts.get(resultat, 0) + int(count or 0)
+        return counts
+
+    @staticmethod
+    def stats_by_lieu(start, end, limit=None):
+        """
+        Statistiques par lieu sur [start, end], en une requête : agrégat et direct
+        réunis (UNION ALL), joints à lieux, groupés par lieu et triés par dernière
+        vérification. Lignes (lieu_id, nom, total, derniere_verification, reussies,
+        echouees, externes) ; vérifications sans lieu exclues.
+        """
+        days, live = _split_range(start, end)
+        parts = []
+        if days is not None:
+            parts.append(_rollup_query(
+                db.session.query(
+                    VerificationDailyStat.lieu_id.label("lieu_id"),
+                    VerificationDailyStat.resultat_donnee.label("resultat_donnee"),
+                    VerificationDailyStat.nb_verifications.label("nb"),
+                    VerificationDailyStat.derniere_verification.label("derniere")
+                ).filter(VerificationDailyStat.lieu_id != VerificationDailyStat.SANS_LIEU),
+                days
+            ))
+        for condition in live:
+            parts.append(db.session.query(
+                Verification.lieu_id.label("lieu_id"),
+                Verification.resultat_donnee.label("resultat_donnee"),
+                func.count(Verification.id).label("nb"),
+                func.max(Verification.date_verification).label("derniere")
+            ).filter(condition, Verification.lieu_id.isnot(None)).group_by(
+                Verification.lieu_id, Verification.resultat_donnee
+            ))
+        if not parts:
+            return []
+        stats = parts[0].union_all(*parts[1:]).subquery()
+
+        def compte(resultat):
+            return func.coalesce(func.sum(case((stats.c.resultat_donnee == resultat, stats.c.nb), else_=0)), 0)
+
+        derniere = func.max(stats.c.derniere)
+        query = db.session.query(
+            Lieu.id,
+            Lieu.nom,
+            func.sum(stats.c.nb),
+            derniere,
+            compte("OK"),
+            compte("ECHEC"),
+            compte("EXTERNE")
+        ).join(
+            stats, stats.c.lieu_id == Lieu.id
+        ).group_by(
+            Lieu.id, Lieu.nom
+        ).order_by(
+            derniere.desc()
+        )
+        if limit:
+            query = query.limit(limit)
+        return query.all()
@@ -1,14 +1,20 @@
 from config.database import db
-from models.lieu import Lieu
 from models.verification import Verification
+from services.file_storage import FileStorage
+from services.verification_rollup import VerificationRollup
 from flask_jwt_extended import get_jwt_identity
 from datetime import datetime, timedelta
-from sqlalchemy import func, extract
+from sqlalchemy import or_
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from io import BytesIO
-from datetime import datetime, timedelta
 from sqlalchemy.orm import joinedload
+import base64
+import json
+
+PAGE_SIZE_DEFAULT = 50      # vérifications par page (listes paginées)
+PAGE_SIZE_MAX = 200
+UNPAGINATED_CAP = 5000      # plafond de l'ancienne liste complète (?all=1)
 
 
 
@@ -22,7 +28,8 @@ class VerificationService:
         document_id: int = None,
         ocr_result_id: int = None,
         resultat_photo: str = "NON_VERIFIE",
-        url_image_echec: str = None
+        url_image_echec: str = None,
+        fichier_sha256: str = None
     ) -> Verification:
         verification = Verification(
             utilisateur_id=utilisateur_id,
@@ -31,12 +38,17 @@ class VerificationService:
             ocr_result_id=ocr_result_id,
             resultat_donnee=resultat_donnee,
             resultat_photo=resultat_photo,
-            url_image_echec=url_image_echec
+            url_image_echec=url_image_echec,
+            fichier_sha256=fichier_sha256
         )
         db.session.add(verification)
+        FileStorage.acquire(fichier_sha256)
         try:
-            db.session.commit()
+            # date_verification (défaut serveur) est nécessaire pour l'agrégat journalier
+            db.session.flush()
             db.session.refresh(verification)
+            VerificationRollup.record(verification)
+            db.session.commit()
             print(f"✅ Verification enregistrée avec ID: {verification.id}, document_id: {document_id}")
         except Exception as e:
             db.session.rollback()
@@ -55,166 +67,187 @@ class VerificationService:
 
 
     @staticmethod
-    def get_all_verifications():
-        return Verification.query.options(
+    def get_all_verifications(limit=None):
+        query = Verification.query.options(
             joinedload(Verification.utilisateur),
             joinedload(Verification.lieu),
             joinedload(Verification.document),
             joinedload(Verification.ocr_results)
         ).order_by(
             Verification.date_verification.desc()
-        ).all()
+        )
+        if limit:
+            query = query.limit(limit)
+        return query.all()
 
     @staticmethod
-    def get_user_verifications():          
+    def get_user_verifications(limit=None):          
         current_user_id = get_jwt_identity()          
-        verifications = Verification.query.filter_by(            
+        query = Verification.query.filter_by(            
             utilisateur_id=current_user_id        
-            ).order_by(Verification.date_verification.desc()).all()          
-        return verifications    
+            ).order_by(Verification.date_verification.desc())
+        if limit:
+            query = query.limit(limit)
+        return query.all()
 
+    @staticmethod
+    def encode_cursor(verification):
+        """Curseur opaque : position (date_verification, id) de la dernière vérification de la page."""
+        position = json.dumps({"d": verification.date_verification.isoformat(), "i": verification.id})
+        return base64.urlsafe_b64encode(position.encode()).decode().rstrip("=")
 
+    @staticmethod
+    def decode_cursor(cursor):
+        """Lève ValueError si le curseur est invalide."""
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            return datetime.fromisoformat(position["d"]), int(position["i"])
+        except Exception:
+            raise ValueError("Curseur de pagination invalide")
 
     @staticmethod
-    def get_statistiques_verifications(periode=None):
-        """Récupère les statistiques avec filtrage par période"""
-        query = Verification.query
-        
-        if periode:
-            now = datetime.now()
-            if periode == "today":
-                # Aujourd'hui (minuit à maintenant)
-                start_of_day = datetime.combine(now.date(), datetime.min.time())
-                query = query.filter(Verification.date_verification >= start_of_day)
-            elif periode == "yesterday":
-                # Hier (toute la journée)
-                yesterday = now - timedelta(days=1)
-                start_of_day = datetime.combine(yesterday.date(), datetime.min.time())
-                end_of_day = datetime.combine(yesterday.date(), datetime.max.time())
-                query = query.filter(
-                    Verification.date_verification >= start_of_day,
-                    Verification.date_verification <= end_of_day
-                )
-            elif periode == "week":
-                # 7 derniers jours
-                week_ago = now - timedelta(days=7)
-                query = query.filter(Verification.date_verification >= week_ago)
-            elif periode == "month":
-                # 30 derniers jours
-                month_ago = now - timedelta(days=30)
-                query = query.filter(Verification.date_verification >= month_ago)
-            
-        total = query.count()
-        
-        reussies = query.filter(
-            Verification.resultat_donnee == "OK"
-        ).count()
+    def list_verifications(utilisateur_id=None, lieu_id=None, resultat_donnee=None,
+                           date_range=(None, None), cursor=None, limit=PAGE_SIZE_DEFAULT):
+        """
+        Page de vérifications, les plus récentes d'abord, paginée par clé
+        (date_verification, id) : le coût d'une page ne dépend pas de sa position.
+        Renvoie (vérifications, next_cursor) ; next_cursor est None sur la dernière page.
+        """
+        query = Verification.query.options(
+            joinedload(Verification.utilisateur),
+            joinedload(Verification.lieu),
+            joinedload(Verification.document),
+            joinedload(Verification.ocr_results)
+        )
+        if utilisateur_id is not None:
+            query = query.filter(Verification.utilisateur_id == utilisateur_id)
+        if lieu_id is not None:
+            query = query.filter(Verification.lieu_id == lieu_id)
+        if resultat_donnee:
+            query = query.filter(Verification.resultat_donnee == resultat_donnee)
+        query = VerificationService._filter_date_range(query, date_range)
+
+        if cursor:
+            date_verification, verification_id = VerificationService.decode_cursor(cursor)
+            # Borne `<=` en tête : recherche par plage sur l'index de date, puis départage par id
+            query = query.filter(
+                Verification.date_verification <= date_verification,
+                or_(Verification.date_verification < date_verification, Verification.id < verification_id)
+            )
+
+        limit = max(1, min(limit, PAGE_SIZE_MAX))
+        verifications = query.order_by(
+            Verification.date_verification.desc(),
+            Verification.id.desc()
+        ).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(verifications) > limit:
+            verifications = verifications[:limit]
+            next_cursor = VerificationService.encode_cursor(verifications[-1])
+        return verifications, next_cursor
 
-        echouees = query.filter(
-            Verification.resultat_donnee == "ECHEC"
-        ).count()
 
-        externes = query.filter(
-            Verification.resultat_donnee == "EXTERNE"
-        ).count()
 
+    @staticmethod
+    def resolve_date_range(periode=None, start_date=None, end_date=None):
+        """
+        Bornes (début, fin) incluses d'une période : "today", "yesterday", "week"
+        (7 derniers jours), "month" (30 derniers jours), ou dates personnalisées
+        'YYYY-MM-DD' (fin à 23:59:59). None = pas de borne. Lève ValueError si
+        une date personnalisée est invalide.
+        """
+        if start_date or end_date:
+            try:
+                start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+                end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else None
+            except ValueError as e:
+                raise ValueError(f"Format de date invalide: {str(e)}")
+            # Ajouter 23h59 à la date de fin
+            return start, datetime.combine(end, datetime.max.time()) if end else None
+
+        now = datetime.now()
+        if periode == "today":
+            # Aujourd'hui (minuit à maintenant)
+            return datetime.combine(now.date(), datetime.min.time()), None
+        if periode == "yesterday":
+            # Hier (toute la journée)
+            yesterday = now.date() - timedelta(days=1)
+            return datetime.combine(yesterday, datetime.min.time()), datetime.combine(yesterday, datetime.max.time())
+        if periode == "week":
+            return now - timedelta(days=7), None
+        if periode == "month":
+            return now - timedelta(days=30), None
+        return None, None
+
+    @staticmethod
+    def _filter_date_range(query, date_range):
+        start, end = date_range
+        if start is not None:
+            query = query.filter(Verification.date_verification >= start)
+        if end is not None:
+            query = query.filter(Verification.date_verification <= end)
+        return query
+
+    @staticmethod
+    def _compter_resultats(date_range):
+        """Total et compteurs par résultat : agrégat journalier + jour en cours en direct."""
+        counts = VerificationRollup.counts_by_resultat(*date_range)
         return {
-            "total": total,
-            "reussies": reussies,
-            "echouees": echouees,
-            "externes": externes,
-            "periode": periode or "all"
+            "total": sum(counts.values()),
+            "reussies": counts.get("OK", 0),
+            "echouees": counts.get("ECHEC", 0),
+            "externes": counts.get("EXTERNE", 0)
         }
 
     @staticmethod
-    def get_stats_verifications_par_lieu(periode=None):
-        """Récupère les statistiques par lieu avec filtrage par période"""
-        query = Verification.query
-        
-        if periode:
-            now = datetime.now()
-            if periode == "today":
-                start_of_day = datetime.combine(now.date(), datetime.min.time())
-                query = query.filter(Verification.date_verification >= start_of_day)
-            elif periode == "yesterday":
-                yesterday = now - timedelta(days=1)
-                start_of_day = datetime.combine(yesterday.date(), datetime.min.time())
-                end_of_day = datetime.combine(yesterday.date(), datetime.max.time())
-                query = query.filter(
-                    Verification.date_verification >= start_of_day,
-                    Verification.date_verification <= end_of_day
-                )
-            elif periode == "week":
-                week_ago = now - timedelta(days=7)
-                query = query.filter(Verification.date_verification >= week_ago)
-            elif periode == "month":
-                month_ago = now - timedelta(days=30)
-                query = query.filter(Verification.date_verification >= month_ago)
-            
-        
-        subquery = query.filter(
-            Verification.lieu_id.isnot(None)
-        ).with_entities(
-            Verification.lieu_id,
-            func.max(Verification.date_verification).label('derniere_verif')
-        ).group_by(
-            Verification.lieu_id
-        ).subquery()
-
-        results = db.session.query(
-            Verification.lieu_id,
-            func.count(Verification.id)
-        ).join(
-            subquery,
-            Verification.lieu_id == subquery.c.lieu_id
-        ).group_by(
-            Verification.lieu_id,
-            subquery.c.derniere_verif
-        ).order_by(
-            subquery.c.derniere_verif.desc()  
-        ).limit(10).all()
-
+    def _stats_par_lieu(date_range, limit=10, detail=False):
+        """
+        Lieux les plus récemment contrôlés (`limit`, None = tous) avec leur total ;
+        detail=True ajoute le détail par résultat et la date de dernière vérification.
+        """
         data = []
-        for lieu_id, total in results:
-            lieu = Lieu.query.get(lieu_id)
-            if lieu:
-                data.append({
-                    "lieu": lieu.nom,
-                    "total": total
+        for lieu_id, nom, total, derniere, reussies, echouees, externes in VerificationRollup.stats_by_lieu(
+                *date_range, limit=limit):
+            stats = {
+                "lieu": nom,
+                "total": int(total)
+            }
+            if detail:
+                stats.update({
+                    "lieu_id": lieu_id,
+                    "derniere_verification": derniere.isoformat() if derniere else None,
+                    "reussies": int(reussies),
+                    "echouees": int(echouees),
+                    "externes": int(externes)
                 })
+            data.append(stats)
 
         return data
 
     @staticmethod
-    def get_dernieres_verifications(periode=None, limit=4):
-        """Récupère les dernières vérifications avec filtrage par période"""
-        query = Verification.query
-        
-        if periode:
-            now = datetime.now()
-            if periode == "today":
-                start_of_day = datetime.combine(now.date(), datetime.min.time())
-                query = query.filter(Verification.date_verification >= start_of_day)
-            elif periode == "yesterday":
-                yesterday = now - timedelta(days=1)
-                start_of_day = datetime.combine(yesterday.date(), datetime.min.time())
-                end_of_day = datetime.combine(yesterday.date(), datetime.max.time())
-                query = query.filter(
-                    Verification.date_verification >= start_of_day,
-                    Verification.date_verification <= end_of_day
-                )
-            elif periode == "week":
-                week_ago = now - timedelta(days=7)
-                query = query.filter(Verification.date_verification >= week_ago)
-            elif periode == "month":
-                month_ago = now - timedelta(days=30)
-                query = query.filter(Verification.date_verification >= month_ago)
-            
-        
-        return query.order_by(
+    def _dernieres_verifications(date_range, limit):
+        return VerificationService._filter_date_range(Verification.query, date_range).order_by(
             Verification.date_verification.desc()
         ).limit(limit).all()
 
+    @staticmethod
+    def get_statistiques_verifications(periode=None):
+        """Récupère les statistiques avec filtrage par période"""
+        stats = VerificationService._compter_resultats(VerificationService.resolve_date_range(periode))
+        stats["periode"] = periode or "all"
+        return stats
+
+    @staticmethod
+    def get_stats_verifications_par_lieu(periode=None, limit=10, detail=False):
+        """Récupère les statistiques par lieu avec filtrage par période"""
+        return VerificationService._stats_par_lieu(VerificationService.resolve_date_range(periode), limit, detail)
+
+    @staticmethod
+    def get_dernieres_verifications(periode=None, limit=4):
+        """Récupère les dernières vérifications avec filtrage par période"""
+        return VerificationService._dernieres_verifications(VerificationService.resolve_date_range(periode), limit)
+
 
 
     # @staticmethod
@@ -250,97 +283,23 @@ class VerificationService:
     @staticmethod
     def get_statistiques_verifications_custom(start_date, end_date):
         """Récupère les statistiques avec filtrage par dates personnalisées"""
-        try:
-            start = datetime.strptime(start_date, '%Y-%m-%d')
-            end = datetime.strptime(end_date, '%Y-%m-%d')
-            # Ajouter 23h59 à la date de fin
-            end = datetime.combine(end, datetime.max.time())
-        except ValueError as e:
-            raise ValueError(f"Format de date invalide: {str(e)}")
-        
-        query = Verification.query.filter(
-            Verification.date_verification >= start,
-            Verification.date_verification <= end
-        )
-        
-        total = query.count()
-        reussies = query.filter(Verification.resultat_donnee == "OK").count()
-        echouees = query.filter(Verification.resultat_donnee == "ECHEC").count()
-        externes = query.filter(Verification.resultat_donnee == "EXTERNE").count()
-
-        return {
-            "total": total,
-            "reussies": reussies,
-            "echouees": echouees,
-            "externes": externes,
-            "start_date": start_date,
-            "end_date": end_date
-        }
+        date_range = VerificationService.resolve_date_range(start_date=start_date, end_date=end_date)
+        stats = VerificationService._compter_resultats(date_range)
+        stats["start_date"] = start_date
+        stats["end_date"] = end_date
+        return stats
 
     @staticmethod
-    def get_stats_verifications_par_lieu_custom(start_date, end_date):
+    def get_stats_verifications_par_lieu_custom(start_date, end_date, limit=10, detail=False):
         """Récupère les statistiques par lieu avec filtrage par dates personnalisées"""
-        try:
-            start = datetime.strptime(start_date, '%Y-%m-%d')
-            end = datetime.strptime(end_date, '%Y-%m-%d')
-            end = datetime.combine(end, datetime.max.time())
-        except ValueError as e:
-            raise ValueError(f"Format de date invalide: {str(e)}")
-        
-        query = Verification.query.filter(
-            Verification.date_verification >= start,
-            Verification.date_verification <= end
-        )
-        
-        subquery = query.filter(
-            Verification.lieu_id.isnot(None)
-        ).with_entities(
-            Verification.lieu_id,
-            func.max(Verification.date_verification).label('derniere_verif')
-        ).group_by(
-            Verification.lieu_id
-        ).subquery()
-
-        results = db.session.query(
-            Verification.lieu_id,
-            func.count(Verification.id)
-        ).join(
-            subquery,
-            Verification.lieu_id == subquery.c.lieu_id
-        ).group_by(
-            Verification.lieu_id,
-            subquery.c.derniere_verif
-        ).order_by(
-            subquery.c.derniere_verif.desc()  
-        ).limit(10).all()
-
-        data = []
-        for lieu_id, total in results:
-            lieu = Lieu.query.get(lieu_id)
-            if lieu:
-                data.append({
-                    "lieu": lieu.nom,
-                    "total": total
-                })
-
-        return data
+        date_range = VerificationService.resolve_date_range(start_date=start_date, end_date=end_date)
+        return VerificationService._stats_par_lieu(date_range, limit, detail)
 
     @staticmethod
     def get_dernieres_verifications_custom(start_date, end_date, limit=4):
         """Récupère les dernières vérifications avec filtrage par dates personnalisées"""
-        try:
-            start = datetime.strptime(start_date, '%Y-%m-%d')
-            end = datetime.strptime(end_date, '%Y-%m-%d')
-            end = datetime.combine(end, datetime.max.time())
-        except ValueError as e:
-            raise ValueError(f"Format de date invalide: {str(e)}")
-        
-        return Verification.query.filter(
-            Verification.date_verification >= start,
-            Verification.date_verification <= end
-        ).order_by(
-            Verification.date_verification.desc()
-        ).limit(limit).all()
+        date_range = VerificationService.resolve_date_range(start_date=start_date, end_date=end_date)
+        return VerificationService._dernieres_verifications(date_range, limit)
 
 
 # Exportation
@@ -528,61 +487,28 @@ class VerificationService:
 
 
     @staticmethod
-    def get_verifications_for_export(periode=None):
-        """
-        Récupère les vérifications pour l'export avec leurs relations
-        """
-
-        
+    def _verifications_for_export(date_range):
+        """Vérifications de la période avec leurs relations, pour l'export"""
         query = Verification.query.options(
             joinedload(Verification.utilisateur),
             joinedload(Verification.lieu),
             joinedload(Verification.document),
             joinedload(Verification.ocr_results)
         )
-        
-        if periode:
-            now = datetime.now()
-            if periode == "today":
-                start_of_day = datetime.combine(now.date(), datetime.min.time())
-                query = query.filter(Verification.date_verification >= start_of_day)
-            elif periode == "yesterday":
-                yesterday = now - timedelta(days=1)
-                start_of_day = datetime.combine(yesterday.date(), datetime.min.time())
-                end_of_day = datetime.combine(yesterday.date(), datetime.max.time())
-                query = query.filter(
-                    Verification.date_verification >= start_of_day,
-                    Verification.date_verification <= end_of_day
-                )
-            elif periode == "week":
-                week_ago = now - timedelta(days=7)
-                query = query.filter(Verification.date_verification >= week_ago)
-            elif periode == "month":
-                month_ago = now - timedelta(days=30)
-                query = query.filter(Verification.date_verification >= month_ago)
-        
+        query = VerificationService._filter_date_range(query, date_range)
         return query.order_by(Verification.date_verification.desc()).all()
+
+    @staticmethod
+    def get_verifications_for_export(periode=None):
+        """
+        Récupère les vérifications pour l'export avec leurs relations
+        """
+        return VerificationService._verifications_for_export(VerificationService.resolve_date_range(periode))
     
     @staticmethod
     def get_verifications_for_export_custom(start_date, end_date):
         """
         Récupère les vérifications pour l'export avec dates personnalisées
         """
-        from models.verification import Verification
-        
-        try:
-            start = datetime.strptime(start_date, '%Y-%m-%d')
-            end = datetime.strptime(end_date, '%Y-%m-%d')
-            end = datetime.combine(end, datetime.max.time())
-        except ValueError as e:
-            raise ValueError(f"Format de date invalide: {str(e)}")
-        
-        return Verification.query.options(
-            joinedload(Verification.utilisateur),
-            joinedload(Verification.lieu),
-            joinedload(Verification.document),
-            joinedload(Verification.ocr_results)
-        ).filter(
-            Verification.date_verification >= start,
-            Verification.date_verification <= end
-        ).order_by(Verification.date_verification.desc()).all()
\ No newline at end of file
+        date_range = VerificationService.resolve_date_range(start_date=start_date, end_date=end_date)
+        return VerificationService._verifications_for_export(date_range)
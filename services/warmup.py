@@ -0,0 +1,53 @@
+import threading
+import time
+
+# Etat du préchauffage des modèles, exposé par /api/health/ready
+_READY = threading.Event()
+STATUS = {"state": "pending", "models": {}, "duration": None}
+
+
+def warm_up(steps):
+    """
+    Exécute les étapes de préchauffage (dict nom -> callable) dans l'ordre.
+    Le service n'est déclaré prêt que si toutes les étapes ont réussi.
+    """
+    STATUS["state"] = "running"
+    start = time.perf_counter()
+    failed = False
+
+    for name, step in steps.items():
+        step_start = time.perf_counter()
+        try:
+            step()
+            STATUS["models"][name] = {
+                "ready": True,
+                "duration": round(time.perf_counter() - step_start, 2)
+            }
+            print(f"[Warmup] {name} prêt en {STATUS['models'][name]['duration']} s")
+        except Exception as e:
+            failed = True
+            STATUS["models"][name] = {"ready": False, "error": str(e)}
+            print(f"[Warmup] Erreur lors du préchauffage de {name}: {str(e)}")
+
+    STATUS["duration"] = round(time.perf_counter() - start, 2)
+    STATUS["state"] = "failed" if failed else "ready"
+    if not failed:
+        _READY.set()
+
+
+def start_warm_up(steps):
+    """Lance le préchauffage en arrière-plan (le serveur répond déjà à la sonde de vie)."""
+    thread = threading.Thread(target=warm_up, args=(steps,), daemon=True, name="warmup")
+    thread.start()
+    return thread
+
+
+def mark_ready(reason):
+    """Déclare le processus prêt sans préchauffage (ex: worker API-only)."""
+    STATUS["state"] = "ready"
+    STATUS["reason"] = reason
+    _READY.set()
+
+
+def is_ready():
+    return _READY.is_set()